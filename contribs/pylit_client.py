@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ================================================================
+# pylit_client.py: thin client for the PyLit conversion server
+# ================================================================
+#
+# :Copyright: 2026 Lauro Cavalcanti de Sa.
+#             Released under the terms of the GNU General Public License
+#             (v. 3 or later)
+#
+# .. contents::
+
+# Frontmatter
+# ===========
+#
+# Changelog
+# ---------
+#
+# :0.1: Initial version.
+# ::
+
+"""Thin client for the PyLit conversion server (``pylit --serve``).
+
+Forwards the command line to a running server and reports the result like
+``pylit``. Falls back to in-process conversion if no server is running.
+"""
+
+__docformat__ = 'restructuredtext'
+
+_version = "0.1"
+
+# ``pylit --client`` has to import and compile the complete `pylit` module
+# and parse the options before it can connect to the server. This client
+# only needs `socket` and `json`, the server parses the command line.
+# `pylit` is imported only for the fallback, i.e. if no server is running
+# or the arguments ask for an action the server does not provide::
+#
+#   pylit_client.py [pylit options] INFILE [OUTFILE]
+#
+# Requirements
+# ------------
+#
+# ::
+
+import json, os, socket, sys
+
+# Options handled in-process (by `pylit.main`). Requests with these options
+# or with standard input (``-``) are not forwarded::
+
+local_options = ("--execute", "--doctest", "--doctest-files",
+                 "--fingerprint", "--emit-ninja", "--convert", "--reload",
+                 "--serve", "--fork-server", "--worker",
+                 "--persistent_worker", "--help", "--version")
+local_flags = "eh"
+
+# Command line
+# ============
+#
+# The default socket path is the same as `pylit.default_socket_path`
+# (pylit_client_test.py checks that both agree)::
+
+def default_socket_path():
+    """Return the default path of the conversion server socket"""
+    import tempfile
+    user = getattr(os, "getuid", lambda: os.environ.get("USERNAME", ""))()
+    return os.path.join(tempfile.gettempdir(),
+                        "pylit-server-%s.sock" % user)
+
+# Return the value of the ``--socket`` option (or None)::
+
+def socket_option(args):
+    """Return the socket path given in `args`"""
+    for (i, arg) in enumerate(args):
+        if arg == "--socket" and i + 1 < len(args):
+            return args[i+1]
+        if arg.startswith("--socket="):
+            return arg[len("--socket="):]
+    return None
+
+# Return the requested action ("diff" or "convert"), or None if the request
+# must be handled in-process. Short flags may be combined (e.g. ``-sd``),
+# the value of ``-m`` ends the combination::
+
+def client_action(args):
+    """Return the server action for the command line `args`"""
+    action = "convert"
+    for arg in args:
+        if arg == "-" or arg.split("=")[0] in local_options:
+            return None
+        if arg == "--diff":
+            action = "diff"
+        elif arg.startswith("-") and not arg.startswith("--"):
+            flags = arg[1:].split("m")[0]
+            if [flag for flag in flags if flag in local_flags]:
+                return None
+            if "d" in flags:
+                action = "diff"
+    return action
+
+# Server request
+# ==============
+#
+# Send the request (a JSON object on one line) and return the response.
+# Raises `IOError` if no server is listening at `socket_path`. A copy of
+# `pylit.request_server` (this module must not import `pylit`)::
+
+def request_server(request, socket_path=None):
+    """Return response of the conversion server to `request`"""
+    socket_path = socket_path or default_socket_path()
+    if not hasattr(socket, "AF_UNIX"):
+        raise IOError(2, "Unix domain sockets not supported", socket_path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+        line = sock.makefile('rb').readline()
+    finally:
+        sock.close()
+    if not line:
+        raise IOError(32, "No response from server", socket_path)
+    return json.loads(line.decode('utf-8'))
+
+# main
+# ====
+#
+# Let the server process the command line `args` and report the result like
+# `pylit.main` (return True if a diff found differences). ::
+
+def main(args=sys.argv[1:]):
+    """Forward command line `args` to the conversion server"""
+    action = client_action(args)
+    response = None
+    if action is not None:
+        request = {"args": list(args), "cwd": os.getcwd(), "action": action}
+        try:
+            response = request_server(request, socket_option(args))
+        except IOError:
+            pass
+    if response is None:
+        import pylit
+        return pylit.main(list(args))
+    if "error" in response:
+        print("pylit server:", response["error"])
+        sys.exit(1)
+    sys.stdout.write(response.get("output", ""))
+    if "written" in response:
+        print("extract written to", response["written"])
+    if "current" in response:
+        print(response["current"], "is up to date")
+    if action == "diff":
+        if not response["different"]:
+            print(response["oldname"])
+            print(response["newname"])
+            print("no differences found")
+        return response["different"]
+
+if __name__ == '__main__':
+    main()
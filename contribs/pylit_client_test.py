@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Test the pylit_client.py thin client
+# ====================================
+#
+# :Copyright: 2026 Lauro Cavalcanti de Sa.
+#             Released under the terms of the GNU General Public License
+#             (v. 3 or later)
+#
+# .. contents::
+
+import threading
+
+import pylit
+
+from pylit_client import *
+
+# Test source samples
+# ===================
+#
+# ::
+
+text = ("Documentation\n"
+        "\n"
+        "::\n"
+        "\n"
+        "  x = 1\n")
+
+code = ("# Documentation\n"
+        "# \n"
+        "# ::\n"
+        "\n"
+        "x = 1\n")
+
+# Test cases
+# ==========
+#
+# ::
+
+def test_client_action():
+    assert client_action(["a.py.txt"]) == "convert"
+    assert client_action(["--diff", "a.py.txt"]) == "diff"
+    assert client_action(["-sd", "a.py.txt"]) == "diff"
+    assert client_action(["-m.. code::", "a.py.txt"]) == "convert"
+    assert client_action(["-e", "a.py.txt"]) is None
+    assert client_action(["--doctest", "a.py.txt"]) is None
+    assert client_action(["-"]) is None
+
+def test_socket_option():
+    assert socket_option(["--socket", "/tmp/s", "a"]) == "/tmp/s"
+    assert socket_option(["--socket=/tmp/s", "a"]) == "/tmp/s"
+    assert socket_option(["a"]) is None
+
+def test_default_socket_path():
+    assert default_socket_path() == pylit.default_socket_path()
+
+# A conversion server on a temporary socket and the paths of a text source
+# and its code output::
+
+def run_server(socket_path):
+    server = pylit.make_server(socket_path, workers=1)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    return (server, thread)
+
+def stop_server(server, thread):
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+def write_source(tmp_path):
+    txtpath = tmp_path / "mod.py.txt"
+    txtpath.write_text(text)
+    return (str(txtpath), str(tmp_path / "mod.py"))
+
+def test_request_server(tmp_path):
+    """the client and pylit send the same request"""
+    socket_path = str(tmp_path / "server.sock")
+    (txtpath, outpath) = write_source(tmp_path)
+    request = {"args": [txtpath, "-"]}
+    (server, thread) = run_server(socket_path)
+    try:
+        response = request_server(request, socket_path)
+        assert response == pylit.request_server(request, socket_path)
+    finally:
+        stop_server(server, thread)
+    assert response == {"output": code}
+
+def test_main_server(tmp_path):
+    socket_path = str(tmp_path / "server.sock")
+    (txtpath, outpath) = write_source(tmp_path)
+    (server, thread) = run_server(socket_path)
+    try:
+        main(["--socket=" + socket_path, txtpath, outpath])
+        assert len(server.cache) == 1, "converted by the server"
+    finally:
+        stop_server(server, thread)
+    assert open(outpath).read() == code
+
+def test_main_fallback(tmp_path):
+    """convert in-process if no server is running"""
+    (txtpath, outpath) = write_source(tmp_path)
+    main(["--socket=" + str(tmp_path / "server.sock"), txtpath, outpath])
+    assert open(outpath).read() == code
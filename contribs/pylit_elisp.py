@@ -25,6 +25,8 @@
 # :0.3: * Rewrite filter as iterator generators, the filter interface is 
 #         moved to pylit.py(GM)
 #       * require three semicolons (``;;;``) in section header regexp
+# :0.4: Register declarative filters (`pylit.LineFilter`).
+# :0.5: Language profile for lazy loading, no registration on import.
 # ::
 
 """Emacs lisp for the PyLit code<->text converter.
@@ -34,7 +36,7 @@ Defaults and filters for elisp (emacs lisp) code
 
 __docformat__ = 'restructuredtext'
 
-_version = "0.3"
+_version = "0.5"
 
 
 # Requirements
@@ -89,7 +91,7 @@ def elisp_code_preprocessor(data):
     
     for line in data:
         if SECTION_PATTERN.match(line):
-            yield pylit.defaults.comment_strings["elisp"] + '.. |elisp> ' + line
+            yield ELISP_PREFIX + line
         else:
             yield line
 
@@ -114,7 +116,7 @@ def elisp_code_postprocessor(data):
     """
     
     # Set the prefix to be stripped
-    prefix = pylit.defaults.comment_strings["elisp"] + '.. |elisp> '
+    prefix = ELISP_PREFIX
     
     for line in data:
         if line.startswith(prefix):
@@ -127,17 +129,36 @@ def elisp_code_postprocessor(data):
 # Register elisp
 # ==============
 # 
-# Add default values for "elisp" to the `defaults` object from PyLit.
-# 
-# The following code assumes that this plug-in is always evaluated in the
-# pylit namespace and after pylit.py
-# 
+# The settings for "elisp" are registered in the `defaults` object from PyLit
+# when a converter for elisp is set up (e.g. for a file with extension
+# ``.el``). PyLit knows this plug-in (`pylit.defaults.plugins`), installed
+# packages with other plug-ins declare entry points for the profile (see
+# `language plugins` in pylit.py)::
+#
+#   [project.entry-points."pylit.languages"]
+#   elisp = "pylit_elisp:profile"
+#   ".el" = "pylit_elisp:profile"
+#
 # ::
 
-pylit.defaults.languages[".el"] = "elisp"
-pylit.defaults.comment_strings["elisp"] = ';; '
+COMMENT_STRING = ';; '
+ELISP_PREFIX = COMMENT_STRING + '.. |elisp> '
+
+# The filters are `pylit.LineFilter` rule tables equivalent to the generator
+# functions above (see `declarative filters` in pylit.py)::
+
+elisp_preprocessor = pylit.LineFilter(
+    [pylit.Substitute('^(?=;;; *(Change *Log|Code|Commentary|Documentation'
+                      '|History):)', ELISP_PREFIX, re.IGNORECASE,
+                      prefix=";;;")],
+    name="elisp_preprocessor")
 
-# Filters
-pylit.defaults.preprocessors["elisp2text"] = elisp_code_preprocessor
-pylit.defaults.postprocessors["text2elisp"] = elisp_code_postprocessor
+elisp_postprocessor = pylit.LineFilter(
+    [pylit.Rewrite(ELISP_PREFIX, "")], name="elisp_postprocessor")
 
+# Language profile
+profile = {"language": "elisp",
+           "extensions": [".el"],
+           "comment_string": COMMENT_STRING,
+           "preprocessor": elisp_preprocessor,
+           "postprocessor": elisp_postprocessor}
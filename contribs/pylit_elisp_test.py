@@ -87,10 +87,19 @@ def test_elisp_code_postprocessor():
         assert output == soll
     
 def test_elisp_settings():
+    assert code_language(".el") == "elisp"
+    assert "elisp" in language_names()
+    assert load_plugin("elisp") == "elisp"
     assert defaults.languages[".el"] == "elisp"
     assert defaults.comment_strings["elisp"] == ';; '
-    assert defaults.preprocessors["elisp2text"] == elisp_code_preprocessor
-    assert defaults.postprocessors["text2elisp"] == elisp_code_postprocessor
+    assert defaults.preprocessors["elisp2text"] == elisp_preprocessor
+    assert defaults.postprocessors["text2elisp"] == elisp_postprocessor
+
+def test_elisp_line_filters():
+    """the registered filters are equivalent to the generator functions"""
+    for key in code.keys():
+        assert list(elisp_preprocessor(code[key])) == filtered_code[key]
+        assert list(elisp_postprocessor(filtered_code[key])) == code[key]
 
 def test_elisp2text():
     for key in code.keys():
@@ -105,12 +114,12 @@ def test_elisp2text():
 class test_Code2Text(object):
     def test_setup(self):
         converter = Code2Text(text['simple'], language="elisp")
-        assert converter.preprocessor == elisp_code_preprocessor
+        assert converter.preprocessor == elisp_preprocessor
 
 class test_Text2Code(object):
     def test_setup(self):
         converter = Text2Code(text['simple'], language="elisp")
-        assert converter.postprocessor == elisp_code_postprocessor
+        assert converter.postprocessor == elisp_postprocessor
 
     def test_call_without_filter(self):
         for key in code.keys():
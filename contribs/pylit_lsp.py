@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ===============================================================
+# pylit_lsp.py: Language Server Protocol server for PyLit
+# ===============================================================
+#
+# :Copyright: 2026 Lauro Cavalcanti de Sa.
+#             Released under the terms of the GNU General Public License
+#             (v. 3 or later)
+#
+# .. contents::
+
+# Frontmatter
+# ===========
+#
+# Changelog
+# ---------
+#
+# :0.1: Initial version.
+# ::
+
+"""Language server for PyLit literate documents.
+
+Keep open text or code sources in memory, convert them incrementally with
+`pylit.TextCodeConverter.convert_blocks` and answer requests for the
+converted view and the mapping of line numbers between the two formats.
+"""
+
+__docformat__ = 'restructuredtext'
+
+_version = "0.1"
+
+# Editor integrations that call pylit after every pause in typing pay for a
+# new process and a complete conversion every time. The language server
+# runs as a child process of the editor and talks the `Language Server
+# Protocol`_ over stdin and stdout. It keeps open documents in memory,
+# applies incremental edits, and reconverts only the blocks affected by an
+# edit.
+#
+# Besides the standard document synchronisation, the server answers the
+# custom requests
+#
+# :pylit/convertedView: the converted document (text <-> code),
+# :pylit/mapLine:       line number in the converted view for a line in
+#                       the document,
+# :pylit/mapLineBack:   line number in the document for a line in the
+#                       converted view.
+#
+# Errors of the conversion (e.g. a code line that is less indented than the
+# code block) and lines that change in a round-trip conversion are published
+# as diagnostics.
+#
+# .. _Language Server Protocol:
+#     https://microsoft.github.io/language-server-protocol/
+#
+# Requirements
+# ------------
+#
+# ::
+
+import difflib, json, sys
+
+import pylit
+
+# Messages
+# ========
+#
+# Messages are JSON objects preceded by a header with the ``Content-Length``
+# in bytes, separated from the content by a blank line.
+#
+# read_message
+# ------------
+#
+# Return the next message from the binary `stream` or None at the end of
+# the input::
+
+def read_message(stream):
+    """Read and return a message object from `stream`"""
+    length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, value = line.decode('ascii').split(":", 1)
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    if length is None:
+        raise ValueError("message without Content-Length header")
+    return json.loads(stream.read(length).decode('utf-8'))
+
+# write_message
+# -------------
+# ::
+
+def write_message(stream, message):
+    """Write `message` object to the binary `stream`"""
+    content = json.dumps(message).encode('utf-8')
+    stream.write(b"Content-Length: %d\r\n\r\n" % len(content))
+    stream.write(content)
+    stream.flush()
+
+
+# Documents
+# =========
+#
+# apply_change
+# ------------
+#
+# Apply a ``contentChanges`` item of a ``textDocument/didChange``
+# notification to the list of `lines`. A change without range replaces the
+# document. Positions count characters (LSP counts UTF-16 code units, this
+# only differs for characters outside the Basic Multilingual Plane). ::
+
+def apply_change(lines, change):
+    """Return list of lines with `change` applied"""
+    if "range" not in change:
+        return change["text"].splitlines(True)
+    start = change["range"]["start"]
+    end = change["range"]["end"]
+    head = tail = ""
+    if start["line"] < len(lines):
+        head = lines[start["line"]][:start["character"]]
+    if end["line"] < len(lines):
+        tail = lines[end["line"]][end["character"]:]
+    lines = list(lines)
+    lines[start["line"]:end["line"]+1] = (head + change["text"]
+                                          + tail).splitlines(True)
+    return lines
+
+# The file name of a document URI (``file:///tmp/a%20b.py`` is
+# ``/tmp/a b.py``)::
+
+def uri_path(uri):
+    """Return the path of the document `uri`"""
+    from urllib.parse import unquote, urlparse
+    return unquote(urlparse(uri).path)
+
+# Document
+# --------
+#
+# An open document with its converter and the results of the last
+# conversion. ::
+
+class Document(object):
+    """Open text or code source"""
+
+# The conversion direction and language are determined from the file name
+# like on the command line (cf. `pylit.PylitOptions`).
+# Every document keeps memos of block conversions (in both directions) for
+# `pylit.TextCodeConverter.convert_blocks` and of the round-trip
+# differences of the blocks (see diagnostics_). ::
+
+    def __init__(self, uri, text, memo_size=4096):
+        self.uri = uri
+        self.lines = text.splitlines(True)
+        options = pylit.PylitOptions()([uri_path(uri), "-"]).as_dict()
+        self.txt2code = options["txt2code"]
+        self.converter = pylit.get_converter(**options)
+        options["txt2code"] = not self.txt2code
+        self.back_converter = pylit.get_converter(**options)
+        self.memo = pylit.LRUCache(memo_size)
+        self.back_memo = pylit.LRUCache(memo_size)
+        self.diff_memo = pylit.LRUCache(memo_size)
+        self.update()
+
+# Convert the document and set up the line mapping. `forward[i]` is the
+# line in the converted view for line `i` of the document, `backward[j]`
+# the line of the document for line `j` of the converted view.
+#
+# Handlers keep the number of lines in a block, with two exceptions: the
+# `Code2Text` converter inserts a code block marker at the start of a code
+# block and stripping the marker removes lines at the end of a documentation
+# block. The mapping takes this into account.
+#
+# `spans` lists the line ranges of every block in the document and in the
+# converted view as ``(start, end, output start, output end)`` tuples. ::
+
+    def update(self):
+        """Convert the document"""
+        self.errors = []
+        self.output = []
+        self.forward = []
+        self.backward = []
+        self.spans = []
+        blocks = self.converter.convert_blocks(self.lines, self.memo,
+                                               self.errors)
+        for (state, block, output) in blocks:
+            offset = 0
+            if state == "code_block" and len(output) > len(block):
+                offset = len(output) - len(block)
+            start = len(self.output)
+            last = max(len(output) - 1, 0)
+            for i in range(len(block)):
+                self.forward.append(start + min(i + offset, last))
+            first = len(self.forward) - len(block)
+            for j in range(len(output)):
+                self.backward.append(first + min(max(j - offset, 0),
+                                                 len(block) - 1))
+            self.spans.append((first, first + len(block),
+                               start, start + len(output)))
+            self.output.extend(output)
+
+    def map_line(self, line):
+        """Return line in converted view for `line` of the document"""
+        if not self.forward:
+            return 0
+        return self.forward[min(line, len(self.forward) - 1)]
+
+    def map_line_back(self, line):
+        """Return line of the document for `line` of the converted view"""
+        if not self.backward:
+            return 0
+        return self.backward[min(line, len(self.backward) - 1)]
+
+# diagnostics
+# ~~~~~~~~~~~
+#
+# Report conversion errors and lines that are changed by a round-trip
+# conversion (e.g. comments that would become documentation).
+#
+# The back-conversion of the converted view is done block-wise with its own
+# memo, so only the blocks affected by an edit are converted again. Blocks
+# of the back-conversion are compared with the blocks of the document they
+# stem from. (Usually, the blocks coincide. Otherwise, consecutive blocks
+# are grouped until the block boundaries in the converted view match.) The
+# differences are memoized, so only changed blocks are diffed. ::
+
+    def diagnostics(self):
+        """Return list of LSP diagnostics for the document"""
+        result = []
+        for (lineno, ex) in self.errors:
+            result.append(self._diagnostic(lineno, 1, str(ex)))
+        if self.errors:
+            return result
+        boundaries = dict((out_end, end)
+                          for (start, end, out_start, out_end) in self.spans)
+        groups = []
+        start = position = 0
+        lines = []
+        for (state, block, back) in self.back_converter.convert_blocks(
+                                        self.output, self.back_memo):
+            lines.extend(back)
+            position += len(block)
+            if position in boundaries:
+                groups.append((start, boundaries[position], lines))
+                start = boundaries[position]
+                lines = []
+        if lines or start < len(self.lines):
+            groups.append((start, len(self.lines), lines))
+        for (start, end, back) in groups:
+            for (lineno, message) in self.round_trip_changes(
+                                        self.lines[start:end], back):
+                result.append(self._diagnostic(start + lineno, 2, message))
+        return result
+
+# Return the ``(line number, message)`` tuples for the lines of `source`
+# changed in the round-trip conversion `back`::
+
+    def round_trip_changes(self, source, back):
+        """Return list of differences between `source` and `back`"""
+        if source == back:
+            return []
+        key = (tuple(source), tuple(back))
+        changes = self.diff_memo.get(key)
+        if changes is None:
+            matcher = difflib.SequenceMatcher(None, source, back,
+                                              autojunk=False)
+            changes = [(i1, "round-trip conversion changes this line: %r"
+                            % "".join(back[j1:j2]))
+                       for (tag, i1, i2, j1, j2) in matcher.get_opcodes()
+                       if tag != "equal"]
+            self.diff_memo[key] = changes
+        return changes
+
+    def _diagnostic(self, line, severity, message):
+        return {"range": {"start": {"line": line, "character": 0},
+                          "end": {"line": line + 1, "character": 0}},
+                "severity": severity, "source": "pylit",
+                "message": message}
+
+
+# Server
+# ======
+#
+# LanguageServer
+# --------------
+#
+# The server reads messages from `instream` and writes responses and
+# notifications to `outstream` (binary streams). Requests and notifications
+# are dispatched to the methods listed in the `handlers` table, unknown
+# methods are answered with an error (requests) or ignored
+# (notifications). Errors in a handler are reported in the response
+# (requests) or with a ``window/logMessage`` notification, they do not stop
+# the server. ::
+
+class LanguageServer(object):
+    """Language server for PyLit literate documents"""
+
+    handlers = {"initialize": "initialize",
+                "shutdown": "shutdown",
+                "exit": "exit",
+                "textDocument/didOpen": "textDocument_didOpen",
+                "textDocument/didChange": "textDocument_didChange",
+                "textDocument/didClose": "textDocument_didClose",
+                "pylit/convertedView": "pylit_convertedView",
+                "pylit/mapLine": "pylit_mapLine",
+                "pylit/mapLineBack": "pylit_mapLineBack"}
+
+    def __init__(self, instream, outstream):
+        self.instream = instream
+        self.outstream = outstream
+        self.documents = {}
+        self.running = True
+
+    def run(self):
+        """Process messages until the `exit` notification"""
+        while self.running:
+            message = read_message(self.instream)
+            if message is None:
+                break
+            self.dispatch(message)
+
+    def dispatch(self, message):
+        handler = None
+        if message.get("method") in self.handlers:
+            handler = getattr(self, self.handlers[message["method"]])
+        if "id" not in message: # notification
+            if handler is not None:
+                try:
+                    handler(message.get("params", {}))
+                except Exception as ex:
+                    self.notify("window/logMessage",
+                                {"type": 1, # Error
+                                 "message": "%s: %s: %s" % (
+                                     message["method"],
+                                     ex.__class__.__name__, ex)})
+            return
+        response = {"jsonrpc": "2.0", "id": message["id"]}
+        if handler is None:
+            response["error"] = {"code": -32601,
+                                 "message": "unknown method %r"
+                                 % message.get("method")}
+        else:
+            try:
+                response["result"] = handler(message.get("params", {}))
+            except Exception as ex:
+                response["error"] = {"code": -32603, "message": "%s: %s"
+                                     % (ex.__class__.__name__, ex)}
+        write_message(self.outstream, response)
+
+    def notify(self, method, params):
+        write_message(self.outstream,
+                      {"jsonrpc": "2.0", "method": method, "params": params})
+
+# Life cycle::
+
+    def initialize(self, params):
+        return {"capabilities": {"textDocumentSync": {"openClose": True,
+                                                      "change": 2}},
+                "serverInfo": {"name": "pylit", "version": pylit._version}}
+
+    def shutdown(self, params):
+        return None
+
+    def exit(self, params):
+        self.running = False
+
+# Document synchronisation::
+
+    def textDocument_didOpen(self, params):
+        item = params["textDocument"]
+        document = Document(item["uri"], item["text"])
+        self.documents[item["uri"]] = document
+        self.publish_diagnostics(document)
+
+    def textDocument_didChange(self, params):
+        document = self.documents[params["textDocument"]["uri"]]
+        for change in params["contentChanges"]:
+            document.lines = apply_change(document.lines, change)
+        document.update()
+        self.publish_diagnostics(document)
+
+    def textDocument_didClose(self, params):
+        self.documents.pop(params["textDocument"]["uri"], None)
+
+    def publish_diagnostics(self, document):
+        self.notify("textDocument/publishDiagnostics",
+                    {"uri": document.uri,
+                     "diagnostics": document.diagnostics()})
+
+# Custom requests::
+
+    def pylit_convertedView(self, params):
+        document = self.documents[params["textDocument"]["uri"]]
+        return {"text": "".join(document.output),
+                "txt2code": document.txt2code}
+
+    def pylit_mapLine(self, params):
+        document = self.documents[params["textDocument"]["uri"]]
+        return {"line": document.map_line(params["line"])}
+
+    def pylit_mapLineBack(self, params):
+        document = self.documents[params["textDocument"]["uri"]]
+        return {"line": document.map_line_back(params["line"])}
+
+
+# main
+# ====
+#
+# Run the server on stdin and stdout::
+
+def main():
+    LanguageServer(sys.stdin.buffer, sys.stdout.buffer).run()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Test the pylit_lsp.py language server
+# =====================================
+#
+# :Copyright: 2026 Lauro Cavalcanti de Sa.
+#             Released under the terms of the GNU General Public License
+#             (v. 3 or later)
+#
+# .. contents::
+
+import io
+
+from pylit_lsp import *
+
+# Test source samples
+# ===================
+#
+# ::
+
+code = ("# text\n"
+        "\n"
+        "x = 1\n")
+
+text = ("text\n"
+        "\n"
+        "::\n"
+        "\n"
+        "  x = 1\n")
+
+# Test cases
+# ==========
+#
+# ::
+
+def test_apply_change():
+    lines = ["abc\n", "def\n"]
+    change = {"range": {"start": {"line": 0, "character": 1},
+                        "end": {"line": 1, "character": 1}},
+              "text": "X\nY"}
+    assert apply_change(lines, change) == ["aX\n", "Yef\n"]
+    assert apply_change(lines, {"text": "new\n"}) == ["new\n"]
+
+def test_uri_path():
+    assert uri_path("file:///tmp/example.py") == "/tmp/example.py"
+    assert uri_path("file:///tmp/my%20example.py.txt") == (
+        "/tmp/my example.py.txt")
+
+class Test_Document(object):
+
+    def test_converted_view(self):
+        document = Document("file:///tmp/example.py", code)
+        assert "".join(document.output) == text
+
+    def test_map_line(self):
+        document = Document("file:///tmp/example.py", code)
+        # the code line follows the inserted code block marker
+        assert document.map_line(2) == 4
+        assert document.map_line_back(4) == 2
+        assert document.map_line(0) == 0
+
+    def test_incremental_update(self):
+        document = Document("file:///tmp/example.py", code)
+        document.lines[2] = "x = 2\n"
+        document.update()
+        assert document.output[-1] == "  x = 2\n"
+
+    def test_diagnostics(self):
+        document = Document("file:///tmp/example.py.txt",
+                            "text::\n\n   a\n  b\n")
+        diagnostics = document.diagnostics()
+        assert len(diagnostics) == 1
+        assert diagnostics[0]["severity"] == 1
+        assert diagnostics[0]["range"]["start"]["line"] == 2
+
+    def test_quoted_uri(self):
+        document = Document("file:///tmp/my%20example.py.txt", text)
+        assert document.txt2code
+        assert document.output[0] == "# text\n"
+
+    def test_round_trip_diagnostics(self):
+        document = Document("file:///tmp/example.py.txt",
+                            "text\n\n::\n\n  x = 1\n\nmore\n")
+        diagnostics = document.diagnostics()
+        # the blank line after the code becomes an indented blank line
+        assert [d["range"]["start"]["line"] for d in diagnostics] == [5]
+        assert diagnostics[0]["severity"] == 2
+        assert len(document.diff_memo) == 1
+        # the edit of another block does not diff the code block again
+        document.lines[0] = "new text\n"
+        document.update()
+        assert len(document.diagnostics()) == 1
+        assert len(document.diff_memo) == 1
+
+def test_server():
+    messages = [{"jsonrpc": "2.0", "id": 1, "method": "initialize",
+                 "params": {}},
+                {"jsonrpc": "2.0", "method": "textDocument/didOpen",
+                 "params": {"textDocument": {"uri": "file:///tmp/example.py",
+                                             "text": code}}},
+                {"jsonrpc": "2.0", "id": 2, "method": "pylit/convertedView",
+                 "params": {"textDocument":
+                            {"uri": "file:///tmp/example.py"}}},
+                {"jsonrpc": "2.0", "method": "exit"}]
+    instream = io.BytesIO()
+    for message in messages:
+        write_message(instream, message)
+    instream.seek(0)
+    outstream = io.BytesIO()
+    LanguageServer(instream, outstream).run()
+    outstream.seek(0)
+    responses = []
+    while True:
+        message = read_message(outstream)
+        if message is None:
+            break
+        responses.append(message)
+    assert responses[0]["id"] == 1
+    assert responses[1]["method"] == "textDocument/publishDiagnostics"
+    assert responses[2]["result"]["text"] == text
+
+def test_unknown_method():
+    instream = io.BytesIO()
+    for message in ({"jsonrpc": "2.0", "id": 1, "method": "__init__",
+                     "params": {}},
+                    {"jsonrpc": "2.0", "method": "run"}):
+        write_message(instream, message)
+    instream.seek(0)
+    outstream = io.BytesIO()
+    LanguageServer(instream, outstream).run()
+    outstream.seek(0)
+    assert read_message(outstream)["error"]["code"] == -32601
+    assert read_message(outstream) is None
+
+def test_notification_error():
+    """an error in a notification is logged, the server goes on"""
+    instream = io.BytesIO()
+    for message in ({"jsonrpc": "2.0", "method": "textDocument/didChange",
+                     "params": {"textDocument": {"uri": "file:///tmp/x.py"},
+                                "contentChanges": [{"text": code}]}},
+                    {"jsonrpc": "2.0", "id": 1, "method": "shutdown"}):
+        write_message(instream, message)
+    instream.seek(0)
+    outstream = io.BytesIO()
+    LanguageServer(instream, outstream).run()
+    outstream.seek(0)
+    log = read_message(outstream)
+    assert log["method"] == "window/logMessage"
+    assert log["params"]["type"] == 1
+    assert "KeyError" in log["params"]["message"]
+    assert read_message(outstream)["id"] == 1
+
+
+if __name__ == "__main__":
+    import nose
+    nose.runmodule() # requires nose 0.9.1
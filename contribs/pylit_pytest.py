@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ===============================================================
+# pylit_pytest.py: pytest plugin for doctests in literate sources
+# ===============================================================
+#
+# :Copyright: 2026 Lauro Cavalcanti de Sa.
+#             Released under the terms of the GNU General Public License
+#             (v. 3 or later)
+#
+# .. contents::
+
+# Frontmatter
+# ===========
+#
+# Changelog
+# ---------
+#
+# :0.1: Initial version.
+# ::
+
+"""pytest plugin collecting the doctests of PyLit literate sources.
+
+Text sources are tested like with ``pylit --doctest``, code sources with
+the doctests of their documentation (converted with `pylit.Code2Text`).
+Parsed doctests are cached by content hash in the pytest cache.
+"""
+
+__docformat__ = 'restructuredtext'
+
+_version = "0.1"
+
+# `pylit.run_doctest` tests one file from the command line. The plugin
+# collects the doctests of literate sources as pytest items instead, so they
+# run together with the other tests of a project, are reported by pytest
+# and can be distributed with ``pytest-xdist``.
+#
+# Enable the plugin with ``-p pylit_pytest`` (or ``pytest_plugins =
+# ["pylit_pytest"]`` in a ``conftest.py``) and select the sources with the
+# options
+#
+# :--pylit-doctest:      collect the doctests of text sources with a code
+#                        extension (e.g. ``module.py.txt``),
+# :--pylit-doctest-code: also collect the doctests in the documentation of
+#                        code sources (e.g. ``module.py``).
+#
+# The examples of a file share their globals (like with ``pylit --doctest``),
+# so every file is one test item: with ``pytest-xdist`` the examples of a
+# file always run in the same worker.
+#
+# Parsing a source (conversion of code sources and the doctest parser) is
+# cached in the pytest cache (``.pytest_cache``) with the hash of the file
+# content as key. Repeated runs over unchanged files only read the cache.
+# Parallel workers write distinct keys, there is no shared state to lock.
+#
+# Failures are reported with the line numbers of the literate source:
+# `pylit.Code2Text.doctest_lines` keeps the line numbers of code sources.
+#
+# Sources are decoded with the encoding declared in a coding comment (`PEP
+# 263`_) in the first two lines (default: UTF-8). The ini-option
+# ``pylit_doctest_encoding`` sets the encoding of all sources instead.
+#
+# .. _PEP 263: https://www.python.org/dev/peps/pep-0263/
+#
+# Requirements
+# ------------
+#
+# ::
+
+import doctest, os, re, tokenize
+
+import pytest
+
+import pylit
+
+# Options
+# =======
+#
+# ::
+
+def pytest_addoption(parser):
+    group = parser.getgroup("pylit")
+    group.addoption("--pylit-doctest", action="store_true",
+                    dest="pylit_doctest",
+                    help="run doctests in literate text sources")
+    group.addoption("--pylit-doctest-code", action="store_true",
+                    dest="pylit_doctest_code",
+                    help="run doctests in the documentation of code sources")
+    parser.addini("pylit_doctest_optionflags", type="args", default=[],
+                  help="doctest option flags for literate sources "
+                  "(default: none, like pylit --doctest)")
+    parser.addini("pylit_doctest_encoding", default=None,
+                  help="encoding of literate sources "
+                  "(default: coding comment or UTF-8)")
+
+
+# Collection
+# ==========
+#
+# Select text sources whose name has a language extension (like
+# `pylit.PylitOptions`) and, optionally, code sources of known languages::
+
+def pytest_collect_file(file_path, parent):
+    config = parent.config
+    (base, ext) = os.path.splitext(file_path.name)
+    if ext in pylit.defaults.text_extensions:
+        if (config.getoption("pylit_doctest")
+            and pylit.code_language(os.path.splitext(base)[1])):
+            return LiterateDoctestFile.from_parent(parent, path=file_path)
+    elif (config.getoption("pylit_doctest_code")
+          and pylit.code_language(ext)):
+        return LiterateDoctestFile.from_parent(parent, path=file_path)
+    return None
+
+# read_source
+# -----------
+#
+# Return the lines of the source `path`. Code sources are decoded like
+# Python modules (`tokenize.detect_encoding`), text sources with the
+# encoding of a coding comment in one of the first two lines (any markup,
+# e.g. ``.. -*- coding: latin-1 -*-``)::
+
+_coding_regexp = re.compile(br"coding[=:]\s*([-\w.]+)")
+
+def read_source(path, txt2code=True, encoding=None):
+    """Return list of lines of the source `path`"""
+    if encoding is None:
+        stream = open(path, "rb")
+        try:
+            if txt2code:
+                match = _coding_regexp.search(stream.readline()
+                                              + stream.readline())
+                encoding = match and match.group(1).decode("ascii")
+            else:
+                (encoding, lines) = tokenize.detect_encoding(stream.readline)
+        finally:
+            stream.close()
+    stream = open(path, encoding=encoding or "utf-8")
+    try:
+        return stream.readlines()
+    finally:
+        stream.close()
+
+# parse_examples
+# --------------
+#
+# Return the doctest examples of the literate source `data` as a list of
+# dictionaries (the form stored in the cache). `options` are the completed
+# `pylit.PylitOptions` values for the file. ::
+
+_example_attributes = ("source", "want", "exc_msg", "lineno", "indent")
+
+def parse_examples(data, options):
+    """Return list of doctest examples of `data` as dictionaries"""
+    if options.txt2code:
+        text = "".join(data)
+    else:
+        converter = pylit.get_converter(**options.as_dict())
+        text = "".join(converter.doctest_lines(data))
+    examples = []
+    for group in pylit.doctest_groups(text):
+        for example in group:
+            item = dict((name, getattr(example, name))
+                        for name in _example_attributes)
+            item["options"] = [[flag, value] for (flag, value)
+                               in example.options.items()]
+            examples.append(item)
+    return examples
+
+# LiterateDoctestFile
+# -------------------
+#
+# The collector reads the source, looks up the parsed examples in the cache
+# (key: hash of content, conversion settings, and the versions of pylit
+# and the plugin) and yields one item for the file. ::
+
+class LiterateDoctestFile(pytest.File):
+
+    def collect(self):
+        options = pylit.PylitOptions()([str(self.path), "-"])
+        data = read_source(str(self.path), options.txt2code,
+                           self.config.getini("pylit_doctest_encoding"))
+        key = "pylit/doctest/%s" % pylit.content_hash(
+            data, pylit.converter_settings(**options.as_dict()),
+            pylit._version, _version)
+        cache = getattr(self.config, "cache", None)
+        examples = None
+        if cache is not None:
+            examples = cache.get(key, None)
+        if examples is None:
+            examples = parse_examples(data, options)
+            if cache is not None:
+                cache.set(key, examples)
+        if examples:
+            yield LiterateDoctestItem.from_parent(self, name=self.path.name,
+                                                  examples=examples)
+
+# Test items
+# ==========
+#
+# LiterateDoctestFailure
+# ----------------------
+#
+# Raised with the list of (example, message) pairs of a failed run::
+
+class LiterateDoctestFailure(Exception):
+    pass
+
+# LiterateDoctestRunner
+# ---------------------
+#
+# Run all examples and record failures and unexpected exceptions instead of
+# printing them::
+
+class LiterateDoctestRunner(doctest.DocTestRunner):
+
+    def __init__(self, optionflags=0):
+        doctest.DocTestRunner.__init__(self, verbose=False,
+                                       optionflags=optionflags)
+        self.problems = []
+
+    def report_failure(self, out, test, example, got):
+        self.problems.append((example, self._checker.output_difference(
+            example, got, self.optionflags)))
+
+    def report_unexpected_exception(self, out, test, example, exc_info):
+        self.problems.append((example, "Exception raised:\n"
+                              + doctest._exception_traceback(exc_info)))
+
+# LiterateDoctestItem
+# -------------------
+#
+# ::
+
+class LiterateDoctestItem(pytest.Item):
+
+    def __init__(self, name, parent, examples, **keyw):
+        pytest.Item.__init__(self, name, parent, **keyw)
+        self.examples = examples
+
+    def optionflags(self):
+        flags = 0
+        for name in self.config.getini("pylit_doctest_optionflags"):
+            flags |= doctest.OPTIONFLAGS_BY_NAME[name]
+        return flags
+
+# Rebuild the `doctest.DocTest` from the cached examples. The line numbers
+# of the examples are relative to the start of the file (``lineno = 0``)::
+
+    def runtest(self):
+        examples = []
+        for item in self.examples:
+            example = doctest.Example(item["source"], item["want"],
+                                      item["exc_msg"], item["lineno"],
+                                      item["indent"], dict(item["options"]))
+            examples.append(example)
+        globs = {"__name__": "__main__", "__file__": str(self.path)}
+        test = doctest.DocTest(examples, globs, self.name, str(self.path),
+                               0, None)
+        runner = LiterateDoctestRunner(self.optionflags())
+        runner.run(test, clear_globs=True)
+        if runner.problems:
+            raise LiterateDoctestFailure(runner.problems)
+
+    def repr_failure(self, excinfo):
+        if not isinstance(excinfo.value, LiterateDoctestFailure):
+            return pytest.Item.repr_failure(self, excinfo)
+        lines = []
+        for (example, message) in excinfo.value.args[0]:
+            lines.append("%s:%d: doctest failed" % (self.path,
+                                                    example.lineno + 1))
+            for (i, line) in enumerate(example.source.splitlines()):
+                lines.append("%s %s" % (i and "..." or ">>>", line))
+            lines.append(message.rstrip("\n"))
+            lines.append("")
+        return "\n".join(lines)
+
+    def reportinfo(self):
+        return (self.path, self.examples[0]["lineno"],
+                "[pylit-doctest] %s" % self.name)
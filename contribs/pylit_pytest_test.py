@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Test the pylit_pytest.py plugin
+# ===============================
+#
+# :Copyright: 2026 Lauro Cavalcanti de Sa.
+#             Released under the terms of the GNU General Public License
+#             (v. 3 or later)
+#
+# .. contents::
+
+import os
+
+import pylit
+from pylit_pytest import *
+
+pytest_plugins = ["pytester"]
+
+# Test source samples
+# ===================
+#
+# ::
+
+text = ("Literate module\n"
+        "\n"
+        ">>> x = 1\n"
+        "\n"
+        "::\n"
+        "\n"
+        "  y = 2\n"
+        "\n"
+        ">>> x\n"
+        "1\n")
+
+code = ("# Literate module\n"
+        "#\n"
+        "# >>> x = 1\n"
+        "\n"
+        "y = 2\n"
+        "\n"
+        "# >>> x\n"
+        "# 2\n")
+
+# Test cases
+# ==========
+#
+# ::
+
+def test_parse_examples():
+    options = pylit.PylitOptions()(["example.py", "-"])
+    examples = parse_examples(code.splitlines(True), options)
+    assert [example["lineno"] for example in examples] == [2, 6]
+    assert examples[1]["source"] == "x\n"
+
+def test_text_source(pytester):
+    pytester.makefile(".py.txt", example=text)
+    result = pytester.runpytest("-p", "pylit_pytest", "--pylit-doctest")
+    result.assert_outcomes(passed=1)
+    keys = os.listdir(str(pytester.path.joinpath(".pytest_cache", "v",
+                                                 "pylit", "doctest")))
+    assert len(keys) == 1
+    # the cached examples are used in the second run
+    result = pytester.runpytest("-p", "pylit_pytest", "--pylit-doctest")
+    result.assert_outcomes(passed=1)
+
+def test_pylit_version(pytester, monkeypatch):
+    """another pylit version does not use the cached examples"""
+    pytester.makefile(".py.txt", example=text)
+    pytester.runpytest("-p", "pylit_pytest", "--pylit-doctest")
+    monkeypatch.setattr(pylit, "_version", pylit._version + ".dev")
+    result = pytester.runpytest("-p", "pylit_pytest", "--pylit-doctest")
+    result.assert_outcomes(passed=1)
+    keys = os.listdir(str(pytester.path.joinpath(".pytest_cache", "v",
+                                                 "pylit", "doctest")))
+    assert len(keys) == 2
+
+def test_code_source(pytester):
+    pytester.makefile(".py", example=code)
+    result = pytester.runpytest("-p", "pylit_pytest", "--pylit-doctest-code",
+                                "-p", "no:python")
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines(["*example.py:7: doctest failed",
+                                 ">>> x", "Expected:", "    2",
+                                 "Got:", "    1"])
+
+# No option flags are set by default (like with ``pylit --doctest``)::
+
+def test_optionflags(pytester):
+    pytester.makefile(".py.txt", example="Text\n\n>>> 'a b c'\n'a ... c'\n")
+    result = pytester.runpytest("-p", "pylit_pytest", "--pylit-doctest")
+    result.assert_outcomes(failed=1)
+    pytester.makeini("[pytest]\npylit_doctest_optionflags = ELLIPSIS\n")
+    result = pytester.runpytest("-p", "pylit_pytest", "--pylit-doctest")
+    result.assert_outcomes(passed=1)
+
+def test_coding_comment(pytester):
+    source = (u"# -*- coding: latin-1 -*-\n"
+              u"#\n"
+              u"# >>> u'\u00e4'\n"
+              u"# '\u00e4'\n")
+    pytester.path.joinpath("example.py").write_bytes(
+        source.encode("latin-1"))
+    result = pytester.runpytest("-p", "pylit_pytest", "--pylit-doctest-code",
+                                "-p", "no:python")
+    result.assert_outcomes(passed=1)
+
+def test_encoding_option(pytester):
+    pytester.makeini("[pytest]\npylit_doctest_encoding = latin-1\n")
+    pytester.path.joinpath("example.py.txt").write_bytes(
+        u"Text\n\n>>> u'\u00e4'\n'\u00e4'\n".encode("latin-1"))
+    result = pytester.runpytest("-p", "pylit_pytest", "--pylit-doctest")
+    result.assert_outcomes(passed=1)
+
+if __name__ == "__main__":
+    import nose
+    nose.runmodule() # requires nose 0.9.1
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ===============================================================
+# pylit_setuptools.py: tangle literate sources when building packages
+# ===============================================================
+#
+# :Copyright: 2026 Lauro Cavalcanti de Sa.
+#             Released under the terms of the GNU General Public License
+#             (v. 3 or later)
+#
+# .. contents::
+
+# Frontmatter
+# ===========
+#
+# Changelog
+# ---------
+#
+# :0.1: Initial version.
+# ::
+
+"""Setuptools build hook for packages with literate ``.py.txt`` modules.
+
+The `build_py` command converts the text sources of the packages with
+`pylit.Text2Code` in parallel and writes the modules into the build
+directory. Unchanged sources are skipped with a content-hash cache.
+"""
+
+__docformat__ = 'restructuredtext'
+
+_version = "0.1"
+
+# Packages whose modules exist only as literate text sources
+# (``module.py.txt``) need the code version in the wheel. Instead of a
+# pre-build script that converts everything on every build, replace the
+# `build_py` command of setuptools. With a PEP 517 build (``setuptools.
+# build_meta`` backend) this is configured in ``pyproject.toml``::
+#
+#   [build-system]
+#   requires = ["setuptools>=64", "pylit"]
+#   build-backend = "setuptools.build_meta"
+#
+#   [tool.setuptools.cmdclass]
+#   build_py = "pylit_setuptools.build_py"
+#
+# or with ``cmdclass={"build_py": pylit_setuptools.build_py}`` in
+# ``setup.py``.
+#
+# The command accepts the options
+#
+# :pylit-strip:   strip the documentation (default: keep it as comments),
+# :pylit-workers: number of conversion processes (default: number of CPUs).
+#
+# They can be set in ``setup.cfg``::
+#
+#   [build_py]
+#   pylit_strip = 1
+#
+# The converted modules are written to the build directory only. A cache
+# file in the build base directory (``build/pylit-cache.json``) records the
+# hash of every source with the conversion settings and the hash of the
+# output, so a repeated build converts only changed sources.
+#
+# Requirements
+# ------------
+#
+# ::
+
+import glob, json, os, re
+
+from setuptools.command.build_py import build_py as _build_py
+
+import pylit
+
+# Conversion
+# ==========
+#
+# source_encoding
+# ---------------
+#
+# The encoding of a text source is given by a coding comment (PEP 263) in
+# the first two lines, like in `pylit_pytest.read_source`. The default is
+# UTF-8. The code output keeps the comment, so it is written with the same
+# encoding::
+
+_coding_regexp = re.compile(br"coding[=:]\s*([-\w.]+)")
+
+def source_encoding(path):
+    """Return the encoding of the text source `path`"""
+    stream = open(path, "rb")
+    try:
+        match = _coding_regexp.search(stream.readline() + stream.readline())
+    finally:
+        stream.close()
+    return match and match.group(1).decode("ascii") or "utf-8"
+
+# tangle_job
+# ----------
+#
+# Convert one text source to the code file `target`. The function runs in
+# a worker process and returns the target with the hash of its content::
+
+def tangle_job(source, target, settings):
+    """Convert `source` to `target`, return (target, output hash)"""
+    encoding = source_encoding(source)
+    stream = open(source, encoding=encoding)
+    data = stream.readlines()
+    stream.close()
+    output = "".join(pylit.Text2Code(data, **settings)())
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    stream = open(target, "w", encoding=encoding)
+    stream.write(output)
+    stream.close()
+    return (target, pylit.content_hash(output))
+
+# The hash of an existing output file, to detect modified targets::
+
+def output_hash(path, encoding="utf-8"):
+    """Return hash of the content of the text file `path`"""
+    stream = open(path, encoding=encoding)
+    digest = pylit.content_hash(stream.read())
+    stream.close()
+    return digest
+
+# tangle_sources
+# --------------
+#
+# Convert the text sources in the list of (source, target) `pairs` in
+# parallel. Sources whose hash (including the conversion settings) is
+# recorded in the `cache_file` together with an unmodified target are
+# skipped. Return the list of converted targets. ::
+
+def tangle_sources(pairs, strip=False, workers=None, cache_file=None):
+    """Convert text sources to code in parallel, skip unchanged ones"""
+    import concurrent.futures
+    settings = {"strip": strip}
+    cache = {}
+    if cache_file and os.path.exists(cache_file):
+        stream = open(cache_file)
+        try:
+            cache = json.load(stream)
+        except ValueError:
+            cache = {}
+        stream.close()
+    jobs = {}
+    for (source, target) in pairs:
+        source_hash = pylit.content_hash(pylit.file_hash(source),
+                                         pylit.converter_settings(**settings))
+        (cached_source, cached_target) = cache.get(target, (None, None))
+        if (cached_source == source_hash and os.path.exists(target)
+            and output_hash(target, source_encoding(source))
+                == cached_target):
+            continue
+        jobs[target] = (source, source_hash)
+    if jobs:
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(tangle_job, source, target, settings)
+                       for (target, (source, source_hash)) in jobs.items()]
+            for future in futures:
+                (target, digest) = future.result()
+                cache[target] = (jobs[target][1], digest)
+    if cache_file:
+        os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+        stream = open(cache_file, "w")
+        json.dump(cache, stream, indent=1, sort_keys=True)
+        stream.close()
+    return sorted(jobs)
+
+
+# build_py
+# ========
+#
+# The command builds the pure Python modules like the setuptools command and
+# adds the modules converted from ``*.py.txt`` files in the package
+# directories. A code module next to its text source takes precedence. ::
+
+class build_py(_build_py):
+    """Build pure Python modules, tangle literate text sources"""
+
+    user_options = _build_py.user_options + [
+        ("pylit-strip", None, "strip documentation from literate sources"),
+        ("pylit-workers=", None, "number of parallel conversions"),
+    ]
+    boolean_options = _build_py.boolean_options + ["pylit-strip"]
+
+    def initialize_options(self):
+        _build_py.initialize_options(self)
+        self.pylit_strip = False
+        self.pylit_workers = None
+
+    def finalize_options(self):
+        _build_py.finalize_options(self)
+        self.pylit_strip = bool(int(self.pylit_strip or 0))
+        if self.pylit_workers is not None:
+            self.pylit_workers = int(self.pylit_workers)
+
+# Return (source, target) pairs for the text sources of all packages::
+
+    def find_literate_modules(self):
+        pairs = []
+        for package in self.packages or ():
+            package_dir = self.get_package_dir(package)
+            target_dir = os.path.join(self.build_lib, *package.split("."))
+            for source in sorted(glob.glob(os.path.join(package_dir,
+                                                        "*.py.txt"))):
+                if os.path.exists(source[:-4]):
+                    continue
+                pairs.append((source, os.path.join(
+                    target_dir, os.path.basename(source)[:-4])))
+        return pairs
+
+    def run(self):
+        _build_py.run(self)
+        cache_file = os.path.join(
+            self.get_finalized_command("build").build_base,
+            "pylit-cache.json")
+        converted = tangle_sources(self.find_literate_modules(),
+                                   self.pylit_strip, self.pylit_workers,
+                                   cache_file)
+        for target in converted:
+            self.announce("tangled %s" % target, level=2)
+        if self.compile or self.optimize > 0:
+            self.byte_compile([target for (source, target)
+                               in self.find_literate_modules()])
+
+    def get_outputs(self, include_bytecode=1):
+        outputs = _build_py.get_outputs(self, include_bytecode)
+        return outputs + [target for (source, target)
+                          in self.find_literate_modules()]
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Test the pylit_setuptools.py build hook
+# =======================================
+#
+# :Copyright: 2026 Lauro Cavalcanti de Sa.
+#             Released under the terms of the GNU General Public License
+#             (v. 3 or later)
+#
+# .. contents::
+
+import os
+
+from setuptools import Distribution
+
+from pylit_setuptools import *
+
+# Test source samples
+# ===================
+#
+# ::
+
+text = ("Documentation\n"
+        "\n"
+        "::\n"
+        "\n"
+        "  x = 1\n")
+
+code = ("# Documentation\n"
+        "# \n"
+        "# ::\n"
+        "\n"
+        "x = 1\n")
+
+# Test cases
+# ==========
+#
+# ::
+
+def make_package(tmp_path, content=text, encoding="utf-8"):
+    """Write a package with literate modules, return its build_lib"""
+    package_dir = tmp_path / "src" / "pkg"
+    package_dir.mkdir(parents=True)
+    for name in ("__init__.py.txt", "mod.py.txt"):
+        (package_dir / name).write_text(content, encoding=encoding)
+    return str(tmp_path / "build" / "lib")
+
+def build(tmp_path, **options):
+    distribution = Distribution({"packages": ["pkg"],
+                                 "script_name": "setup.py",
+                                 "package_dir": {"": str(tmp_path / "src")}})
+    command = build_py(distribution)
+    command.build_lib = str(tmp_path / "build" / "lib")
+    for (name, value) in options.items():
+        setattr(command, name, value)
+    command.ensure_finalized()
+    command.get_finalized_command("build").build_base = str(tmp_path
+                                                            / "build")
+    command.run()
+    return command
+
+def test_tangle(tmp_path):
+    build_lib = make_package(tmp_path)
+    command = build(tmp_path)
+    target = os.path.join(build_lib, "pkg", "mod.py")
+    assert open(target).read() == code
+    assert target in command.get_outputs()
+    assert (tmp_path / "build" / "pylit-cache.json").exists()
+
+def test_strip(tmp_path):
+    build_lib = make_package(tmp_path)
+    build(tmp_path, pylit_strip=1)
+    target = os.path.join(build_lib, "pkg", "mod.py")
+    assert open(target).read() == "x = 1\n"
+
+def test_cache(tmp_path):
+    make_package(tmp_path)
+    build(tmp_path)
+    pairs = build(tmp_path).find_literate_modules()
+    cache_file = str(tmp_path / "build" / "pylit-cache.json")
+    assert tangle_sources(pairs, cache_file=cache_file) == []
+    # a modified target or different settings are converted again
+    stream = open(pairs[0][1], "w")
+    stream.write("modified\n")
+    stream.close()
+    assert tangle_sources(pairs, cache_file=cache_file) == [pairs[0][1]]
+    assert len(tangle_sources(pairs, strip=True,
+                              cache_file=cache_file)) == 2
+
+# The coding comment of a text source sets the encoding of the source and
+# the output::
+
+latin1_text = ("..  # -*- coding: latin-1 -*-\n"
+               "\n"
+               "Caf\xe9::\n"
+               "\n"
+               "  x = '\xe9'\n")
+
+def test_encoding(tmp_path):
+    build_lib = make_package(tmp_path, latin1_text, "latin-1")
+    build(tmp_path)
+    target = os.path.join(build_lib, "pkg", "mod.py")
+    output = open(target, encoding="latin-1").read()
+    assert output.startswith("# -*- coding: latin-1 -*-\n")
+    assert "x = '\xe9'\n" in output
+    pairs = build(tmp_path).find_literate_modules()
+    cache_file = str(tmp_path / "build" / "pylit-cache.json")
+    assert tangle_sources(pairs, cache_file=cache_file) == []
+
+
+if __name__ == "__main__":
+    import nose
+    nose.runmodule() # requires nose 0.9.1
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ===============================================================
+# pylit_sphinx.py: Sphinx extension for PyLit literate sources
+# ===============================================================
+#
+# :Copyright: 2026 Lauro Cavalcanti de Sa.
+#             Released under the terms of the GNU General Public License
+#             (v. 3 or later)
+#
+# .. contents::
+
+# Frontmatter
+# ===========
+#
+# Changelog
+# ---------
+#
+# :0.1: Initial version.
+# ::
+
+"""Sphinx extension for PyLit literate sources.
+
+Read code sources (e.g. ``module.py``) as documents: the text version is
+generated in memory with `pylit.Code2Text`. Optionally, write the code of
+text sources (e.g. ``module.py.txt``) to an output tree while reading.
+"""
+
+__docformat__ = 'restructuredtext'
+
+_version = "0.1"
+
+# A Sphinx project documenting literate code sources usually runs pylit over
+# all sources first to generate the text versions. With this extension, the
+# code sources are part of the project: Sphinx reads them with a source
+# parser that converts them to reStructuredText in memory. Add the
+# extension and the suffixes of the code sources to ``conf.py``::
+#
+#   extensions = ["pylit_sphinx"]
+#   pylit_source_suffix = [".py"]
+#   exclude_patterns = ["conf.py"]
+#
+# (``conf.py`` itself is a code source and must be excluded.) No code
+# sources are read by default. The conversion settings are guessed from the
+# file name like on the command line (cf. `pylit.PylitOptions`). Warnings
+# and errors point to the lines of the code source.
+#
+# Sphinx re-reads a document if the modification time of its source
+# changed. The build environment keeps the hash of every converted source
+# with the conversion result, so a source that was touched but not changed
+# (e.g. by a version control checkout) is not converted again. Reading is
+# parallel safe: the cache entries of parallel readers are merged into the
+# main environment.
+#
+# The reverse direction: with ``pylit_tangle_dir`` set, the code of the
+# text sources with a code extension (e.g. ``module.py.txt``) is written to
+# the directory tree `pylit_tangle_dir` (relative to the configuration
+# directory) when Sphinx reads them::
+#
+#   pylit_tangle_dir = "../build/code"
+#   pylit_tangle_strip = False
+#
+# As Sphinx only reads new and changed documents, only their code is
+# converted. Output files with unchanged content are not rewritten, so
+# their modification time is kept for build tools that depend on them.
+# The output is written with the encoding of a coding comment in the first
+# two lines of the source (default: UTF-8). Tangling runs in the (parallel)
+# readers, a source that cannot be converted is reported with a warning.
+#
+# Requirements
+# ------------
+#
+# ::
+
+import os, re
+
+from docutils.statemachine import StringList
+from sphinx.parsers import RSTParser
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+import pylit
+
+# Conversion
+# ==========
+#
+# code2text
+# ---------
+#
+# Convert the code source `data` (list of lines) to text. Return the text
+# lines and, for every text line, the index of the source line it comes
+# from. The `Code2Text` converter inserts a code block marker before code
+# blocks without one, these lines are mapped to the first line of the code
+# block. ::
+
+def code2text(data, path):
+    """Return text lines and source line numbers for code source `data`"""
+    options = pylit.PylitOptions()([path, "-"])
+    values = options.as_dict()
+    del values["txt2code"]
+    document = pylit.LiterateDocument(data, txt2code=False, **values)
+    lines = []
+    linenos = []
+    for block in document.blocks:
+        offset = max(len(block.output) - len(block.lines), 0)
+        last = max(len(block.lines) - 1, 0)
+        for (i, line) in enumerate(block.output):
+            lines.append(line.rstrip("\n"))
+            linenos.append(block.start + min(max(i - offset, 0), last))
+    return (lines, linenos)
+
+
+# Source parser
+# =============
+#
+# PylitCodeParser
+# ---------------
+#
+# The reStructuredText parser, fed with the text version of the code source.
+# The converted lines are stored with the content hash of the source in the
+# environment (``env.pylit_sources``, a dictionary with document names as
+# keys)::
+
+class PylitCodeParser(RSTParser):
+    """Parse PyLit code sources as reStructuredText"""
+
+    supported = ("pylit-code",)
+
+    def parse(self, inputstring, document):
+        if isinstance(inputstring, StringList):
+            inputstring = "\n".join(inputstring)
+        path = document.current_source
+        env = document.settings.env
+        digest = pylit.content_hash(inputstring, path)
+        sources = env.pylit_sources
+        if env.docname in sources and sources[env.docname][0] == digest:
+            (lines, linenos) = sources[env.docname][1:]
+        else:
+            (lines, linenos) = code2text(inputstring.splitlines(True), path)
+            sources[env.docname] = (digest, lines, linenos)
+        inputlines = StringList(lines, items=[(path, lineno)
+                                              for lineno in linenos])
+        RSTParser.parse(self, inputlines, document)
+
+
+# Build environment
+# =================
+#
+# Set up the cache, drop entries of removed documents (documents that are
+# read again keep their entry for the hash comparison), and merge the entries
+# of parallel readers::
+
+def init_env(app):
+    if not hasattr(app.env, "pylit_sources"):
+        app.env.pylit_sources = {}
+
+def purge_doc(app, env, docname):
+    if docname not in env.found_docs:
+        getattr(env, "pylit_sources", {}).pop(docname, None)
+
+def merge_info(app, env, docnames, other):
+    for docname in docnames:
+        if docname in getattr(other, "pylit_sources", {}):
+            env.pylit_sources[docname] = other.pylit_sources[docname]
+
+
+# Tangling
+# ========
+#
+# tangle_doc
+# ----------
+#
+# Handler for the ``source-read`` event: convert the text source of
+# `docname` and write the code to the output tree::
+
+_coding_regexp = re.compile(r"coding[=:]\s*([-\w.]+)")
+
+def tangle_doc(app, docname, source):
+    if not app.config.pylit_tangle_dir:
+        return
+    path = str(app.env.doc2path(docname))
+    (base, ext) = os.path.splitext(path)
+    if (ext not in pylit.defaults.text_extensions
+        or pylit.code_language(os.path.splitext(base)[1]) is None):
+        return
+    target = os.path.join(app.confdir, app.config.pylit_tangle_dir,
+                          os.path.relpath(base, app.srcdir))
+    options = pylit.PylitOptions()([path, target])
+    values = options.as_dict()
+    del values["txt2code"]
+    values["strip"] = app.config.pylit_tangle_strip
+    data = source[0].splitlines(True)
+    try:
+        code = "".join(pylit.Text2Code(data, **values)())
+    except ValueError as ex:
+        logger.warning("pylit: cannot convert to code: %s", ex,
+                       location=docname)
+        return
+    match = _coding_regexp.search("".join(data[:2]))
+    encoding = match and match.group(1) or "utf-8"
+    if os.path.exists(target):
+        stream = open(target, encoding=encoding)
+        unchanged = stream.read() == code
+        stream.close()
+        if unchanged:
+            return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    stream = open(target, "w", encoding=encoding)
+    stream.write(code)
+    stream.close()
+
+
+# Setup
+# =====
+#
+# The code suffixes are registered for the source parser when the
+# configuration is read (before Sphinx merges the registered suffixes into
+# ``source_suffix``)::
+
+def register_suffixes(app, config):
+    for suffix in config.pylit_source_suffix:
+        app.add_source_suffix(suffix, "pylit-code")
+
+def setup(app):
+    app.add_config_value("pylit_source_suffix", [], "env")
+    app.add_config_value("pylit_tangle_dir", None, "")
+    app.add_config_value("pylit_tangle_strip", False, "")
+    app.add_source_parser(PylitCodeParser)
+    app.connect("config-inited", register_suffixes, priority=400)
+    app.connect("builder-inited", init_env)
+    app.connect("env-purge-doc", purge_doc)
+    app.connect("env-merge-info", merge_info)
+    app.connect("source-read", tangle_doc)
+    return {"version": _version, "env_version": 1,
+            "parallel_read_safe": True, "parallel_write_safe": True}
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Test the pylit_sphinx.py extension
+# ==================================
+#
+# :Copyright: 2026 Lauro Cavalcanti de Sa.
+#             Released under the terms of the GNU General Public License
+#             (v. 3 or later)
+#
+# .. contents::
+
+import os, time
+
+import pytest
+
+sphinx = pytest.importorskip("sphinx")
+from sphinx.application import Sphinx
+
+import pylit
+from pylit_sphinx import *
+
+# Test source samples
+# ===================
+#
+# ::
+
+code = ("# Example\n"
+        "# =======\n"
+        "\n"
+        "x = 1\n")
+
+text = ("Example\n"
+        "=======\n"
+        "\n"
+        "::\n"
+        "\n"
+        "  x = 1\n")
+
+# Test cases
+# ==========
+#
+# The inserted code block marker is mapped to the first code line::
+
+def test_code2text():
+    (lines, linenos) = code2text(code.splitlines(True), "example.py")
+    assert lines == ["Example", "=======", "", "::", "", "  x = 1"]
+    assert linenos == [0, 1, 2, 3, 3, 3]
+
+# A project with the code source ``example.py``::
+
+conf = ("extensions = ['pylit_sphinx']\n"
+        "master_doc = 'example'\n"
+        "pylit_source_suffix = ['.py']\n"
+        "exclude_patterns = ['conf.py', '_build']\n")
+
+def make_project(tmp_path, extra_conf=""):
+    (tmp_path / "conf.py").write_text(conf + extra_conf)
+    (tmp_path / "example.py").write_text(code)
+    return tmp_path
+
+def build(srcdir, **keyw):
+    outdir = srcdir / "_build"
+    app = Sphinx(str(srcdir), str(srcdir), str(outdir),
+                 str(outdir / ".doctrees"), "html", status=None, **keyw)
+    app.build()
+    return app
+
+def test_read_code_source(tmp_path):
+    app = build(make_project(tmp_path))
+    html = (tmp_path / "_build" / "example.html").read_text()
+    assert "<h1>Example" in html
+    assert '<div class="highlight' in html
+    assert app.env.pylit_sources["example"][1][0] == "Example"
+
+def test_no_code_sources_by_default(tmp_path):
+    make_project(tmp_path)
+    (tmp_path / "conf.py").write_text(conf.replace(
+        "pylit_source_suffix = ['.py']\n", "")
+        + "source_suffix = {'.txt': 'restructuredtext'}\n")
+    (tmp_path / "example.txt").write_text(text)
+    app = build(tmp_path)
+    assert app.env.found_docs == set(["example"])
+    assert app.env.pylit_sources == {}
+
+def test_touched_source_is_not_converted(tmp_path, monkeypatch):
+    import pylit_sphinx
+    srcdir = make_project(tmp_path)
+    build(srcdir)
+    calls = []
+    convert = pylit_sphinx.code2text
+    monkeypatch.setattr(pylit_sphinx, "code2text",
+                        lambda *args: calls.append(args) or convert(*args))
+    source = srcdir / "example.py"
+    os.utime(str(source), (time.time() + 10, time.time() + 10))
+    build(srcdir)
+    assert calls == []
+    with open(str(source), "a") as stream:
+        stream.write("y = 2\n")
+    os.utime(str(source), (time.time() + 20, time.time() + 20))
+    build(srcdir)
+    assert len(calls) == 1
+
+# With parallel reading, the cache entries of the readers are merged into
+# the environment of the main process::
+
+def test_parallel_read(tmp_path, monkeypatch):
+    import io, pylit_sphinx
+    srcdir = make_project(tmp_path)
+    names = ["module%d" % i for i in range(8)]
+    for name in names:
+        (srcdir / (name + ".py")).write_text(code)
+    app = build(srcdir, parallel=2, warning=io.StringIO())
+    assert app.is_parallel_allowed("read")
+    assert set(app.env.pylit_sources) == set(names + ["example"])
+    calls = []
+    convert = pylit_sphinx.code2text
+    monkeypatch.setattr(pylit_sphinx, "code2text",
+                        lambda *args: calls.append(args) or convert(*args))
+    for name in names:
+        os.utime(str(srcdir / (name + ".py")),
+                 (time.time() + 10, time.time() + 10))
+    build(srcdir, warning=io.StringIO())
+    assert calls == []
+
+# Tangling text sources (the output has the encoding of the source)::
+
+tangle_conf = ("source_suffix = {'.txt': 'restructuredtext'}\n"
+               "pylit_tangle_dir = 'code'\n")
+
+def test_tangle(tmp_path):
+    srcdir = make_project(tmp_path, tangle_conf)
+    (srcdir / "module.py.txt").write_text(text)
+    build(srcdir)
+    target = srcdir / "code" / "module.py"
+    assert target.read_text() == "".join(
+        pylit.Text2Code(text.splitlines(True))())
+    # unchanged output is not written again
+    os.utime(str(target), (0, 0))
+    os.utime(str(srcdir / "module.py.txt"),
+             (time.time() + 10, time.time() + 10))
+    build(srcdir)
+    assert os.path.getmtime(str(target)) == 0
+
+def test_tangle_encoding(tmp_path):
+    srcdir = make_project(tmp_path, tangle_conf
+                          + "source_encoding = 'latin-1'\n")
+    (srcdir / "module.py.txt").write_text(
+        "..  # -*- coding: latin-1 -*-\n\nCaf\xe9::\n\n  x = '\xe9'\n",
+        encoding="latin-1")
+    build(srcdir)
+    output = (srcdir / "code" / "module.py").read_text(encoding="latin-1")
+    assert "x = '\xe9'\n" in output
+
+def test_tangle_error(tmp_path):
+    """a source that cannot be converted is reported with a warning"""
+    import io
+    srcdir = make_project(tmp_path, tangle_conf)
+    (srcdir / "module.py.txt").write_text("text::\n\n   a\n  b\n")
+    warnings = io.StringIO()
+    build(srcdir, warning=warnings)
+    assert "pylit: cannot convert to code" in warnings.getvalue()
+    assert not (srcdir / "code" / "module.py").exists()
+
+
+if __name__ == "__main__":
+    import nose
+    nose.runmodule() # requires nose 0.9.1
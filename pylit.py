@@ -83,7 +83,7 @@ and *source code* with embedded documentation.
 #                     values.languages.keys().
 #                     Removed spurious `print` statement in code_block_handler.
 #                     Added basic support for 'c' and 'css' languages
-#                     with `dumb_c_preprocessor`_ and `dumb_c_postprocessor`_.
+#                     with `dumb_c_preprocessor` and `dumb_c_postprocessor`.
 # 0.5     2007-06-06  Moved `collect_blocks`_ out of `TextCodeConverter`_,
 #                     bug fix: collect all trailing blank lines into a block.
 #                     Expand tabs with `expandtabs_filter`_.
@@ -111,6 +111,39 @@ and *source code* with embedded documentation.
 # 0.7.9a  2016-11-26  Initial version for Python3:
 #                     2to3.py applied; and
 #                     All the "file" functions swichted to "open" functions.
+# 0.8dev  2026-10-19  Re-usable converter instances: `get_converter`_ without
+#                     data, `TextCodeConverter.__call__`_ with data argument,
+#                     cache compiled marker regexps.
+#         2026-10-19  `Conversion server`_ on a Unix domain socket
+#                     (``--serve``, ``--client``), new `diff_lines`_ helper.
+#         2026-10-19  `Persistent worker`_ mode (``--worker``).
+#         2026-10-19  Incremental block-wise conversion with
+#                     `TextCodeConverter.convert_blocks`_,
+#                     language server in contribs/pylit_lsp.py.
+#         2026-10-19  `Import hook`_ for literate modules with bytecode cache.
+#         2026-10-19  Cache compiled code of `execute`_, run it in a fresh
+#                     namespace, `fork server`_ (``--fork-server``).
+#         2026-10-19  `Hot reload`_ of executed programs (``--reload``).
+#         2026-10-19  Parallel doctests of many files with `run_doctests`_,
+#                     `run_doctest`_: fresh copy of `globs`, add '' to
+#                     sys.path only once, do not decode str (Python 3).
+#         2026-10-19  Skip unchanged, passed doctest groups (`doctest result
+#                     cache`_, ``--doctest-cache``), ``--force`` option.
+#         2026-10-19  `doctest_lines`_: fast doctest extraction from code.
+#         2026-10-19  `Doctest timing`_ (``--timing``).
+#         2026-10-19  `code_fingerprint`_ ignores documentation changes,
+#                     ``--fingerprint`` option.
+#         2026-10-19  Fast path for ``--strip``: `Text2Code.tangle`_.
+#         2026-10-19  Parse once: `LiterateDocument`_, combined actions
+#                     (`run_actions`_, ``--convert``).
+#         2026-10-19  Binary `serialization`_ of parsed documents.
+#         2026-10-19  Include-aware `dependency manifest`_, ``--deps``.
+#         2026-10-19  Ninja build file generator (`emit_ninja`_).
+#         2026-10-19  `Declarative filters`_ compiled into one pass.
+#         2026-10-19  `Block filters`_.
+#         2026-10-19  `C comment scanner`_ for multi-line block comments,
+#                     replaces the dumb C filters.
+#         2026-10-19  Lazily loaded `language plugins`_ (entry points).
 # ======  ==========  ===========================================================
 #
 # ::
@@ -139,6 +172,7 @@ __docformat__ = 'restructuredtext'
 
 import builtins, os, sys
 import re, optparse
+import importlib.machinery, importlib.util
 
 
 # DefaultDict
@@ -335,6 +369,18 @@ defaults.preprocessors = {}
 
 defaults.postprocessors = {}
 
+# .. _defaults.plugins:
+#
+# plugins
+# -------
+#
+# Language plugins known without entry points (see `language plugins`_):
+# mapping of language names and code file extensions to the profile of the
+# plugin (``"module:attribute"``)::
+
+defaults.plugins = {"elisp": "pylit_elisp:profile",
+                    ".el":   "pylit_elisp:profile"}
+
 # .. _defaults.codeindent:
 #
 # codeindent
@@ -362,17 +408,6 @@ defaults.overwrite = 'update'
 #  :'no':     fail if `outfile` exists.
 #
 #
-# Extensions
-# ==========
-#
-# Try to import optional extensions::
-
-try:
-    import pylit_elisp
-except ImportError:
-    pass
-
-
 # Converter Classes
 # =================
 #
@@ -449,6 +484,12 @@ class TextCodeConverter(object):
         self.data = data
         self.__dict__.update(keyw)
 
+# The settings of a plugin language are registered on first use (see
+# `language plugins`_)::
+
+        if self.language not in self.comment_strings:
+            load_plugin(self.language)
+
 # If empty, `code_block_marker` and `comment_string` are set according
 # to the `language`::
 
@@ -459,24 +500,25 @@ class TextCodeConverter(object):
         self.stripped_comment_string = self.comment_string.rstrip()
 
 # Pre- and postprocessing filters are set (with
-# `TextCodeConverter.get_filter`_)::
+# `TextCodeConverter.get_filter`_) with both the line and the block
+# interface (see `block filters`_)::
 
-        self.preprocessor = self.get_filter("preprocessors", self.language)
-        self.postprocessor = self.get_filter("postprocessors", self.language)
+        preprocessor = self.get_filter("preprocessors", self.language)
+        postprocessor = self.get_filter("postprocessors", self.language)
+        self.preprocessor = as_line_filter(preprocessor)
+        self.postprocessor = as_line_filter(postprocessor)
+        self.block_postprocessor = as_block_filter(postprocessor)
+        self._block_postprocessing = getattr(postprocessor, "block_filter",
+                                             False)
 
 # .. _inserted into a regular expression:
 #
 # Finally, a regular_expression for the `code_block_marker` is compiled
-# to find valid cases of `code_block_marker` in a given line and return
-# the groups: ``\1 prefix, \2 code_block_marker, \3 remainder`` ::
+# (with `TextCodeConverter.get_marker_regexp`_) to find valid cases of
+# `code_block_marker` in a given line and return the groups:
+# ``\1 prefix, \2 code_block_marker, \3 remainder`` ::
 
-        marker = self.code_block_marker
-        if marker == '::':
-            # the default marker may occur at the end of a text line
-            self.marker_regexp = re.compile('^( *(?!\.\.).*)(::)([ \n]*)$')
-        else:
-            # marker must be on a separate line
-            self.marker_regexp = re.compile('^( *)(%s)(.*\n?)$' % marker)
+        self.marker_regexp = self.get_marker_regexp(self.code_block_marker)
 
 # .. _TextCodeConverter.__iter__:
 #
@@ -496,11 +538,17 @@ class TextCodeConverter(object):
 # language are registered in `defaults.preprocessors`_ and|or
 # `defaults.postprocessors`_. The filters must accept an iterable as first
 # argument and yield the processed input data line-wise.
+#
+# A block postprocessor needs the state of the converted blocks, the
+# conversion is done by `convert_blocks`_ then.
 # ::
 
     def __iter__(self):
         """Iterate over input data source and yield converted lines
         """
+        if self._block_postprocessing:
+            return (line for (state, block, output)
+                    in self.convert_blocks(self.data) for line in output)
         return self.postprocessor(self.convert(self.preprocessor(self.data)))
 
 
@@ -509,10 +557,21 @@ class TextCodeConverter(object):
 # __call__
 # """"""""
 # The special `__call__` method allows the use of class instances as callable
-# objects. It returns the converted data as list of lines::
+# objects. It returns the converted data as list of lines.
+#
+# An optional `data` argument replaces the instance's data. As all per-run
+# state is re-initialised in `TextCodeConverter.convert`_, a converter
+# instance can be set up once (e.g. with `get_converter`_ and ``data=None``)
+# and then applied to many inputs without repeating the setup::
+
+    def __call__(self, data=None):
+        """Iterate over state-machine and return results as list of lines
 
-    def __call__(self):
-        """Iterate over state-machine and return results as list of lines"""
+        If `data` is given, it replaces the instance's data before the
+        conversion.
+        """
+        if data is not None:
+            self.data = data
         return [line for line in self]
 
 
@@ -605,6 +664,103 @@ class TextCodeConverter(object):
                 yield line
 
 
+# .. _TextCodeConverter.convert_blocks:
+#
+# convert_blocks
+# """"""""""""""
+#
+# Convert block-wise and yield a ``(state, block, output)`` tuple for every
+# block with the state of the block, the list of (pre-processed) input
+# lines, and the list of converted (post-processed) output lines. This
+# requires filters_ that do not keep state across blocks. Postprocessors
+# are called with the block interface (see `block filters`_).
+#
+# The conversion of a block depends only on the block and the internal state
+# left behind by the preceding blocks. If a `memo` mapping (e.g. a
+# LRUCache_) is given, results are stored and looked up with these keys, so
+# that the repeated conversion of an edited document only recomputes the
+# blocks affected by the edit.
+#
+# If an `errors` list is given, a ValueError raised by a handler (e.g. a
+# code line that is less indented than the code block) is appended as
+# ``(line number, exception)`` tuple and the block is passed on unchanged::
+
+    _internal_state = ("state", "_codeindent", "_textindent",
+                       "_add_code_block_marker")
+
+    def convert_blocks(self, lines, memo=None, errors=None):
+        """Iterate over blocks, yield (state, block, output) tuples"""
+        self.state = ""
+        self._codeindent = 0
+        self._textindent = 0
+        self._add_code_block_marker = False
+        lineno = 0
+        lines = expandtabs_filter(self.preprocessor(lines))
+        for block in collect_blocks(lines):
+            if not block:
+                return # no data
+            key = (tuple(block), self.get_internal_state())
+            result = memo.get(key) if memo is not None else None
+            if result is None:
+                self.set_state(block)
+                state = self.state
+                handler = getattr(self, self.state+"_handler")
+                try:
+                    output = list(handler(list(block)))
+                    output = self.block_postprocessor(state, output)
+                except ValueError as ex:
+                    if errors is None:
+                        raise
+                    errors.append((lineno, ex))
+                    output = list(block)
+                result = (state, output, self.get_internal_state())
+                if memo is not None:
+                    memo[key] = result
+            (state, output, internal_state) = result
+            self.set_internal_state(internal_state)
+            yield (state, block, output)
+            lineno += len(block)
+
+# Get and set the internal data arguments that are passed from one block to
+# the next::
+
+    def get_internal_state(self):
+        """Return tuple of internal data arguments"""
+        return tuple(getattr(self, name) for name in self._internal_state)
+
+    def set_internal_state(self, values):
+        """Restore internal data arguments from `get_internal_state`"""
+        for name, value in zip(self._internal_state, values):
+            setattr(self, name, value)
+
+
+# .. _TextCodeConverter.get_marker_regexp:
+#
+# get_marker_regexp
+# """""""""""""""""
+#
+# Compiled marker regexps are stored in the class-level `_marker_regexps`
+# dictionary, so that the instantiation of many converters with the same
+# `code_block_marker` does not pay for the regexp set-up again::
+
+    _marker_regexps = {}
+
+    def get_marker_regexp(self, marker):
+        """Return compiled regular expression matching `marker`"""
+        try:
+            return self._marker_regexps[marker]
+        except KeyError:
+            pass
+        if marker == '::':
+            # the default marker may occur at the end of a text line
+            regexp = re.compile('^( *(?!\.\.).*)(::)([ \n]*)$')
+        else:
+            # marker must be on a separate line
+            regexp = re.compile('^( *)(%s)(.*\n?)$' % marker)
+        self._marker_regexps[marker] = regexp
+        return regexp
+
+
 # .. _TextCodeConverter.get_filter:
 #
 # get_filter
@@ -717,6 +873,83 @@ class Text2Code(TextCodeConverter):
 # codeindent using self.ensure_trailing_blank_line(lines, line) (would need
 # split and push-back of the documentation part)?
 #
+# .. _Text2Code.tangle:
+#
+# tangle
+# ~~~~~~
+#
+# With ``strip == True``, documentation is dropped and only the code is
+# needed. This is the common case for production use. `tangle` is a fast
+# path for it with the same output as the state machine. Instead of
+# running the `Text2Code.documentation_handler`_ on every line, it only
+# determines the state after a documentation block: the block ends with
+# a code block marker, if the last line matching the `marker_regexp` is
+# followed by blank lines or directive options only. A backwards scan
+# usually stops after the last non-blank line::
+
+    def convert(self, lines):
+        """Iterate over lines of a text source and yield code lines"""
+        if self.strip:
+            return self.tangle(lines)
+        return TextCodeConverter.convert(self, lines)
+
+    def tangle(self, lines):
+        """Iterate over lines of a text source, yield only code lines"""
+        self.state = ""
+        self._codeindent = 0
+        self._textindent = 0
+        marker_regexp = self.marker_regexp
+        directive_option_regexp = self.directive_option_regexp
+        for block in collect_blocks(expandtabs_filter(lines)):
+            if not block:
+                return # no data
+            if self.state == "":
+                if block[0].startswith(self.header_string):
+                    self.state = "header"
+                    block[0] = block[0].replace(self.header_string, "", 1)
+                else:
+                    self.state = "documentation"
+            elif self.state != "documentation":
+                # cf. Text2Code.set_state
+                self.state = "code_block"
+                indent = " "*(self._textindent + 1)
+                for line in block:
+                    if (not line.startswith(indent) and line.rstrip()
+                        and self.get_indent(line) <= self._textindent):
+                        self.state = "documentation"
+                        break
+            if self.state != "documentation":
+                for line in self.unindent_code_block(block):
+                    yield line
+                continue
+            for line in reversed(block):
+                if marker_regexp.search(line):
+                    self.state = "code_block"
+                    self._textindent = self.get_indent(line)
+                    break
+                if line.rstrip() and not directive_option_regexp.search(line):
+                    break
+
+# `unindent_code_block` returns the same lines as the
+# `Text2Code.code_block_handler`_, but slices the lines instead of calling
+# `get_indent` for every line. If a line is less indented than the code, the
+# handler is called to raise the error::
+
+    def unindent_code_block(self, block):
+        """Return list of unindented lines of the code `block`"""
+        if self._codeindent == 0:
+            self._codeindent = self.get_indent(block[0])
+        indent = " "*self._codeindent
+        lines = []
+        for line in block:
+            if line.startswith(indent):
+                lines.append(line[self._codeindent:])
+            elif line.lstrip():
+                return list(self.code_block_handler(block))
+            else:
+                lines.append(line.replace(indent, "", 1))
+        return lines
+
 # .. _Text2Code.header_handler:
 #
 # header_handler
@@ -993,6 +1226,40 @@ class Code2Text(TextCodeConverter):
 
 
 
+# doctest_lines
+# ~~~~~~~~~~~~~
+#
+# Fast path for `run_doctest`_: return the lines of the text source that
+# doctest needs, without a complete conversion. Blocks are pre-processed and
+# classified like in `TextCodeConverter.convert`_ (starting with the header
+# check). Blocks without a doctest prompt are blanked (see
+# `blank_text_block`_), documentation blocks are uncommented, and code
+# blocks returned unchanged (the indentation as literal block does not
+# matter for doctest)::
+
+    def doctest_lines(self, data=None):
+        """Return list of text lines with the doctests of the code source"""
+        if data is None:
+            data = self.data
+        self.state = ""
+        lines = []
+        data = expandtabs_filter(self.preprocessor(data))
+        for block in collect_blocks(data):
+            if not block:
+                break # no data
+            self.set_state(block)
+            for line in block:
+                if ">>>" in line:
+                    break
+            else:
+                lines.extend(blank_text_block(block))
+                continue
+            if self.state == "documentation":
+                lines.extend([self.uncomment_line(line) for line in block])
+            else:
+                lines.extend(block)
+        return lines
+
 # strip_code_block_marker
 # ~~~~~~~~~~~~~~~~~~~~~~~
 #
@@ -1028,6 +1295,295 @@ class Code2Text(TextCodeConverter):
         else:                         # '::' follows text
             lines[-2] = match.group(1).rstrip() + ':' + match.group(3)
 
+# .. _LiterateDocument:
+#
+# LiterateDocument
+# ----------------
+#
+# The converters produce one view of a document per run. Actions like
+# conversion, diff, and doctest each read and convert the input anew.
+# A `LiterateDocument` parses the input once (with
+# `TextCodeConverter.convert_blocks`_) and keeps the typed blocks. All
+# views are derived from them::
+
+class LiterateDocument(object):
+    """Literate document, parsed once, with text, code and doctest views
+    """
+
+# A `Block` holds the state ("header", "documentation", or "code_block"),
+# the range of (pre-processed) source lines, the minimal indentation of the
+# non-blank lines, the converted lines, and the line number of the
+# `code_block_marker`_ in a documentation block (-1 if there is none)::
+
+    class Block(object):
+        """Typed block of a literate document"""
+        def __init__(self, state, start, lines, output, indent=None,
+                     marker=-1):
+            self.state = state
+            self.start = start
+            self.end = start + len(lines)
+            self.lines = lines
+            self.output = output
+            if indent is None:
+                indent = min([len(line) - len(line.lstrip()) for line in lines
+                              if line.strip()] or [0])
+            self.indent = indent
+            self.marker = marker
+
+        def __repr__(self):
+            return "<Block %s %d:%d>" % (self.state, self.start, self.end)
+
+# The document is set up from a list of lines, the conversion direction, and
+# the converter settings (keyword arguments as for `get_converter`_)::
+
+    def __init__(self, data, txt2code=True, **keyw):
+        self.source = list(data)
+        self.txt2code = txt2code
+        self.settings = keyw
+        self.blocks = []
+        converter = get_converter(txt2code=txt2code, **keyw)
+        for (state, block, output) in converter.convert_blocks(self.source):
+            start = self.blocks and self.blocks[-1].end or 0
+            block = self.Block(state, start, block, output)
+            if state == "documentation":
+                text = txt2code and block.lines or block.output
+                for i in range(len(text)-1, -1, -1):
+                    if converter.marker_regexp.search(text[i]):
+                        block.marker = start + i
+                        break
+            self.blocks.append(block)
+
+# Views
+# ~~~~~
+#
+# The converted document (code for a text source, text for a code source)::
+
+    def converted(self):
+        """Return list of converted lines"""
+        return [line for block in self.blocks for line in block.output]
+
+    def text(self):
+        """Return list of lines in text format"""
+        return self.txt2code and self.source or self.converted()
+
+    def code(self):
+        """Return list of lines in code format"""
+        return self.txt2code and self.converted() or self.source
+
+# The code without documentation (like ``--strip`` for a text source)::
+
+    def stripped_code(self):
+        """Return list of code lines without documentation"""
+        lines = []
+        for block in self.blocks:
+            if block.state != "documentation":
+                lines.extend(self.txt2code and block.output or block.lines)
+        return lines
+
+# The code lines for a `code_fingerprint`_ (without the blank lines that
+# separate code from documentation)::
+
+    def code_lines(self):
+        """Return list of code lines of the document"""
+        lines = []
+        for block in self.blocks:
+            if block.state == "documentation":
+                while lines and not lines[-1].strip():
+                    lines.pop()
+            else:
+                lines.extend(self.txt2code and block.output or block.lines)
+        while lines and not lines[-1].strip():
+            lines.pop()
+        return lines
+
+# The text for doctest. Line numbers match the source (cf.
+# `doctest_lines`_): documentation blocks of a code source are uncommented
+# line by line (the converted block may differ in length, e.g. with
+# ``--strip``)::
+
+    def doctest_text(self):
+        """Return the text lines with the doctests as string"""
+        if self.txt2code:
+            return "".join(self.source)
+        uncomment = get_converter(txt2code=False,
+                                  **self.settings).uncomment_line
+        lines = []
+        for block in self.blocks:
+            if not [line for line in block.lines if ">>>" in line]:
+                lines.extend(blank_text_block(block.lines))
+            elif block.state == "documentation":
+                lines.extend([uncomment(line) for line in block.lines])
+            else:
+                lines.extend(block.lines)
+        return "".join(lines)
+
+    def doctests(self):
+        """Return list of `doctest groups`_"""
+        return doctest_groups(self.doctest_text())
+
+# The round-trip conversion of the converted document back into the source
+# format and the differences to the source::
+
+    def round_trip(self):
+        """Return list of lines after conversion and back-conversion"""
+        return get_converter(self.converted(), not self.txt2code,
+                             **self.settings)()
+
+    def round_trip_diff(self, name="<input>"):
+        """Return unified diff of source and round-trip conversion"""
+        import difflib
+        return list(difflib.unified_diff(self.source, self.round_trip(),
+                    fromfile=name, tofile="<round-conversion of %s>" % name))
+
+# Serialization
+# ~~~~~~~~~~~~~
+#
+# A parsed document can be stored in a compact binary format and loaded
+# without parsing it again (e.g. by a batch run, the `conversion server`_,
+# or an editor integration). All views can be produced from the loaded
+# document.
+#
+# The format is versioned and consists of little-endian, 4-byte aligned
+# sections that can be read directly from a memory-mapped file:
+#
+# :header:  magic ``PLIT``, format version, flags (bit 0: `txt2code`),
+#           number of blocks, source lines, and output lines, SHA-1 digest
+#           of the converter settings (see `settings_digest`_),
+# :blocks:  one record per block: state, source line range, output line
+#           range, indent, line number of the code block marker (or -1),
+# :offsets: byte offsets of the source lines and the output lines in the
+#           strings section,
+# :strings: the source and the output as UTF-8 encoded strings.
+#
+# ::
+
+    _magic = b"PLIT"
+    _format_version = 2
+    _states = ("header", "documentation", "code_block")
+
+    def tobytes(self):
+        """Return the parsed document in binary format"""
+        import array, struct
+        output = self.converted()
+        head = struct.pack("<4sHHIII20s", self._magic, self._format_version,
+                           int(bool(self.txt2code)), len(self.blocks),
+                           len(self.source), len(output),
+                           bytes.fromhex(self.settings_digest()))
+        records = []
+        out_start = 0
+        for block in self.blocks:
+            records.append(struct.pack("<B3xIIIIIi",
+                           self._states.index(block.state), block.start,
+                           block.end, out_start,
+                           out_start + len(block.output), block.indent,
+                           block.marker))
+            out_start += len(block.output)
+        offsets = array.array("I", [0])
+        strings = []
+        for lines in (self.source, output):
+            encoded = [line.encode("utf-8", "surrogateescape")
+                       for line in lines]
+            offset = 0
+            for line in encoded:
+                offset += len(line)
+                offsets.append(offset)
+            offsets.append(0) # start of the output
+            strings.append(b"".join(encoded))
+        del offsets[-1]
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        return b"".join([head] + records + [offsets.tobytes(),
+                        struct.pack("<I", len(strings[0]))] + strings)
+
+# `frombytes` accepts any object supporting the buffer protocol, e.g. a
+# `mmap.mmap` instance. The converter settings must match the settings used
+# for the parse, otherwise a ValueError is raised::
+
+    @classmethod
+    def frombytes(cls, buffer, **keyw):
+        """Return LiterateDocument loaded from binary `buffer`"""
+        import array, struct
+        (magic, version, flags, n_blocks, n_source, n_output,
+         digest) = struct.unpack_from("<4sHHIII20s", buffer, 0)
+        if magic != cls._magic:
+            raise ValueError("not a PyLit document")
+        if version != cls._format_version:
+            raise ValueError("PyLit document format version %d "
+                             "(expected %d)" % (version, cls._format_version))
+        document = cls.__new__(cls)
+        document.txt2code = bool(flags & 1)
+        document.settings = keyw
+        if digest.hex() != document.settings_digest():
+            raise ValueError("document parsed with different settings")
+        position = 40
+        records = []
+        for i in range(n_blocks):
+            records.append(struct.unpack_from("<B3xIIIIIi", buffer, position))
+            position += 28
+        offsets = array.array("I")
+        offsets.frombytes(bytes(buffer[position:
+                                       position + 4*(n_source+n_output+2)]))
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        position += 4*(n_source + n_output + 2)
+        (size,) = struct.unpack_from("<I", buffer, position)
+        position += 4
+        strings = (bytes(buffer[position:position+size]),
+                   bytes(buffer[position+size:]))
+        lines = []
+        for (string, start, count) in zip(strings, (0, n_source + 1),
+                                          (n_source, n_output)):
+            bounds = offsets[start:start+count+1]
+            lines.append([string[a:b].decode("utf-8", "surrogateescape")
+                          for (a, b) in zip(bounds, bounds[1:])])
+        (document.source, output) = lines
+        document.blocks = []
+        for (state, start, end, out_start, out_end, indent,
+             marker) in records:
+            document.blocks.append(cls.Block(cls._states[state], start,
+                                             document.source[start:end],
+                                             output[out_start:out_end],
+                                             indent, marker))
+        return document
+
+# Store and load files. The file is memory-mapped for loading::
+
+    def dump(self, path):
+        """Write the parsed document in binary format to `path`"""
+        stream = open(path, "wb")
+        stream.write(self.tobytes())
+        stream.close()
+
+    @classmethod
+    def load(cls, path, **keyw):
+        """Return LiterateDocument loaded from the binary file `path`"""
+        import mmap
+        stream = open(path, "rb")
+        try:
+            buffer = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            stream.close()
+        try:
+            return cls.frombytes(buffer, **keyw)
+        finally:
+            buffer.close()
+
+# .. _settings_digest:
+#
+# The settings are identified by the values the converter uses (with the
+# defaults filled in for unset or None values) and the PyLit version::
+
+    def settings_digest(self):
+        """Return hex digest of the converter settings"""
+        settings = dict((key, value) for (key, value)
+                        in self.settings.items() if value is not None)
+        converter = get_converter(txt2code=self.txt2code, **settings)
+        return content_hash("", bool(self.txt2code), _version,
+                            [getattr(converter, key)
+                             for key in _converter_settings])
+
+
+
 # Filters
 # =======
 #
@@ -1092,69 +1648,580 @@ def collect_blocks(lines):
     yield block
 
 
+# .. _block filters:
+#
+# Block filters
+# -------------
+#
+# Line filters see one line at a time. Filters that need context, or that
+# can skip whole blocks which cannot match, are easier to write and faster
+# with a block interface: a *block filter* is a function ``f(state,
+# block)`` that receives a block (list of lines) from `collect_blocks`_ and
+# returns the list of processed lines.
+#
+# For postprocessors, `state` is the state of the converted block
+# ("header", "documentation", or "code_block"). Preprocessors run before
+# the classification (which depends on the preprocessed lines) and get
+# ``None``.
+#
+# Block filters are registered in `defaults.preprocessors`_ and
+# `defaults.postprocessors`_ like line filters, marked with the
+# `block_filter` decorator::
+
+def block_filter(function):
+    """Mark `function` as block filter ``function(state, block)``"""
+    function.block_filter = True
+    return function
 
-# dumb_c_preprocessor
+# Adapters
+# ~~~~~~~~
+#
+# The converters use both interfaces: the line interface for the input and
+# output data streams and the block interface in `convert_blocks`_. Every
+# filter is converted to the other interface with an adapter.
+#
+# A line filter as block filter (the identity filter passes blocks
+# unchanged)::
+
+def as_block_filter(line_filter):
+    """Return block filter for `line_filter`"""
+    import functools
+    if getattr(line_filter, "block_filter", False):
+        return line_filter
+    if line_filter is identity_filter:
+        return block_filter(lambda state, block: block)
+    @functools.wraps(line_filter, updated=())
+    def adapter(state, block):
+        return list(line_filter(block))
+    return block_filter(adapter)
+
+# A block filter as line filter, blocks are collected from the data (with
+# state ``None``)::
+
+def as_line_filter(filter):
+    """Return line filter for `filter`"""
+    import functools
+    if not getattr(filter, "block_filter", False):
+        return filter
+    @functools.wraps(filter, updated=())
+    def adapter(data):
+        for block in collect_blocks(data):
+            for line in filter(None, block):
+                yield line
+    return adapter
+
+
+# .. _declarative filters:
+#
+# Declarative filters
 # -------------------
 #
-# This is a basic filter to convert `C` to `C++` comments. Works line-wise and
-# only converts lines that
+# Most filters rewrite single lines: replace a comment prefix (and suffix)
+# or substitute a regular expression. Written as generator functions, every
+# filter adds a generator layer that every line passes through, and only one
+# filter per language and direction can be registered.
+#
+# A `LineFilter` is defined by a table of rules instead. The first rule
+# that matches a line rewrites it, other lines pass unchanged. Filters are
+# chained with ``|`` (the tables are applied one after another). A chain is
+# compiled into one generator function with the rules inlined, so every
+# line passes a single loop, no matter how many tables are chained.
+#
+# Filters that need state across lines, like the `C comment scanner`_,
+# are not expressible as rule tables. They can be chained with line filters
+# as well (e.g. ``c_comment_preprocessor | LineFilter(rules)``), each of
+# them adds a stage to the chain.
+#
+# Rewrite
+# ~~~~~~~
+#
+# Replace the `prefix` of a line by `new_prefix`. With a `suffix`, the rule
+# only matches lines that also end with `suffix` (ignoring trailing
+# whitespace), the last occurrence of `suffix` is replaced by `new_suffix`.
+# With an empty `suffix`, `new_suffix` is appended to the line (trailing
+# whitespace is replaced by a newline). With `blank`, the rule only matches
+# lines that are blank after the prefix.
+#
+# The rule knows how to write itself as source code for the fused filter.
+# `source` returns a tuple with
+#
+# :guard:     literal prefix of all matching lines (or None),
+# :search:    expression assigned to `match` before the condition (or None),
+# :condition: expression tested after the guard (None: always true),
+# :body:      list of statements rewriting `line`.
+#
+# Strings are inserted as literals. Other objects are added to `namespace`
+# with names starting with `name`::
+
+class Rewrite(object):
+    """Prefix (and suffix) replacement rule for `LineFilter`"""
+
+    def __init__(self, prefix, new_prefix, suffix=None, new_suffix="",
+                 blank=False):
+        self.prefix = prefix
+        self.new_prefix = new_prefix
+        self.suffix = suffix
+        self.new_suffix = new_suffix
+        self.blank = blank
+
+    def __repr__(self):
+        return "Rewrite(%r, %r, %r, %r, %r)" % (self.prefix, self.new_prefix,
+                                                self.suffix, self.new_suffix,
+                                                self.blank)
+
+    def source(self, name, namespace):
+        head = "line[%d:]" % len(self.prefix)
+        if self.new_prefix:
+            head = "%r + %s" % (self.new_prefix, head)
+        if self.blank:
+            return (self.prefix, None, "not line[%d:].strip()"
+                    % len(self.prefix), ["line = " + head])
+        if self.suffix is None:
+            return (self.prefix, None, None, ["line = " + head])
+        if not self.suffix:
+            return (self.prefix, None, None, ["line = %s.rstrip() + %r"
+                                              % (head, self.new_suffix+"\n")])
+        return (self.prefix, None,
+                "line.rstrip().endswith(%r)" % self.suffix,
+                ["line = %r.join((%s).rsplit(%r, 1))"
+                 % (self.new_suffix, head, self.suffix)])
+
+# Substitute
+# ~~~~~~~~~~
+#
+# Replace the first match of the regular expression `pattern` by `repl`
+# (cf. `re.sub`). The rule matches lines with a match of `pattern`. Lines
+# that do not start with the optional `prefix` are skipped without a
+# regular expression search (a fast path for anchored patterns)::
+
+class Substitute(object):
+    """Regular expression substitution rule for `LineFilter`"""
+
+    def __init__(self, pattern, repl, flags=0, prefix=None):
+        self.regexp = re.compile(pattern, flags)
+        self.repl = repl
+        self.prefix = prefix
+
+    def __repr__(self):
+        return "Substitute(%r, %r, %d, %r)" % (self.regexp.pattern, self.repl,
+                                               self.regexp.flags, self.prefix)
+
+    def source(self, name, namespace):
+        search = self.regexp.search
+        if self.regexp.pattern.startswith("^"):
+            search = self.regexp.match # no search for anchored patterns
+        namespace.update({name+"r": search, name+"s": self.regexp.sub})
+        if "\\" in self.repl: # group references or escapes
+            body = ["line = %ss(%r, line, 1)" % (name, self.repl)]
+        else:
+            body = ["line = line[:match.start()] + %r + line[match.end():]"
+                    % self.repl]
+        return (self.prefix or None, "%sr(line)" % name, "match", body)
+
+# LineFilter
+# ~~~~~~~~~~
+#
+# A chain of rule tables. `rules` is a sequence of rules (a table), `name`
+# is used in error messages. The `tables` of a chain may also contain
+# generator or block filter functions::
+
+class LineFilter(object):
+    """Declarative line filter compiled into one generator function"""
+
+    def __init__(self, rules=(), name="LineFilter"):
+        self.tables = [list(rules)]
+        self.name = name
+        self._fused = None
+
+    def __repr__(self):
+        return "<LineFilter %s>" % self.name
+
+# Chaining returns a new filter with the tables of both filters. Other
+# filters (functions) are added as one element of `tables`::
+
+    def __or__(self, other):
+        chain = LineFilter(name="%s|%s" % (self.name, filter_name(other)))
+        chain.tables = self.tables + filter_tables(other)
+        return chain
+
+    def __ror__(self, other):
+        chain = LineFilter(name="%s|%s" % (filter_name(other), self.name))
+        chain.tables = filter_tables(other) + self.tables
+        return chain
+
+# The identity of the filter in the `dependency manifest`_ is derived from
+# the rule tables (and the identities of chained functions), so a change of
+# a rule changes the manifest::
+
+    def identity(self):
+        """Return string identifying the rule tables"""
+        import hashlib
+        tables = [callable(table) and filter_identity(table) or table
+                  for table in self.tables]
+        digest = hashlib.sha1(repr(tables).encode("utf-8"))
+        return "LineFilter %s %s" % (self.name, digest.hexdigest())
+
+# A filter is called like a generator filter. The fused function is compiled
+# at the first call::
+
+    def __call__(self, data):
+        if self._fused is None:
+            self._fused = self.compile()
+        return self._fused(data)
+
+# compile
+# """""""
 #
-# * start with "/\* " and end with " \*/" (followed by whitespace only)
+# Consecutive rule tables are fused into one generator function (see
+# `_fuse`), chained functions are stages of their own. A chain of several
+# stages is a function passing the data through all stages::
+
+    def compile(self):
+        """Return generator function applying the rule tables"""
+        stages = []
+        tables = []
+        for table in self.tables + [None]:
+            if isinstance(table, list):
+                tables.append(table)
+                continue
+            if tables or not stages and table is None:
+                stages.append(self._fuse(tables))
+                tables = []
+            if table is not None:
+                stages.append(as_line_filter(table))
+        if len(stages) == 1:
+            return stages[0]
+        def chain(data):
+            for stage in stages:
+                data = stage(data)
+            return data
+        return chain
+
+# The source of one generator function applying the rule `tables`. The
+# tables are applied one after another in the loop body. Every table
+# becomes a nested ``if``/``else`` chain: a rule that does not match
+# continues with the next rule in its ``else`` branch. The objects in the
+# namespace are passed as default arguments (local variables are faster
+# than globals)::
+
+    def _fuse(self, tables):
+        namespace = {}
+        code = ["    for line in data:"]
+        for (i, table) in enumerate(tables):
+            rules = [rule.source("r%d_%d" % (i, j), namespace)
+                     for (j, rule) in enumerate(table)]
+            self._compile_rules(rules, "        ", code)
+        code.append("        yield line")
+        code.insert(0, "def fused(data, %s):" % ", ".join(
+            "%s=%s" % (name, name) for name in sorted(namespace)))
+        exec(compile("\n".join(code), "<%r>" % self, "exec"), namespace)
+        return namespace["fused"]
+
+# Consecutive rules with the same guard are tested under one
+# ``line.startswith(guard)`` condition. If none of them matches, the
+# remaining rules of the table are skipped, so this is only done if no
+# remaining rule can match a line starting with the guard (every remaining
+# guard is neither a prefix nor an extension of it)::
+
+    def _compile_rules(self, rules, indent, code):
+        if not rules:
+            code.append(indent + "pass")
+            return
+        guard = rules[0][0]
+        run = 1
+        while run < len(rules) and rules[run][0] == guard:
+            run += 1
+        rest = rules[run:]
+        if guard is not None and run > 1 and not [
+            True for rule in rest if rule[0] is None
+            or rule[0].startswith(guard) or guard.startswith(rule[0])]:
+            code.append(indent + "if line.startswith(%r):" % guard)
+            self._compile_rules([(None,) + rule[1:] for rule in rules[:run]],
+                                indent + "    ", code)
+            code.append(indent + "else:")
+            self._compile_rules(rest, indent + "    ", code)
+            return
+        (guard, search, condition, body) = rules[0]
+        tests = []
+        if guard is not None:
+            tests.append("line.startswith(%r)" % guard)
+        if search is not None:
+            code.append(indent + "match = %s" % " and ".join(tests + [search]))
+            tests = []
+        if condition is not None:
+            tests.append(condition)
+        if not tests: # the rule always matches: skip the remaining rules
+            code.extend([indent + line for line in body])
+            return
+        code.append(indent + "if %s:" % " and ".join(tests))
+        code.extend([indent + "    " + line for line in body])
+        code.append(indent + "else:")
+        self._compile_rules(rules[1:], indent + "    ", code)
+
+# Name and tables of a filter in a chain::
+
+def filter_name(filter):
+    """Return the name of `filter` for a `LineFilter`_ chain"""
+    return getattr(filter, "name", None) or filter.__name__
+
+def filter_tables(filter):
+    """Return the `tables` of `filter` in a `LineFilter`_ chain"""
+    if isinstance(filter, LineFilter):
+        return filter.tables
+    return [filter]
+
+# .. _C comment scanner:
 #
-# A more sophisticated version would also
+# C comment scanner
+# ~~~~~~~~~~~~~~~~~
 #
-# * convert multi-line comments
+# C and CSS comments are converted to the C++ comment string (``// ``) and
+# back. `c_comment_preprocessor`_ scans the code once, keeping track of
+# block comments and string literals across line boundaries, so comment
+# delimiters in string literals are not taken for real ones.
+#
+# _`c_scan` returns the scanner state at the end of `line`, scanned from
+# index `pos` in state `state`:
+#
+# :None:         code,
+# :``*/``:       inside a block comment,
+# :``"``, ``'``: inside a string or character literal continued with a
+#                backslash at the end of the line.
+#
+# A regular expression matches code with complete string literals up to the
+# next comment delimiter or unterminated literal; inside comments, `str.find`
+# looks for the end. So every character is looked at once. C++ ``//``
+# comments end the scan of the line. ::
+
+_c_code = re.compile(r"""[^/"'\\]*(?:(?:/(?![*/])|\\.
+                         |"[^"\\\n]*(?:\\.[^"\\\n]*)*"
+                         |'[^'\\\n]*(?:\\.[^'\\\n]*)*')[^/"'\\]*)*""",
+                     re.VERBOSE)
+_c_literal_ends = {'"': re.compile(r'["\\]'), "'": re.compile(r"['\\]")}
+
+def c_scan(line, pos=0, state=None):
+    """Return scanner state after scanning `line` from `pos`"""
+    while True:
+        if state is None:
+            pos = _c_code.match(line, pos).end()
+            token = line[pos:pos+2]
+            if token == "/*":
+                (pos, state) = (pos + 2, "*/")
+            elif token[:1] in ('"', "'"):
+                (pos, state) = (pos + 1, token[0])
+            else:
+                return None # end of line or C++ comment
+        elif state == "*/":
+            pos = line.find("*/", pos)
+            if pos < 0:
+                return state
+            (pos, state) = (pos + 2, None)
+        else:
+            match = _c_literal_ends[state].search(line, pos)
+            if match is None:
+                return None # unterminated literal
+            pos = match.end()
+            if match.group() == "\\":
+                if (line[pos:pos+1] in ("\r", "\n", "")
+                    and line[pos:].strip("\r\n") == ""):
+                    return state # line continuation
+                pos += 1
+            else:
+                state = None
+
+# Block comment layout
+# """"""""""""""""""""
+#
+# A block comment spanning several lines is converted if it starts at the
+# beginning of a line, the text is aligned with the first line, and there
+# are no blank lines (these would split the comment into several
+# documentation blocks):
+#
+# >>> print("\n".join(c_block_comment(["Block", "  indented", "text"])))
+# /* Block
+#      indented
+#    text */
+#
+# `c_block_comment` returns the lines (without line ends) of a block
+# comment with the text lines `texts`::
+
+def c_block_comment(texts):
+    """Return lines of a multi-line ``/* */`` comment with `texts`"""
+    lines = [texts[0] and "/* " + texts[0] or "/*"]
+    lines.extend([text and "   " + text or "" for text in texts[1:]])
+    if texts[-1]:
+        lines[-1] += " */"
+    else:
+        lines[-1] = "   */"
+    return lines
+
+# `c_comment_texts` is the inverse. It returns None for comments with blank
+# lines or a different layout (e.g. Javadoc comments with leading
+# asterisks), these stay code, so that the conversion back to code restores
+# them unchanged::
+
+def c_comment_texts(lines):
+    """Return the text lines of the block comment `lines` (or None)"""
+    if lines[-1].find("*/") != len(lines[-1]) - 2:
+        return None
+    texts = [line[3:] for line in lines[:-1]] + [lines[-1][3:-2]]
+    if texts[-1].endswith(" "):
+        texts[-1] = texts[-1][:-1]
+    if ([text for text in texts if not text.strip()]
+        or c_block_comment(texts) != lines):
+        return None
+    return texts
+
+# c_comment_preprocessor
+# """"""""""""""""""""""
 #
-#   + Keep indentation or strip 3 leading spaces?
+# Convert comments starting a line into C++ comments. A comment in one line
+# must start with ``/* `` and end with `` */``. Multi-line comments are
+# converted line by line if they have the `block comment layout`_:
 #
-# * account for nested comments
+# >>> lines = ["/* one */\n", "/* two\n", "   three */\n", "/**\n", " */\n"]
+# >>> "".join(c_comment_preprocessor(lines))
+# '// one\n// two\n// three\n/**\n */\n'
 #
-# * only convert comments that are separated from code by a blank line
+# Comments inside a block comment or string literal that started on a
+# previous line are not converted.
 #
-# ::
+# Most lines contain no comment delimiter or quote and are passed on after
+# a substring test. Without quotes and C++ comments, the state at the end of
+# a line follows from the last opening delimiter. Only the remaining lines
+# are scanned with `c_scan`_::
 
-def dumb_c_preprocessor(data):
+def c_comment_preprocessor(data):
     """change `C` ``/* `` `` */`` comments into C++ ``// `` comments"""
     comment_string = defaults.comment_strings["c++"]
-    boc_string = "/* "
-    eoc_string = " */"
-    for line in data:
-        if (line.startswith(boc_string)
-            and line.rstrip().endswith(eoc_string)
-           ):
-            line = line.replace(boc_string, comment_string, 1)
-            line = "".join(line.rsplit(eoc_string, 1))
-        yield line
+    lines = iter(data)
+    for line in lines:
+        quoted = '"' in line or "'" in line
+        if not quoted and "/*" not in line:
+            yield line
+            continue
+        pos = 0
+        if line.startswith("/* "):
+            end = line.find("*/", 3)
+            if end < 0:
+                comment = [line]
+                for line in lines:
+                    comment.append(line)
+                    end = line.find("*/")
+                    if end >= 0:
+                        break
+                else: # unterminated comment
+                    for line in comment:
+                        yield line
+                    return
+                converted = c_uncomment_block(comment, comment_string)
+                for line in converted or comment:
+                    yield line
+                if converted:
+                    continue
+                pos = end + 2
+            elif line[end-1] == " " and not line[end+2:].strip():
+                text = line[3:end-1]
+                yield (text and comment_string + text
+                       or comment_string.rstrip()) + line[end+2:]
+                continue
+        if pos or quoted or "//" in line:
+            state = c_scan(line, pos)
+        elif line.find("*/", line.rfind("/*") + 2) < 0:
+            state = "*/"
+        else:
+            state = None
+        if not pos:
+            yield line
+        if state is None:
+            continue
 
-# Unfortunately, the `replace` method of strings does not support negative
-# numbers for the `count` argument:
-#
-#   >>> "foo */ baz */ bar".replace(" */", "", -1) == "foo */ baz bar"
-#   False
+# Pass on the lines following a line that ends inside a block comment or
+# string literal (scanning for its end)::
+
+        for line in lines:
+            if state == "*/":
+                end = line.find("*/")
+                if end >= 0:
+                    if "/" in line[end+2:] or '"' in line or "'" in line:
+                        state = c_scan(line, end + 2)
+                    else:
+                        state = None
+            else:
+                state = c_scan(line, 0, state)
+            yield line
+            if state is None:
+                break
+
+# Return the lines of a multi-line comment as C++ comments, or None if the
+# comment has a different layout::
+
+def c_uncomment_block(comment, comment_string):
+    """Return C++ comment lines for the block comment lines `comment`"""
+    contents = [line.rstrip("\r\n") for line in comment]
+    texts = c_comment_texts(contents)
+    if texts is None:
+        return None
+    return [(text and comment_string + text or comment_string.rstrip())
+            + line[len(content):]
+            for (text, content, line) in zip(texts, contents, comment)]
+
+# c_comment_postprocessor
+# """""""""""""""""""""""
 #
-# However, there is the `rsplit` method, that can be used together with `join`:
+# Convert C++ comment lines into ``/* */`` comments. Consecutive comment
+# lines become one block comment with the `block comment layout`_:
 #
-#   >>> "".join("foo */ baz */ bar".rsplit(" */", 1)) == "foo */ baz bar"
-#   True
+# >>> lines = ["// one\n", "\n", "// two\n", "// three\n", "int x;\n"]
+# >>> "".join(c_comment_postprocessor(None, lines))
+# '/* one */\n\n/* two\n   three */\nint x;\n'
 #
-# dumb_c_postprocessor
-# --------------------
+# Blank comment lines at the end of a run (separating the paragraphs of the
+# documentation) become blank lines.
 #
-# Undo the preparations by the dumb_c_preprocessor and re-insert valid comment
-# delimiters ::
+# This is a `block filter <block filters>`_: runs of comment lines end at
+# the next blank line, so they do not span several blocks. Comments in code
+# blocks are converted, too: CSS has no C++ comments. ::
 
-def dumb_c_postprocessor(data):
+@block_filter
+def c_comment_postprocessor(state, block):
     """change C++ ``// `` comments into `C` ``/* `` `` */`` comments"""
     comment_string = defaults.comment_strings["c++"]
-    boc_string = "/* "
-    eoc_string = " */"
-    for line in data:
-        if line.rstrip() == comment_string.rstrip():
-            line = line.replace(comment_string, "", 1)
-        elif line.startswith(comment_string):
-            line = line.replace(comment_string, boc_string, 1)
-            line = line.rstrip() + eoc_string + "\n"
-        yield line
+    stripped_comment_string = comment_string.rstrip()
+    output = []
+    run = []
+    for line in block:
+        if (line.startswith(stripped_comment_string)
+            and (line.startswith(comment_string)
+                 or line.rstrip() == stripped_comment_string)):
+            run.append(line)
+            continue
+        if run:
+            output.extend(c_comment_block(run, comment_string))
+            run = []
+        output.append(line)
+    if run:
+        output.extend(c_comment_block(run, comment_string))
+    return output
+
+# Convert the comment lines `run`. Single lines are converted like with the
+# original ``dumb_c_postprocessor``::
+
+def c_comment_block(run, comment_string):
+    """Return `C` comment lines for the C++ comment lines `run`"""
+    stripped_comment_string = comment_string.rstrip()
+    blank = len(run)
+    while blank and run[blank-1].rstrip() == stripped_comment_string:
+        blank -= 1
+    (run, blanks) = (run[:blank], run[blank:])
+    blanks = [line.replace(comment_string, "", 1) for line in blanks]
+    if len(run) < 2:
+        return [line[len(comment_string):].rstrip().join(("/* ", " */\n"))
+                for line in run] + blanks
+    contents = [line.rstrip("\r\n") for line in run]
+    texts = [content[len(comment_string):] for content in contents]
+    return [comment + line[len(content):] for (comment, content, line)
+            in zip(c_block_comment(texts), contents, run)] + blanks
 
 
 # register filters
@@ -1162,10 +2229,156 @@ def dumb_c_postprocessor(data):
 #
 # ::
 
-defaults.preprocessors['c2text'] = dumb_c_preprocessor
-defaults.preprocessors['css2text'] = dumb_c_preprocessor
-defaults.postprocessors['text2c'] = dumb_c_postprocessor
-defaults.postprocessors['text2css'] = dumb_c_postprocessor
+defaults.preprocessors['c2text'] = c_comment_preprocessor
+defaults.preprocessors['css2text'] = c_comment_preprocessor
+defaults.postprocessors['text2c'] = c_comment_postprocessor
+defaults.postprocessors['text2css'] = c_comment_postprocessor
+
+
+# .. _language plugins:
+#
+# Language plugins
+# ================
+#
+# Plugins add support for more languages. A plugin module provides a
+# *profile*, a dictionary with the settings of the language:
+#
+# :language:          language name (required),
+# :extensions:        list of code file extensions,
+# :comment_string:    see `comment_strings`_,
+# :code_block_marker: see `code_block_markers`_,
+# :preprocessor:      filter for the code to text conversion,
+# :postprocessor:     filter for the text to code conversion.
+#
+# Installed packages declare their plugins as entry points of the group
+# ``pylit.languages``, under the language name and every extension, e.g. in
+# ``pyproject.toml``::
+#
+#   [project.entry-points."pylit.languages"]
+#   elisp = "pylit_elisp:profile"
+#   ".el" = "pylit_elisp:profile"
+#
+# Plugins known without entry points are listed in `defaults.plugins`_.
+#
+# Language names and extensions are resolved without importing a plugin. The
+# plugin is imported (and its profile registered in the `defaults`_) when a
+# converter for its language is set up (in `TextCodeConverter.__init__`_),
+# so a conversion of Python sources does not import any plugin.
+#
+# plugin_specs
+# ------------
+#
+# Return a dictionary of language names and extensions with the profile
+# specification of the plugins. Entry points take precedence over
+# `defaults.plugins`_. They are looked up once, as this reads the metadata of
+# all installed distributions::
+
+_plugin_entry_points = None
+
+def plugin_specs():
+    """Return dict of plugin language names/extensions and profile specs"""
+    global _plugin_entry_points
+    if _plugin_entry_points is None:
+        _plugin_entry_points = {}
+        try:
+            from importlib.metadata import entry_points
+        except ImportError: # Python < 3.8
+            entry_points = None
+        if entry_points is not None:
+            try:
+                group = entry_points(group="pylit.languages")
+            except TypeError: # Python < 3.10
+                group = entry_points().get("pylit.languages", ())
+            for entry_point in group:
+                _plugin_entry_points[entry_point.name] = entry_point.value
+    specs = dict(defaults.plugins)
+    specs.update(_plugin_entry_points)
+    return specs
+
+# language_names
+# --------------
+#
+# Return the built-in languages and the languages of plugins (used to check
+# the ``--language`` option)::
+
+def language_names():
+    """Return sorted list of known languages"""
+    names = set(defaults.languages.values())
+    names.update(name for name in plugin_specs() if not name.startswith("."))
+    return sorted(names)
+
+# code_language
+# -------------
+#
+# Return the language of code files with `extension` (or None, if the
+# extension is unknown). The language of a plugin extension is the name
+# registered with the same profile::
+
+def code_language(extension, languages=None):
+    """Return language for code file `extension` or None"""
+    if languages is None:
+        languages = defaults.languages
+    if extension in languages:
+        return languages[extension]
+    if not extension:
+        return None
+    specs = plugin_specs()
+    spec = specs.get(extension)
+    if spec is None:
+        return None
+    for (name, value) in specs.items():
+        if value == spec and not name.startswith("."):
+            return name
+    return load_plugin(extension)
+
+# load_plugin
+# -----------
+#
+# Import the plugin for the language or extension `name` and register its
+# profile. Return the language (None, if there is no plugin or the plugin
+# module is not installed)::
+
+_loaded_plugins = {}
+
+def load_plugin(name):
+    """Import and register the language plugin for `name`"""
+    spec = plugin_specs().get(name)
+    if spec is None:
+        return None
+    if spec not in _loaded_plugins:
+        (module_name, attribute) = spec.split(":")
+        try:
+            module = importlib.import_module(module_name)
+        except ModuleNotFoundError as error:
+            if error.name != module_name:
+                raise
+            _loaded_plugins[spec] = None
+            return None
+        profile = getattr(module, attribute)
+        register_language(**profile)
+        _loaded_plugins[spec] = profile["language"]
+    return _loaded_plugins[spec]
+
+# register_language
+# -----------------
+#
+# Register the settings of a language in the `defaults`_ (also usable in a
+# wrapper script)::
+
+def register_language(language, extensions=(), comment_string=None,
+                      code_block_marker=None, preprocessor=None,
+                      postprocessor=None):
+    """Register settings and filters of `language` in `defaults`"""
+    for extension in extensions:
+        defaults.languages[extension] = language
+    if comment_string is not None:
+        defaults.comment_strings[language] = comment_string
+    if code_block_marker is not None:
+        defaults.code_block_markers[language] = code_block_marker
+    if preprocessor is not None:
+        defaults.preprocessors[language + "2text"] = preprocessor
+    if postprocessor is not None:
+        defaults.postprocessors["text2" + language] = postprocessor
 
 
 # Command line use
@@ -1272,6 +2485,45 @@ class OptionValues(optparse.Values):
 #        self).
 #
 #
+# check_language
+# --------------
+#
+# Callback for the ``--language`` option. The choices include the languages of
+# `language plugins`_, so they are only looked up if the option is used::
+
+def check_language(option, opt_str, value, parser):
+    names = language_names()
+    if value not in names:
+        raise optparse.OptionValueError(
+            "option %s: invalid choice: %r (choose from %s)"
+            % (opt_str, value, ", ".join([repr(name) for name in names])))
+    setattr(parser.values, option.dest, value)
+
+
+# RequestOptionParser
+# -------------------
+#
+# The `optparse.OptionParser` exits the program on errors and after printing
+# the help or version. The `conversion server`_ and the `persistent
+# worker`_ must survive a bad request, their option parser raises a
+# ValueError instead::
+
+class RequestOptionParser(optparse.OptionParser):
+    """Option parser raising ValueError instead of exiting"""
+
+    def error(self, msg):
+        raise ValueError(msg)
+
+    def exit(self, status=0, msg=None):
+        raise ValueError(msg or "unexpected exit of the option parser")
+
+    def print_help(self, file=None):
+        raise ValueError("--help is not supported in requests")
+
+    def print_version(self, file=None):
+        raise ValueError("--version is not supported in requests")
+
+
 # PylitOptions
 # ------------
 #
@@ -1284,13 +2536,14 @@ class PylitOptions(object):
 # Instantiation
 # ~~~~~~~~~~~~~
 #
-# ::
+# The `parser_class` is `optparse.OptionParser` for the command line or
+# `RequestOptionParser`_ for requests::
 
-    def __init__(self):
+    def __init__(self, parser_class=optparse.OptionParser):
         """Set up an `OptionParser` instance for pylit command line options
 
         """
-        p = optparse.OptionParser(usage=main.__doc__, version=_version)
+        p = parser_class(usage=main.__doc__, version=_version)
 
         # Conversion settings
 
@@ -1298,8 +2551,8 @@ class PylitOptions(object):
                      help="convert code source to text source")
         p.add_option("-t", "--txt2code", action="store_true",
                      help="convert text source to code source")
-        p.add_option("--language",
-                     choices = list(defaults.languages.values()),
+        p.add_option("--language", action="callback", type="string",
+                     callback=check_language, dest="language",
                      help="use LANGUAGE native comment style")
         p.add_option("--comment-string", dest="comment_string",
                      help="documentation block marker in code source "
@@ -1316,6 +2569,16 @@ class PylitOptions(object):
         p.add_option("--overwrite", action="store",
                      choices = ["yes", "update", "no"],
                      help="overwrite output file (default 'update')")
+        p.add_option("--manifest", action="store_true",
+                     help="skip the conversion if no input changed "
+                     "(stores a manifest in __pycache__ next to OUTFILE)")
+        p.add_option("--deps", action="store_true",
+                     help="write make-style dependency file OUTFILE.d "
+                     "(including files in '.. include::' directives, "
+                     "implies --manifest)")
+        p.add_option("--emit-ninja", dest="emit_ninja", metavar="SRC",
+                     help="write a ninja build file (INFILE, default "
+                     "'build.ninja') for the text sources in directory SRC")
         p.add_option("--replace", action="store_true",
                      help="move infile to a backup copy (appending '~')")
         p.add_option("-s", "--strip", action="store_true",
@@ -1325,10 +2588,64 @@ class PylitOptions(object):
 
         p.add_option("-d", "--diff", action="store_true",
                      help="test for differences to existing file")
+        p.add_option("--fingerprint", action="store_true",
+                     help="print a fingerprint of the code content "
+                     "(unchanged by edits of the documentation)")
         p.add_option("--doctest", action="store_true",
                      help="run doctest.testfile() on the text version")
+        p.add_option("--doctest-cache", dest="doctest_cache",
+                     action="store_true",
+                     help="with --doctest: skip unchanged, passed example "
+                     "groups (stores results in __pycache__ next to INFILE)")
+        p.add_option("--force", action="store_true",
+                     help="with --doctest-cache: run all examples")
+        p.add_option("--timing", type="int", metavar="N",
+                     help="with --doctest or --doctest-files: report the N "
+                     "slowest examples and the total time per file")
+        p.add_option("--doctest-files", dest="doctest_files",
+                     action="store_true",
+                     help="run doctests of all input files in parallel")
+        p.add_option("--timeout", type="float",
+                     help="with --doctest-files: time limit per file "
+                     "in seconds")
+        p.add_option("--report",
+                     help="with --doctest-files: write results to REPORT "
+                     "(JUnit XML if it ends with '.xml', else JSON)")
         p.add_option("-e", "--execute", action="store_true",
                      help="execute code (Python only)")
+        p.add_option("--convert", action="store_true", dest="also_convert",
+                     help="with --diff, --doctest, or --execute: "
+                     "also convert (the input is read only once)")
+        p.add_option("--reload", action="store_true",
+                     help="with --execute: restart the program when the "
+                     "source changes")
+
+        # Conversion server
+
+        p.add_option("--serve", action="store_true",
+                     help="run as conversion server on a Unix domain socket")
+        p.add_option("--client", action="store_true",
+                     help="let a running conversion server (or fork server "
+                     "with --execute) do the work (fall back to "
+                     "in-process conversion)")
+        p.add_option("--socket", dest="socket_path",
+                     help="path of the (fork) server socket "
+                     "(default: per-user socket in the temp dir)")
+        p.add_option("--fork-server", dest="fork_server",
+                     action="store_true",
+                     help="run as fork server for --execute on a Unix "
+                     "domain socket")
+        p.add_option("--preload", action="callback", type="string",
+                     callback=lambda option, opt, value, parser:
+                         setattr(parser.values, "preload", value.split(",")),
+                     help="comma separated list of modules to import in "
+                     "the fork server")
+        p.add_option("--worker", "--persistent_worker", action="store_true",
+                     help="process JSON requests from stdin (one per line) "
+                     "as persistent build worker")
+        p.add_option("--workers", type="int",
+                     help="number of worker threads or processes "
+                     "(default: depends on the number of CPUs)")
 
         self.parser = p
 
@@ -1352,7 +2669,8 @@ class PylitOptions(object):
         # parse arguments
         (values, args) = self.parser.parse_args(args, OptionValues(keyw))
         # Convert FILE and OUTFILE positional args to option values
-        # (other positional arguments are ignored)
+        # (other positional arguments are only used by --doctest-files)
+        values.infiles = args
         try:
             values.infile = args[0]
             values.outfile = args[1]
@@ -1391,7 +2709,7 @@ class PylitOptions(object):
             in_extension = os.path.splitext(values.infile)[1]
             if in_extension in values.text_extensions:
                 values.txt2code = True
-            elif in_extension in list(values.languages.keys()):
+            elif code_language(in_extension, values.languages):
                 values.txt2code = False
 
 # Auto-determine the output file name::
@@ -1410,7 +2728,9 @@ class PylitOptions(object):
             code_extension = os.path.splitext(values.outfile)[1]
         elif values.txt2code is False:
             code_extension = os.path.splitext(values.infile)[1]
-        values.ensure_value("language", values.languages[code_extension])
+        if values.language is None:
+            values.language = (code_language(code_extension, values.languages)
+                               or values.languages.default)
 
         return values
 
@@ -1440,7 +2760,7 @@ class PylitOptions(object):
         (base, ext) = os.path.splitext(values.infile)
         if ext in values.text_extensions:
             return base # strip
-        if ext in list(values.languages.keys()) or values.txt2code == False:
+        if code_language(ext, values.languages) or values.txt2code == False:
             return values.infile + values.text_extensions[0] # add
         # give up
         return values.infile + ".out"
@@ -1535,19 +2855,312 @@ def is_newer(path1, path2):
         return None
     return mtime1 > mtime2
 
+# .. _dependency manifest:
+#
+# Dependency manifest
+# ~~~~~~~~~~~~~~~~~~~
+#
+# `is_newer`_ compares the modification time of one input and one output
+# file. A literate document may include other documents with the
+# ``.. include::`` directive, and the output also depends on the converter
+# settings and the language filters.
+#
+# With ``--manifest`` (or ``--deps``), a manifest of the inputs of the output
+# of a file-to-file conversion is stored in the ``__pycache__`` directory
+# next to the output file. It lists the content hashes of the source and all
+# (recursively) included files, the values of the `converter_settings`_
+# (including defaults), the identities of the filters, and the hash of the
+# written output.
+#
+# find_includes
+# """""""""""""
+#
+# Return the list of files included by `infile` (and, recursively, by the
+# included files). Include paths are relative to the including file, the
+# directive may be commented (in a code source). Standard includes
+# (``<isonum.txt>``) and missing files are skipped::
+
+_include_regexp = re.compile(r'^\s*(?:\S{1,3}\s*)?\.\. include::\s*(.+?)\s*$')
+
+def find_includes(infile, _found=None):
+    """Return list of files included by `infile` (recursively)"""
+    if _found is None:
+        _found = [infile]
+    try:
+        stream = open(infile)
+        lines = stream.readlines()
+        stream.close()
+    except (OSError, UnicodeDecodeError):
+        return _found[1:]
+    for line in lines:
+        match = _include_regexp.match(line)
+        if not match or match.group(1).startswith("<"):
+            continue
+        path = os.path.normpath(os.path.join(os.path.dirname(infile),
+                                             match.group(1)))
+        if path not in _found and os.path.isfile(path):
+            _found.append(path)
+            find_includes(path, _found)
+    return _found[1:]
+
+# dependency_manifest
+# """""""""""""""""""
+#
+# Return the manifest of the inputs of `outfile` as dictionary. Filters are
+# identified by their qualified name, `LineFilter`_ instances by their rule
+# tables::
+
+def dependency_manifest(infile, outfile, txt2code=True, **keyw):
+    """Return dictionary with the inputs of `outfile` and their hashes"""
+    converter = get_converter(txt2code=txt2code, **keyw)
+    inputs = []
+    for path in [infile] + find_includes(infile):
+        inputs.append([path, file_hash(path)])
+    filters = [filter_identity(filter)
+               for filter in (converter.preprocessor, converter.postprocessor)]
+    return {"version": _version, "output": outfile, "inputs": inputs,
+            "settings": [bool(txt2code)] + [getattr(converter, key)
+                                            for key in _converter_settings],
+            "filters": filters}
+
+def filter_identity(filter):
+    """Return string identifying `filter` in the dependency manifest"""
+    if isinstance(filter, LineFilter):
+        return filter.identity()
+    return "%s.%s" % (filter.__module__.replace("__main__", "pylit"),
+                      filter.__qualname__)
+
+def file_hash(path):
+    """Return SHA-1 hex digest of the content of file `path`"""
+    import hashlib
+    stream = open(path, 'rb')
+    digest = hashlib.sha1(stream.read()).hexdigest()
+    stream.close()
+    return digest
+
+def manifest_file(outfile):
+    """Return path of the dependency manifest of `outfile`"""
+    (dirname, basename) = os.path.split(os.path.abspath(outfile))
+    return os.path.join(dirname, "__pycache__",
+                        basename + ".pylit-manifest.json")
+
+# check_manifest
+# """"""""""""""
+#
+# Compare the stored manifest of `outfile` with the current inputs. Return
+# the current manifest and a status:
+#
+# :"current":   inputs, settings and filters unchanged and the output file
+#               not modified since it was written: nothing to do,
+# :"outdated":  the output was not modified but an input changed: the output
+#               can be overwritten, even if it is newer than `infile` (e.g.
+#               after the change of an included file),
+# :None:        there is no manifest or the output file was modified.
+#
+# ::
+
+def check_manifest(infile, outfile, txt2code=True, **keyw):
+    """Return (status, manifest) for `outfile`"""
+    import json
+    manifest = dependency_manifest(infile, outfile, txt2code, **keyw)
+    try:
+        stream = open(manifest_file(outfile))
+        stored = json.load(stream)
+        stream.close()
+        output_hash = stored.pop("output_hash")
+    except (OSError, ValueError, KeyError, AttributeError):
+        return (None, manifest)
+    try:
+        if file_hash(outfile) != output_hash:
+            return (None, manifest)
+    except OSError:
+        return ("outdated", manifest)
+    if stored == manifest:
+        return ("current", manifest)
+    return ("outdated", manifest)
+
+# store_manifest
+# """"""""""""""
+#
+# Store the manifest with the hash of the written output (like the
+# `doctest result cache`_, via a temporary file)::
+
+def store_manifest(manifest, outfile):
+    """Store `manifest` with the hash of `outfile`"""
+    import json
+    manifest = dict(manifest, output_hash=file_hash(outfile))
+    path = manifest_file(outfile)
+    tmpfile = "%s.%d.tmp" % (path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stream = open(tmpfile, 'w')
+        json.dump(manifest, stream, indent=1)
+        stream.close()
+        os.replace(tmpfile, path)
+    except OSError:
+        try:
+            os.unlink(tmpfile)
+        except OSError:
+            pass
+
+# write_depfile
+# """""""""""""
+#
+# Write a make-style dependency file ``<outfile>.d`` listing the inputs of
+# the output (for `make` and `ninja`)::
 
+def write_depfile(manifest):
+    """Write make-style depfile for the output of `manifest`"""
+    def escape(path):
+        return path.replace("\\", "\\\\").replace(" ", "\\ "
+                  ).replace("#", "\\#").replace("$", "$$")
+    outfile = manifest["output"]
+    stream = open(outfile + ".d", 'w')
+    stream.write("%s: %s\n" % (escape(outfile), " ".join(
+                 escape(path) for (path, digest) in manifest["inputs"])))
+    stream.close()
+
+
+# .. _get_converter:
+#
 # get_converter
 # ~~~~~~~~~~~~~
 #
-# Get an instance of the converter state machine::
+# Get an instance of the converter state machine.
+#
+# For high-volume programmatic use, set up a converter once without `data`
+# and call it with the data of every input (see
+# `TextCodeConverter.__call__`_):
+#
+# >>> convert = get_converter(txt2code=False, language="c")
+# >>> convert(["// text::\n", "\n", "code\n"])
+# ['text::\n', '\n', '  code\n']
+#
+# ::
 
-def get_converter(data, txt2code=True, **keyw):
+def get_converter(data=None, txt2code=True, **keyw):
     if txt2code:
         return Text2Code(data, **keyw)
     else:
         return Code2Text(data, **keyw)
 
 
+# content_hash
+# ~~~~~~~~~~~~
+#
+# Return a hex digest identifying the content of `data` (a string or a list
+# of lines) and optional `settings` (e.g. the result of `converter_settings`_).
+# Used as key for caches of conversion results::
+
+def content_hash(data, *settings):
+    """Return SHA-1 hex digest of `data` and `settings`"""
+    import hashlib
+    if not isinstance(data, str):
+        data = "".join(data)
+    digest = hashlib.sha1(data.encode('utf-8', 'surrogateescape'))
+    for setting in settings:
+        digest.update(repr(setting).encode('utf-8', 'surrogateescape'))
+    return digest.hexdigest()
+
+# converter_settings
+# ~~~~~~~~~~~~~~~~~~
+#
+# Return the values of the options that influence the result of a
+# conversion, i.e. the conversion direction and the data attributes of
+# the TextCodeConverter_ that can be set by keyword arguments::
+
+_converter_settings = ("language", "comment_string", "code_block_marker",
+                       "header_string", "codeindent", "strip",
+                       "strip_marker", "add_missing_marker")
+
+def converter_settings(txt2code=True, **keyw):
+    """Return tuple of conversion relevant option values"""
+    return (bool(txt2code),) + tuple(keyw.get(key)
+                                     for key in _converter_settings)
+
+# LRUCache
+# ~~~~~~~~
+#
+# A size-limited mapping that discards the least recently used items. Access
+# is serialised with a lock, as the `conversion server`_ answers requests
+# from a pool of worker threads::
+
+class LRUCache(object):
+    """Thread-safe mapping with least-recently-used eviction"""
+
+    def __init__(self, maxsize=256):
+        import collections, threading
+        self.maxsize = maxsize
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+# cached_conversion
+# ~~~~~~~~~~~~~~~~~
+#
+# Convert `data` (a list of lines) and return the list of converted lines.
+# If a `cache` (e.g. a LRUCache_ instance) is given, results are stored with
+# the content hash of the data and the conversion settings as key and
+# re-used for unchanged input. The returned list must not be modified. ::
+
+def cached_conversion(data, cache=None, txt2code=True, **keyw):
+    """Return list of converted lines, use `cache` if given"""
+    if cache is None:
+        return get_converter(data, txt2code, **keyw)()
+    key = content_hash(data, converter_settings(txt2code, **keyw))
+    lines = cache.get(key)
+    if lines is None:
+        lines = get_converter(data, txt2code, **keyw)()
+        cache[key] = lines
+    return lines
+
+# .. _code_fingerprint:
+#
+# code_fingerprint
+# ~~~~~~~~~~~~~~~~
+#
+# Build steps and caches often only depend on the code content of a
+# literate document. `code_lines` returns the code lines of `data`: the
+# code blocks of a text source (after the conversion, i.e. without the
+# indentation as literal block) or the non-comment blocks of a code source.
+# Trailing blank lines of code sections (that separate them from the
+# documentation) are dropped, so that a text source and the corresponding
+# code source yield the same lines (see `LiterateDocument`_)::
+
+def code_lines(data, txt2code=True, **keyw):
+    """Return list of code lines of the text or code source `data`"""
+    return LiterateDocument(data, txt2code, **keyw).code_lines()
+
+# The code fingerprint is the content hash of the code lines. It does not
+# change if only documentation blocks are edited::
+
+def code_fingerprint(data, txt2code=True, **keyw):
+    """Return SHA-1 hex digest of the code lines of `data`"""
+    return content_hash(code_lines(data, txt2code, **keyw))
+
+
 # Use cases
 # ---------
 #
@@ -1555,30 +3168,34 @@ def get_converter(data, txt2code=True, **keyw):
 # ~~~~~~~~~~~
 # ::
 
-def run_doctest(infile="-", txt2code=True,
-                globs={}, verbose=False, optionflags=0, **keyw):
+def run_doctest(infile="-", txt2code=True, globs={}, verbose=False,
+                optionflags=0, doctest_cache=False, force=False, timing=0,
+                timings=None, document=None, **keyw):
     """run doctest on the text source
     """
 
 # Allow imports from the current working dir by prepending an empty string to
 # sys.path (see doc of sys.path())::
 
-    sys.path.insert(0, '')
+    if '' not in sys.path:
+        sys.path.insert(0, '')
 
 # Import classes from the doctest module::
 
-    from doctest import DocTestParser, DocTestRunner
+    from doctest import DocTest, DocTestRunner
 
-# Read in source. Make sure it is in text format, as tests in comments are not
-# found by doctest::
+# Read in source (unless a parsed `LiterateDocument`_ is given). Make sure it
+# is in text format, as tests in comments are not found by doctest::
 
-    (data, out_stream) = open_streams(infile, "-")
-    if txt2code is False:
-        keyw.update({'add_missing_marker': False})
-        converter = Code2Text(data, **keyw)
-        docstring = str(converter)
+    if document is not None:
+        docstring = document.doctest_text()
     else:
-        docstring = data.read()
+        (data, out_stream) = open_streams(infile, "-")
+        lines = data.readlines()
+        if txt2code is False:
+            docstring = "".join(Code2Text(lines, **keyw).doctest_lines())
+        else:
+            docstring = "".join(lines)
 
 # decode doc string if there is a "magic comment" in the first or second line
 # (http://docs.python.org/reference/lexical_analysis.html#encoding-declarations)
@@ -1586,22 +3203,383 @@ def run_doctest(infile="-", txt2code=True,
 
     firstlines = ' '.join(docstring.splitlines()[:2])
     match = re.search('coding[=:]\s*([-\w.]+)', firstlines)
-    if match:
+    if match and isinstance(docstring, bytes):
         docencoding = match.group(1)
         docstring = docstring.decode(docencoding)
 
-# Use the doctest Advanced API to run all doctests in the source text::
-
-    test = DocTestParser().get_doctest(docstring, globs, name="",
-                                       filename=infile, lineno=0)
+# Use the doctest Advanced API to run all doctests in the source text.
+#
+# The examples are run in `doctest groups`_ with shared globals. With
+# `doctest_cache`, groups that passed in a previous run are skipped, unless
+# `force` is True (see `doctest result cache`_). If a later group must run,
+# the skipped groups are replayed silently before, to set up the globals::
+
+    groups = doctest_groups(docstring)
+    fingerprints = []
+    if groups and doctest_cache:
+        if document is None:
+            document = LiterateDocument(lines, txt2code, **keyw)
+        fingerprints = doctest_fingerprints(groups, document.code_lines(),
+                                            optionflags)
+    cachefile = doctest_cache and infile != '-' and doctest_cachefile(infile)
+    passed = set()
+    if cachefile and not force:
+        passed = load_doctest_cache(cachefile)
+    first = 0
+    while first < len(fingerprints) and fingerprints[first] in passed:
+        first += 1
+    test_globs = dict(globs)
     runner = DocTestRunner(verbose, optionflags)
-    runner.run(test)
-    runner.summarize
+    cached = 0
+    for (i, examples) in enumerate(groups):
+        test = DocTest(examples, {}, "", infile, 0, docstring)
+        test.globs = test_globs # not a copy
+        if i < first:
+            cached += len(examples)
+            if first < len(groups):
+                DocTestRunner(False, optionflags).run(test, clear_globs=False,
+                                                      out=lambda s: None)
+            continue
+        failures = runner.failures
+        if timings is None and not timing:
+            runner.run(test, clear_globs=False)
+        else:
+            timings = time_examples(runner, test, timings)
+        if fingerprints and runner.failures == failures:
+            passed.add(fingerprints[i])
+    test_globs.clear()
+    if cachefile and first < len(groups):
+        store_doctest_cache(cachefile, passed.intersection(fingerprints))
+
     # give feedback also if no failures occurred
-    if not runner.failures:
+    if cached:
+        print("%d failures in %d tests (%d cached)"
+              % (runner.failures, runner.tries, cached))
+    elif not runner.failures:
         print("%d failures in %d tests"%(runner.failures, runner.tries))
+    if timing:
+        print_doctest_timings(timings, timing)
     return runner.failures, runner.tries
 
+# Doctest timing
+# ~~~~~~~~~~~~~~
+#
+# With the `timing` argument, `run_doctest`_ reports the `timing` slowest
+# examples and the total time per file. Alternatively, a list can be passed
+# as `timings` argument to collect the measurements.
+#
+# `time_examples` runs the examples of `test` one at a time and appends
+# (file, line, seconds) tuples to the list `timings`. The line number is
+# the line of the example in the text source (or code source, as
+# `doctest_lines`_ keeps line numbers)::
+
+def time_examples(runner, test, timings=None):
+    """Run examples of `test` with `runner`, return list of timings"""
+    import time
+    if timings is None:
+        timings = []
+    examples = test.examples
+    try:
+        for example in examples:
+            test.examples = [example]
+            start = time.perf_counter()
+            runner.run(test, clear_globs=False)
+            timings.append((test.filename, test.lineno + example.lineno + 1,
+                            time.perf_counter() - start))
+    finally:
+        test.examples = examples
+    return timings
+
+# `print_doctest_timings` prints the `number` slowest examples and the
+# per-file totals::
+
+def print_doctest_timings(timings, number=10):
+    """Print the slowest examples and the total time per file"""
+    print("%d slowest examples:" % min(number, len(timings)))
+    for (filename, line, seconds) in sorted(timings,
+                                            key=lambda t: -t[2])[:number]:
+        print("%8.3f s  %s:%d" % (seconds, filename, line))
+    totals = {}
+    for (filename, line, seconds) in timings:
+        (count, total) = totals.get(filename, (0, 0.0))
+        totals[filename] = (count + 1, total + seconds)
+    print("total time per file:")
+    for filename in sorted(totals, key=lambda f: -totals[f][1]):
+        print("%8.3f s  %s (%d examples)" % (totals[filename][1], filename,
+                                              totals[filename][0]))
+
+# .. _doctest groups:
+#
+# doctest_groups
+# ~~~~~~~~~~~~~~
+#
+# Split the examples in `docstring` into groups of examples that are not
+# separated by text (typically a doctest block in a documentation block).
+# The examples keep the line numbers of the complete document::
+
+def doctest_groups(docstring):
+    """Return list of lists of doctest examples in `docstring`"""
+    from doctest import DocTestParser, Example
+    groups = []
+    new_group = True
+    for piece in DocTestParser().parse(docstring):
+        if isinstance(piece, Example):
+            if new_group:
+                groups.append([])
+                new_group = False
+            groups[-1].append(piece)
+        elif piece.strip():
+            new_group = True
+    return groups
+
+# .. _blank_text_block:
+#
+# blank_text_block
+# ~~~~~~~~~~~~~~~~
+#
+# Blocks without doctests are replaced by blank lines for doctest (keeping
+# the line numbers). The first non-blank line is kept, so that the blocks
+# still separate the `doctest groups`_ (the block has no doctest prompt and
+# follows a blank line, so the line is text for doctest)::
+
+def blank_text_block(block):
+    """Return blank lines for `block`, keep the first non-blank line"""
+    lines = ["\n"] * len(block)
+    for (i, line) in enumerate(block):
+        if line.strip():
+            lines[i] = line
+            break
+    return lines
+
+# doctest_fingerprints
+# ~~~~~~~~~~~~~~~~~~~~
+#
+# Return a list with a fingerprint for every group.
+#
+# A group depends on the `code` lines of the document (that examples may
+# import or execute, see `code_fingerprint`_), on all preceding groups (via
+# the shared globals), and on the expected output of its own examples.
+# Edits of the documentation text leave the fingerprints unchanged.
+# Dependencies outside the document (e.g. imported modules) are not tracked:
+# use `force` after changing them.
+# ::
+
+def doctest_fingerprints(groups, code, optionflags=0):
+    """Return list of fingerprints of the doctest `groups`"""
+    state = content_hash(code, sys.version, optionflags)
+    fingerprints = []
+    for examples in groups:
+        state = content_hash(state, [example.source for example in examples])
+        fingerprints.append(content_hash(state, [example.want
+                                                 for example in examples]))
+    return fingerprints
+
+# .. _doctest result cache:
+#
+# Doctest result cache
+# ~~~~~~~~~~~~~~~~~~~~
+#
+# The cache is used with ``--doctest-cache`` only, as it writes to the
+# source directory. The fingerprints of passed groups are stored in a JSON
+# file in the ``__pycache__`` directory next to `infile`::
+
+def doctest_cachefile(infile):
+    """Return path of the doctest result cache for `infile`"""
+    (dirname, basename) = os.path.split(os.path.abspath(infile))
+    return os.path.join(dirname, "__pycache__", basename+".pylit-doctest.json")
+
+def load_doctest_cache(cachefile):
+    """Return set of fingerprints of passed groups stored in `cachefile`"""
+    import json
+    try:
+        stream = open(cachefile)
+        passed = json.load(stream)["passed"]
+        stream.close()
+    except (OSError, ValueError, KeyError, TypeError):
+        return set()
+    return set(passed)
+
+# Like in `store_cached_code`_, the data is written to a temporary file and
+# renamed::
+
+def store_doctest_cache(cachefile, passed):
+    """Store the set of fingerprints of `passed` groups in `cachefile`"""
+    import json
+    tmpfile = "%s.%d.tmp" % (cachefile, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(cachefile), exist_ok=True)
+        stream = open(tmpfile, 'w')
+        json.dump({"passed": sorted(passed)}, stream)
+        stream.close()
+        os.replace(tmpfile, cachefile)
+    except OSError:
+        try:
+            os.unlink(tmpfile)
+        except OSError:
+            pass
+
+
+# run_doctests
+# ~~~~~~~~~~~~
+#
+# Run the doctests of many text or code sources in parallel. Every file is
+# tested in a separate process (at most `workers` at a time) with fresh
+# globals and captured output. A process exceeding `timeout` seconds is
+# terminated.
+#
+# The conversion direction (and language) is determined for every file
+# separately, from the keyword arguments and the file name. A summary is
+# printed and the results (status, failures, tries, and duration per file)
+# are written to `report`, a JUnit XML file if the name ends with ``.xml``
+# and JSON otherwise. With `timing`, the slowest examples of all files are
+# reported (see `Doctest timing`_).
+#
+# Returns the total number of failures and tries (like `run_doctest`_)::
+
+def run_doctests(infiles, workers=None, timeout=None, report=None,
+                 timing=0, **keyw):
+    """Run doctests of `infiles` in parallel, return (failures, tries)
+    """
+    import multiprocessing, multiprocessing.connection, time
+
+    workers = workers or os.cpu_count() or 1
+    options = PylitOptions()
+    pending = list(infiles)
+    running = {}
+    results = {}
+    while pending or running:
+
+# Start processes for pending files::
+
+        while pending and len(running) < workers:
+            infile = pending.pop(0)
+            values = OptionValues(keyw)
+            values.infile = infile
+            values.outfile = "-"
+            values = options.complete_values(values).as_dict()
+            (receiver, sender) = multiprocessing.Pipe(False)
+            process = multiprocessing.Process(target=_run_doctest_process,
+                                              args=(sender, values, timing))
+            process.start()
+            sender.close()
+            running[process] = (infile, receiver, time.time())
+
+# Collect results and terminate processes that timed out::
+
+        connections = [receiver for (infile, receiver, start)
+                       in running.values()]
+        ready = multiprocessing.connection.wait(connections, 0.1)
+        for process, (infile, receiver, start) in list(running.items()):
+            if receiver in ready:
+                try:
+                    result = receiver.recv()
+                except EOFError:
+                    result = {"status": "error", "failures": 0, "tries": 0,
+                              "output": "process exited with code %s\n"
+                              % process.exitcode}
+                process.join()
+            elif timeout and time.time() - start > timeout:
+                process.terminate()
+                process.join()
+                result = {"status": "timeout", "failures": 0, "tries": 0,
+                          "output": "timeout after %s s\n" % timeout}
+            else:
+                continue
+            receiver.close()
+            result.setdefault("duration", time.time() - start)
+            result["file"] = infile
+            results[infile] = result
+            del running[process]
+
+# Report::
+
+    results = [results[infile] for infile in infiles]
+    for result in results:
+        print("%-7s %-40s %3d failures in %3d tests (%.2f s)"
+              % (result["status"], result["file"], result["failures"],
+                 result["tries"], result["duration"]))
+        if result["status"] != "ok":
+            sys.stdout.write(result["output"])
+    failures = sum(result["failures"] for result in results)
+    tries = sum(result["tries"] for result in results)
+    print("%d failures in %d tests in %d files" % (failures, tries,
+                                                   len(results)))
+    if timing:
+        print_doctest_timings([(result["file"], line, seconds)
+                               for result in results
+                               for (line, seconds)
+                               in result.get("timings", [])], timing)
+    if report:
+        write_doctest_report(results, report)
+    return failures, tries
+
+# The worker process runs `run_doctest`_ with captured output and sends the
+# result through the `connection`::
+
+def _run_doctest_process(connection, keyw, timing=0):
+    """Run doctest in a worker process, send the result dictionary"""
+    import io, time, traceback
+    output = io.StringIO()
+    sys.stdout = output
+    sys.stderr = output
+    start = time.time()
+    timings = None
+    if timing:
+        timings = []
+    try:
+        (failures, tries) = run_doctest(timings=timings, **keyw)
+        status = failures and "failed" or "ok"
+    except Exception:
+        traceback.print_exc()
+        (failures, tries, status) = (0, 0, "error")
+    connection.send({"status": status, "failures": failures,
+                     "tries": tries, "duration": time.time() - start,
+                     "timings": [[line, seconds] for (filename, line, seconds)
+                                 in timings or []],
+                     "output": output.getvalue()})
+    connection.close()
+
+# write_doctest_report
+# ~~~~~~~~~~~~~~~~~~~~
+#
+# Write the results of `run_doctests`_ to a JSON or JUnit XML file::
+
+def write_doctest_report(results, path):
+    """Write doctest results to `path` (JUnit XML if it ends with .xml)"""
+    stream = open(path, 'w')
+    if not path.endswith(".xml"):
+        import json
+        json.dump({"failures": sum(r["failures"] for r in results),
+                   "tries": sum(r["tries"] for r in results),
+                   "duration": sum(r["duration"] for r in results),
+                   "files": results}, stream, indent=2)
+        stream.close()
+        return
+    from xml.sax.saxutils import escape, quoteattr
+    stream.write('<?xml version="1.0" encoding="utf-8"?>\n')
+    stream.write('<testsuite name="pylit.doctest" tests="%d" failures="%d" '
+                 'errors="%d" time="%.3f">\n'
+                 % (len(results),
+                    len([r for r in results if r["status"] == "failed"]),
+                    len([r for r in results
+                         if r["status"] in ("error", "timeout")]),
+                    sum(r["duration"] for r in results)))
+    for result in results:
+        stream.write('  <testcase classname="pylit.doctest" name=%s '
+                     'time="%.3f"' % (quoteattr(result["file"]),
+                                      result["duration"]))
+        if result["status"] == "ok":
+            stream.write('/>\n')
+            continue
+        tag = result["status"] == "failed" and "failure" or "error"
+        stream.write('>\n    <%s message=%s>%s</%s>\n  </testcase>\n'
+                     % (tag, quoteattr("%s: %d failures in %d tests"
+                        % (result["status"], result["failures"],
+                           result["tries"])),
+                        escape(result["output"]), tag))
+    stream.write('</testsuite>\n')
+    stream.close()
+
 
 # diff
 # ~~~~
@@ -1615,43 +3593,205 @@ def diff(infile='-', outfile='-', txt2code=True, **keyw):
     report differences.
     """
 
+    (delta, oldname, newname) = diff_lines(infile, outfile, txt2code, **keyw)
+
+    # print the differences
+    is_different = False
+    for line in delta:
+        is_different = True
+        print(line, end=' ')
+    if not is_different:
+        print(oldname)
+        print(newname)
+        print("no differences found")
+    return is_different
+
+# diff_lines
+# ~~~~~~~~~~
+#
+# Find the differences reported by `diff`_. Returns a list of lines of the
+# unified diff and the names of the compared versions. The input `data` (a
+# list of lines) can be passed in by callers that already read `infile`, a
+# `cache` is passed on to `cached_conversion`_. A parsed `document` (see
+# `LiterateDocument`_) replaces both::
+
+def diff_lines(infile='-', outfile='-', txt2code=True, data=None, cache=None,
+               document=None, **keyw):
+    """Return unified diff of converted infile and existing outfile
+
+    diff_lines(infile, outfile, txt2code) -> (delta, oldname, newname)
+    """
+
     import difflib
 
-    instream = open(infile)
-    # for diffing, we need a copy of the data as list::
-    data = instream.readlines()
+    if document is not None:
+        data = document.source
+    elif data is None:
+        instream = open(infile)
+        # for diffing, we need a copy of the data as list::
+        data = instream.readlines()
+        instream.close()
     # convert
-    converter = get_converter(data, txt2code, **keyw)
-    new = converter()
+    if document is not None:
+        new = document.converted()
+    else:
+        new = cached_conversion(data, cache, txt2code, **keyw)
 
     if outfile != '-' and os.path.exists(outfile):
         outstream = open(outfile)
         old = outstream.readlines()
+        outstream.close()
         oldname = outfile
         newname = "<conversion of %s>"%infile
     else:
         old = data
         oldname = infile
         # back-convert the output data
-        converter = get_converter(new, not txt2code)
-        new = converter()
+        if document is not None:
+            new = document.round_trip()
+        else:
+            new = cached_conversion(new, cache, not txt2code)
         newname = "<round-conversion of %s>"%infile
 
-    # find and print the differences
-    is_different = False
-    # print type(old), old
-    # print type(new), new
-    delta = difflib.unified_diff(old, new,
-    # delta = difflib.unified_diff(["heute\n", "schon\n"], ["heute\n", "noch\n"],
-                                      fromfile=oldname, tofile=newname)
-    for line in delta:
-        is_different = True
-        print(line, end=' ')
-    if not is_different:
-        print(oldname)
-        print(newname)
-        print("no differences found")
-    return is_different
+    delta = list(difflib.unified_diff(old, new,
+                                      fromfile=oldname, tofile=newname))
+    return (delta, oldname, newname)
+
+# .. _run_actions:
+#
+# run_actions
+# ~~~~~~~~~~~
+#
+# Combine several actions in one invocation. The input is read and parsed
+# only once into a `LiterateDocument`_, all actions use its views. The
+# actions run in the order "diff", "doctest", "convert" (so that the diff
+# compares with the existing output file), "execute".
+#
+# Returns a dictionary with the results of `diff`_ and `run_doctest`_::
+
+def run_actions(actions, infile="-", outfile="-", txt2code=True, **keyw):
+    """Run `actions` on the input, reading and parsing it only once"""
+    (data, out_stream) = open_streams(infile, "-")
+    document = LiterateDocument(data.readlines(), txt2code, **keyw)
+    if data is not sys.stdin:
+        data.close()
+    results = {}
+    if "diff" in actions:
+        results["diff"] = diff(infile, outfile, txt2code,
+                               document=document, **keyw)
+    if "doctest" in actions:
+        results["doctest"] = run_doctest(infile, txt2code,
+                                         document=document, **keyw)
+    if "convert" in actions:
+        convert_file(infile, outfile, txt2code, document=document, **keyw)
+    if "execute" in actions:
+        code = compile("".join(document.code()), infile, 'exec',
+                       dont_inherit=True)
+        exec(code, {"__name__": "__main__", "__file__": infile,
+                    "__builtins__": builtins})
+    return results
+
+# .. _convert_file:
+#
+# convert_file
+# ~~~~~~~~~~~~
+#
+# Convert `infile` and write the result to `outfile` (the default action of
+# `main`_). A parsed `document` (see `LiterateDocument`_) replaces the
+# conversion of the input. The output is written with `write_output`_,
+# errors are reported and end the program::
+
+def convert_file(infile="-", outfile="-", txt2code=True, document=None,
+                 **keyw):
+    """Convert `infile` and write the result to `outfile`"""
+    if document is not None:
+        convert = lambda data: "".join(document.converted())
+    else:
+        convert = lambda data: str(get_converter(data, txt2code, **keyw))
+    try:
+        status = write_output(infile, outfile, convert, txt2code, **keyw)
+    except IOError as ex:
+        print("IOError: %s %s" % (ex.filename, ex.strerror))
+        sys.exit(ex.errno)
+    if status == "current":
+        print(outfile, "is up to date")
+    elif outfile != "-":
+        print("extract written to", outfile)
+
+# .. _write_output:
+#
+# write_output
+# ~~~~~~~~~~~~
+#
+# Write the output of ``convert(in_stream)`` to `outfile`. Used by
+# `convert_file`_ and the `conversion server`_. Returns "current" if the
+# output is up to date (and nothing was written) or "written". Raises
+# `IOError` if a stream cannot be opened or the output must not be
+# overwritten.
+#
+# With `manifest` or `deps`, check the `dependency manifest`_ of a
+# file-to-file conversion (if the input exists). Skip the conversion if the
+# output is up to date, overwrite an unmodified output if an input changed.
+# Then open in- and output streams::
+
+def write_output(infile, outfile, convert, txt2code=True, overwrite="update",
+                 replace=False, manifest=False, deps=False, **keyw):
+    """Write the conversion of `infile` to `outfile`, return the status"""
+    inputs = None
+    if ((manifest or deps) and infile != '-' and outfile != '-'
+        and os.path.isfile(infile)):
+        (status, inputs) = check_manifest(infile, outfile, txt2code, **keyw)
+        if status == "current" and overwrite == "update":
+            if deps:
+                write_depfile(inputs)
+            if replace:
+                os.rename(infile, infile + "~")
+            return "current"
+        if status == "outdated" and overwrite == "update":
+            overwrite = "yes"
+    (data, out_stream) = open_streams(infile, outfile, overwrite)
+
+# Convert and write to out_stream::
+
+    output = convert(data)
+    if data is not sys.stdin:
+        data.close()
+    out_stream.write(output)
+
+    if out_stream is not sys.stdout:
+        out_stream.close()
+
+# If input and output are from files, set the modification time (`mtime`) of
+# the output file to the one of the input file to indicate that the contained
+# information is equal. [#]_ ::
+
+        try:
+            os.utime(outfile, (os.path.getatime(outfile),
+                               os.path.getmtime(infile)))
+        except OSError:
+            pass
+
+# Store the manifest. With ``--deps``, write a depfile and set the
+# modification time to the one of the newest input (so that `make` does
+# not consider the output outdated after the change of an included file)::
+
+        if inputs is not None:
+            if deps:
+                write_depfile(inputs)
+                mtime = max(os.path.getmtime(path)
+                            for (path, digest) in inputs["inputs"])
+                os.utime(outfile, (mtime, mtime))
+            store_manifest(inputs, outfile)
+
+# .. [#] Make sure the corresponding file object (here `out_stream`) is
+#        closed, as otherwise the change will be overwritten when `close` is
+#        called afterwards (either explicitly or at program exit).
+#
+# Rename the infile to a backup copy if `replace` is set::
+
+    if replace:
+        os.rename(infile, infile + "~")
+    return "written"
 
 
 # execute
@@ -1659,17 +3799,837 @@ def diff(infile='-', outfile='-', txt2code=True, **keyw):
 #
 # Works only for python code.
 #
-# Does not work with `eval`, as code is not just one expression. ::
+# Does not work with `eval`, as code is not just one expression.
+#
+# The code is compiled with `compile_cached`_ and executed in a fresh
+# namespace as main module (like a script started with the Python
+# interpreter). ::
 
 def execute(infile="-", txt2code=True, **keyw):
     """Execute the input file. Convert first, if it is a text source.
     """
 
-    data = open(infile)
-    if txt2code:
-        data = str(Text2Code(data, **keyw))
-    # print "executing " + options.infile
-    exec(data)
+    code = compile_cached(infile, txt2code, **keyw)
+    namespace = {"__name__": "__main__", "__file__": infile,
+                 "__builtins__": builtins}
+    exec(code, namespace)
+
+# .. _compile_cached:
+#
+# compile_cached
+# """"""""""""""
+#
+# Return the code object for `infile`. Compiled code is cached on disk in
+# the ``__pycache__`` directory next to `infile`. The cache file starts with
+# a key built from the content hash of the input, the conversion settings,
+# the PyLit version, and the absolute path of `infile` (the file name of the
+# code object), it is only used if the key matches. ::
+
+def compile_cached(infile="-", txt2code=True, **keyw):
+    """Return compiled code of `infile`, use cached bytecode if valid"""
+    if infile == '-':
+        source = sys.stdin.read()
+        cachefile = None
+    else:
+        instream = open(infile)
+        source = instream.read()
+        instream.close()
+        infile = os.path.abspath(infile)
+        (dirname, basename) = os.path.split(infile)
+        cachefile = os.path.join(dirname, "__pycache__", "%s.pylit-exec.%s.pyc"
+                                 % (basename, sys.implementation.cache_tag))
+    key = (importlib.util.MAGIC_NUMBER + content_hash(source,
+               converter_settings(txt2code, **keyw), _version,
+               infile).encode('ascii'))
+    code = cachefile and load_cached_code(cachefile, key)
+    if code is None:
+        if txt2code:
+            source = str(Text2Code(source.splitlines(True), **keyw))
+        code = compile(source, infile, 'exec', dont_inherit=True)
+        if cachefile:
+            store_cached_code(cachefile, key, code)
+    return code
+
+# load_cached_code
+# """"""""""""""""
+#
+# Return the code object stored in `cachefile` or None, if the file does not
+# exist, does not start with `key`, or is corrupt::
+
+def load_cached_code(cachefile, key):
+    """Return code object from `cachefile` if it starts with `key`"""
+    import marshal
+    try:
+        stream = open(cachefile, 'rb')
+        data = stream.read()
+        stream.close()
+    except OSError:
+        return None
+    if data[:len(key)] != key:
+        return None
+    try:
+        return marshal.loads(data[len(key):])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+# store_cached_code
+# """""""""""""""""
+#
+# Write `key` and the marshalled code object to `cachefile` (unless writing
+# of bytecode is disabled). The data is written to a temporary file and
+# renamed, so that concurrent readers never see a partially written file::
+
+def store_cached_code(cachefile, key, code):
+    """Store code object in `cachefile`, prefixed by `key`"""
+    import marshal
+    if sys.dont_write_bytecode:
+        return
+    tmpfile = "%s.%d.tmp" % (cachefile, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(cachefile), exist_ok=True)
+        stream = open(tmpfile, 'wb')
+        stream.write(key + marshal.dumps(code))
+        stream.close()
+        os.replace(tmpfile, cachefile)
+    except OSError:
+        try:
+            os.unlink(tmpfile)
+        except OSError:
+            pass
+
+# .. _fork server:
+#
+# Fork server
+# """""""""""
+#
+# Literate scripts that import heavy modules (e.g. numpy or pandas) spend
+# most of their runtime with the import. The fork server (``--fork-server``)
+# imports the modules listed in the ``--preload`` option once and forks a
+# fresh child process for every execution request. Together with
+# ``--client``, ``--execute`` lets a running fork server execute the
+# script.
+#
+# The client passes its standard in- and output file descriptors together
+# with the request (a JSON object with the option values, the working
+# directory and `sys.argv`) and receives the exit status of the script.
+# The server forks once per request (`socketserver.ForkingMixIn`), the
+# handler executes the script in the child process. ::
+
+def make_fork_server(socket_path=None, preload=(), **keyw):
+    """Return fork server executing requests in child processes"""
+    import json, socket, socketserver
+
+    for name in preload or ():
+        importlib.import_module(name)
+
+    class ExecuteHandler(socketserver.BaseRequestHandler):
+        """Execute the requested script (in the forked child process)"""
+        def handle(self):
+            (message, fds, flags, address) = socket.recv_fds(self.request,
+                                                             2**16, 3)
+            request = json.loads(message.decode('utf-8'))
+            response = {"status": run_forked(request, fds)}
+            self.request.sendall(json.dumps(response).encode('utf-8')
+                                 + b"\n")
+
+    class ForkServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+        """Unix domain socket server forking for every request"""
+        def process_request(self, request, client_address):
+            sys.stdout.flush()
+            sys.stderr.flush()
+            socketserver.ForkingMixIn.process_request(self, request,
+                                                      client_address)
+
+    socket_path = socket_path or default_socket_path("fork")
+    remove_stale_socket(socket_path)
+    umask = os.umask(0o177)
+    try:
+        return ForkServer(socket_path, ExecuteHandler)
+    finally:
+        os.umask(umask)
+
+# The forked child takes over the client's standard streams and working
+# directory, executes the script and returns the exit status::
+
+def run_forked(request, fds):
+    """Execute `request` in a forked child, return exit status"""
+    import traceback
+    status = 0
+    try:
+        for (fd, target) in zip(fds, (0, 1, 2)):
+            os.dup2(fd, target)
+        os.chdir(request["cwd"])
+        sys.argv = request["argv"]
+        execute(**request["options"])
+    except SystemExit as ex:
+        if isinstance(ex.code, int) or ex.code is None:
+            status = ex.code or 0
+        else:
+            print(ex.code, file=sys.stderr)
+            status = 1
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return status
+
+def serve_forks(socket_path=None, preload=(), **keyw):
+    """Run a fork server on a Unix domain socket"""
+    server = make_fork_server(socket_path, preload)
+    print("pylit fork server listening on", server.server_address)
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(server.server_address)
+
+# The client sends the request with the file descriptors of its standard
+# streams and returns the exit status. It raises `IOError`, if there is no
+# fork server listening at `socket_path`::
+
+def execute_forked(socket_path=None, **options):
+    """Let a running fork server execute the script, return exit status"""
+    import json, socket
+    socket_path = socket_path or default_socket_path("fork")
+    request = {"cwd": os.getcwd(), "argv": sys.argv,
+               "options": {"infile": options["infile"],
+                           "txt2code": options["txt2code"]}}
+    for key in _converter_settings:
+        request["options"][key] = options.get(key)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        socket.send_fds(sock, [json.dumps(request).encode('utf-8')],
+                        [0, 1, 2])
+        line = sock.makefile('rb').readline()
+    finally:
+        sock.close()
+    if not line:
+        raise IOError(32, "No response from fork server", socket_path)
+    return json.loads(line.decode('utf-8'))["status"]
+
+
+# .. _hot reload:
+#
+# Hot reload
+# """"""""""
+#
+# While developing a literate service, ``--execute --reload`` runs the
+# program, watches the source file and restarts the program after every
+# change. The text source is converted with
+# `TextCodeConverter.convert_blocks`_ and a memo of the block conversions,
+# so that only the blocks changed by an edit are re-converted.
+#
+# The program runs in a child process (started with `multiprocessing`) in a
+# fresh namespace. If the changed source does not compile, the error is
+# reported and the running program is kept. ::
+
+class Reloader(object):
+    """Execute a program and restart it when its source changes"""
+
+    def __init__(self, infile, txt2code=True, **keyw):
+        self.infile = infile
+        self.txt2code = txt2code
+        self.converter = get_converter(txt2code=True, **keyw)
+        self.memo = LRUCache(4096)
+        self.mtime = None
+        self.process = None
+
+# Read, convert, and compile the source. Errors in the conversion (e.g. a
+# less indented line in a code block) and syntax errors are reported, the
+# running program is kept::
+
+    def compile(self):
+        """Return code object of the current source or None on errors"""
+        instream = open(self.infile)
+        data = instream.readlines()
+        instream.close()
+        try:
+            if self.txt2code:
+                blocks = self.converter.convert_blocks(data, self.memo)
+                data = [line for (state, block, output) in blocks
+                        for line in output]
+            return compile("".join(data), self.infile, 'exec',
+                           dont_inherit=True)
+        except (SyntaxError, ValueError):
+            import traceback
+            traceback.print_exc(limit=0)
+            return None
+
+# Start and stop the program::
+
+    def start(self, code):
+        import marshal, multiprocessing
+        self.process = multiprocessing.Process(target=_run_marshalled,
+                            args=(marshal.dumps(code), self.infile))
+        self.process.start()
+
+    def stop(self, timeout=5):
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.kill()
+        self.process.join()
+        self.process = None
+
+# Check the modification time of the source and (re)start the program if it
+# changed. Returns True, if the program was (re)started::
+
+    def poll(self):
+        """(Re)start the program if the source changed"""
+        try:
+            mtime = os.stat(self.infile).st_mtime_ns
+        except OSError:
+            return False # file is being replaced by an editor
+        if mtime == self.mtime:
+            return False
+        self.mtime = mtime
+        code = self.compile()
+        if code is None:
+            return False
+        if self.process is not None:
+            print("pylit: %s changed, restarting" % self.infile,
+                  file=sys.stderr)
+            self.stop()
+        self.start(code)
+        return True
+
+    def run(self, interval=0.5):
+        """Watch the source until interrupted"""
+        import time
+        try:
+            while True:
+                self.poll()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+def _run_marshalled(data, infile):
+    """Execute marshalled code object in a fresh main namespace"""
+    import marshal
+    namespace = {"__name__": "__main__", "__file__": infile,
+                 "__builtins__": builtins}
+    exec(marshal.loads(data), namespace)
+
+def execute_reload(infile="-", txt2code=True, **keyw):
+    """Execute the input file, restart it after changes"""
+    Reloader(infile, txt2code, **keyw).run()
+
+
+# Import hook
+# ~~~~~~~~~~~
+#
+# Literate Python modules can be imported directly from the text source
+# (e.g. ``import foo`` from ``foo.py.txt``) after installing the import hook
+# with `install_import_hook`_. This removes the need to keep generated code
+# sources in the tree.
+#
+# The compiled code is cached in ``__pycache__`` (e.g. as
+# ``__pycache__/foo.py.cpython-311.pyc``) as a hash-based pyc (see `PEP
+# 552`_) with the hash of the text source. Warm imports skip the conversion
+# and cost the same as the import of an ordinary module.
+#
+# .. _PEP 552: https://www.python.org/dev/peps/pep-0552/
+#
+# LiterateLoader
+# """"""""""""""
+# ::
+
+class LiterateLoader(importlib.machinery.SourceFileLoader):
+    """Loader for literate Python modules (text sources)"""
+
+# The code source is returned by `get_source` (used e.g. for tracebacks)::
+
+    def get_source(self, fullname):
+        """Return converted code source of the module"""
+        source = importlib.util.decode_source(self.get_data(self.path))
+        return str(Text2Code(source.splitlines(True)))
+
+# `source_to_code` converts before compiling. Text2Code keeps the line
+# numbers, so tracebacks point to the matching lines in the text source::
+
+    def source_to_code(self, data, path, *, _optimize=-1):
+        """Convert text source `data` and return compiled code object"""
+        source = importlib.util.decode_source(data)
+        code = str(Text2Code(source.splitlines(True)))
+        return compile(code, path, 'exec', dont_inherit=True,
+                       optimize=_optimize)
+
+# `get_code` returns the cached code object if the source hash in the pyc
+# header matches the text source. Otherwise the source is converted and
+# compiled, and the result is written to the cache. The pyc header consists
+# of the magic number, the flags (hash-based and checked), and the source
+# hash::
+
+    _pyc_flags = (0b11).to_bytes(4, 'little')
+
+    def get_code(self, fullname):
+        """Return code object, use cached bytecode if up to date"""
+        source_bytes = self.get_data(self.path)
+        source_hash = importlib.util.source_hash(source_bytes)
+        header = importlib.util.MAGIC_NUMBER + self._pyc_flags + source_hash
+        bytecode_path = importlib.util.cache_from_source(self.path)
+        code = load_cached_code(bytecode_path, header)
+        if code is None:
+            code = self.source_to_code(source_bytes, self.path)
+            store_cached_code(bytecode_path, header, code)
+        return code
+
+# Packages are recognised by the text source of their ``__init__`` module
+# (e.g. ``__init__.py.txt``)::
+
+    def is_package(self, fullname):
+        """Return True, if the text source is a package's __init__ module"""
+        return os.path.basename(self.path).startswith("__init__.py")
+
+# .. _install_import_hook:
+#
+# install_import_hook
+# """""""""""""""""""
+#
+# The import hook is a path hook for a `FileFinder` that knows the standard
+# loaders and the `LiterateLoader`_ for text sources of Python modules and
+# packages (``.py`` + one of the `text_extensions`). The `FileFinder` looks
+# for the filenames in a cached directory listing, so the hook does not slow
+# down the import of other modules. The `LiterateLoader`_ comes last, so
+# that code sources (or compiled code) of a module take precedence::
+
+def _literate_path_hook(path):
+    """Path hook for directories with literate Python modules"""
+    machinery = importlib.machinery
+    literate_suffixes = [".py" + extension
+                         for extension in defaults.text_extensions]
+    return machinery.FileFinder.path_hook(
+        (machinery.ExtensionFileLoader, machinery.EXTENSION_SUFFIXES),
+        (machinery.SourceFileLoader, machinery.SOURCE_SUFFIXES),
+        (machinery.SourcelessFileLoader, machinery.BYTECODE_SUFFIXES),
+        (LiterateLoader, literate_suffixes))(path)
+
+# Installation prepends the path hook to `sys.path_hooks` and clears the
+# cache of path entry finders. Paths that are not directories (e.g. zip
+# files) are passed on to the other hooks::
+
+def install_import_hook():
+    """Allow import of literate Python modules from text sources"""
+    if _literate_path_hook not in sys.path_hooks:
+        sys.path_hooks.insert(0, _literate_path_hook)
+        sys.path_importer_cache.clear()
+
+def uninstall_import_hook():
+    """Remove the import hook for literate Python modules"""
+    while _literate_path_hook in sys.path_hooks:
+        sys.path_hooks.remove(_literate_path_hook)
+    sys.path_importer_cache.clear()
+
+
+# .. _conversion server:
+#
+# Conversion server
+# ~~~~~~~~~~~~~~~~~
+#
+# Editor plug-ins or version control hooks may call pylit many times per
+# minute. Every call pays for the interpreter startup, compilation of this
+# module, and the set-up of the option parser. With the ``--serve`` option,
+# pylit runs as a daemon on a Unix domain socket instead. Requests are
+# answered concurrently by a pool of worker threads and recent results are
+# kept in a LRUCache_ keyed by content hash.
+#
+# Requests and responses are JSON objects, one per line.
+#
+# handle_request
+# """"""""""""""
+#
+# Process one request and return the response. The request is a dictionary
+# with the keys
+#
+# :args:    list of command line arguments (as for `main`_),
+# :cwd:     working directory for relative file names,
+# :content: inline input data (instead of reading `infile`),
+# :action:  "convert" (default), "diff" (as `diff`_),
+#           or "check" (round-trip conversion with `diff`_).
+#
+# Other keys are used as option defaults (like keyword arguments to `main`_).
+# The ``--diff`` option in `args` selects the "diff" action. Options for
+# actions the server does not provide (e.g. ``--doctest`` or
+# ``--execute``) and invalid options are rejected with a ValueError.
+#
+# The response contains the converted data as "output", or the name of the
+# output file as "written" or "current" (if the output is up to date, see
+# `write_output`_). For "diff" and "check", it contains the "output" of the
+# unified diff and the Boolean "different". Inline content is always
+# answered with the output. ::
+
+_local_actions = ("doctest", "doctest_files", "execute", "also_convert",
+                  "reload", "fingerprint", "emit_ninja", "serve",
+                  "fork_server", "worker")
+
+def handle_request(request, cache=None):
+    """Process a conversion request dictionary and return the response
+    """
+    request = dict(request)
+    action = request.pop("action", "convert")
+    args = request.pop("args", [])
+    cwd = request.pop("cwd", "")
+    content = request.pop("content", None)
+    if content is not None:
+        request.setdefault("infile", "-")
+    options = PylitOptions(RequestOptionParser)(args, **request)
+    unsupported = [name for name in _local_actions
+                   if getattr(options, name, None)]
+    if unsupported:
+        raise ValueError("not supported in requests: %s"
+                         % ", ".join(unsupported))
+    if options.diff and action == "convert":
+        action = "diff"
+    for name in ("infile", "outfile"):
+        path = getattr(options, name)
+        if path not in ("", "-"):
+            setattr(options, name, os.path.join(cwd, path))
+    keyw = options.as_dict()
+
+# File-to-file conversions are written by `write_output`_ (like on the
+# command line)::
+
+    if action == "convert" and content is None and "-" not in (
+        options.infile, options.outfile):
+        convert = lambda data: "".join(cached_conversion(data.readlines(),
+                                                         cache, **keyw))
+        status = write_output(convert=convert, **keyw)
+        return {status: options.outfile}
+
+# Read the input data (if not given as inline content)::
+
+    if content is None:
+        if options.infile in ("", "-"):
+            strerror = "Missing input file name or content"
+            raise IOError(2, strerror, options.infile)
+        instream = open(options.infile)
+        content = instream.read()
+        instream.close()
+    data = content.splitlines(True)
+
+# Special actions::
+
+    if action in ("diff", "check"):
+        if action == "check":
+            keyw["outfile"] = "-"
+        (delta, oldname, newname) = diff_lines(data=data, cache=cache, **keyw)
+        return {"output": "".join(delta), "different": bool(delta),
+                "oldname": oldname, "newname": newname}
+    if action != "convert":
+        raise ValueError("unknown action %r" % action)
+
+# Convert and return the output::
+
+    return {"output": "".join(cached_conversion(data, cache, **keyw))}
+
+# default_socket_path
+# """""""""""""""""""
+#
+# The servers listen on a per-user socket in the temporary directory, unless
+# a path is given with the ``--socket`` option::
+
+def default_socket_path(kind="server"):
+    """Return the default path of the conversion or fork server socket"""
+    import tempfile
+    user = getattr(os, "getuid", lambda: os.environ.get("USERNAME", ""))()
+    return os.path.join(tempfile.gettempdir(),
+                        "pylit-%s-%s.sock" % (kind, user))
+
+# remove_stale_socket
+# """""""""""""""""""
+#
+# A stale socket file (left behind by a server that was not shut down
+# properly) is removed. Raise `IOError`, if a server is listening::
+
+def remove_stale_socket(socket_path):
+    """Remove `socket_path` unless a server is listening on it"""
+    import socket
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+    else:
+        raise IOError(17, "Server already running", socket_path)
+    finally:
+        probe.close()
+
+# make_server
+# """""""""""
+#
+# Return a server instance listening on `socket_path`. `socketserver` would
+# start a new thread for every connection, we submit them to a thread pool
+# with `workers` threads instead. A stale socket file is removed (see
+# `remove_stale_socket`_)::
+
+def make_server(socket_path=None, workers=None, cache_size=256):
+    """Return conversion server bound to a Unix domain socket"""
+    import json, socket, socketserver
+    from concurrent.futures import ThreadPoolExecutor
+
+    socket_path = socket_path or default_socket_path()
+    cache = LRUCache(cache_size)
+    pool = ThreadPoolExecutor(workers)
+
+    class RequestHandler(socketserver.StreamRequestHandler):
+        """Answer JSON requests, one per line"""
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    request = json.loads(line.decode('utf-8'))
+                    response = handle_request(request, cache)
+                except Exception as ex:
+                    response = {"error": "%s: %s" % (ex.__class__.__name__,
+                                                     ex)}
+                self.wfile.write(json.dumps(response).encode('utf-8')
+                                 + b"\n")
+
+    class ConversionServer(socketserver.UnixStreamServer):
+        """Unix domain socket server with a pool of worker threads"""
+        def process_request(self, request, client_address):
+            pool.submit(self.process_request_thread, request, client_address)
+
+        def process_request_thread(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+        def server_close(self):
+            socketserver.UnixStreamServer.server_close(self)
+            pool.shutdown()
+            try:
+                os.unlink(self.server_address)
+            except OSError:
+                pass
+
+    remove_stale_socket(socket_path)
+    # the socket must only be accessible for the current user
+    umask = os.umask(0o177)
+    try:
+        server = ConversionServer(socket_path, RequestHandler)
+    finally:
+        os.umask(umask)
+    server.cache = cache
+    return server
+
+# serve
+# """""
+#
+# Run the conversion server until it is interrupted::
+
+def serve(socket_path=None, workers=None, cache_size=256, **keyw):
+    """Run a conversion server on a Unix domain socket"""
+    server = make_server(socket_path, workers, cache_size)
+    print("pylit server listening on", server.server_address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+# request_server
+# """"""""""""""
+#
+# Send a request to a running conversion server and return the response.
+# Raises `IOError` if no server is listening at `socket_path`::
+
+def request_server(request, socket_path=None):
+    """Return response of the conversion server to `request`"""
+    import json, socket
+    socket_path = socket_path or default_socket_path()
+    if not hasattr(socket, "AF_UNIX"):
+        raise IOError(2, "Unix domain sockets not supported", socket_path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+        line = sock.makefile('rb').readline()
+    finally:
+        sock.close()
+    if not line:
+        raise IOError(32, "No response from server", socket_path)
+    return json.loads(line.decode('utf-8'))
+
+# run_client
+# """"""""""
+#
+# Let a conversion server process the command line `args` and report the
+# result like `main`_. Raises `IOError` if no server is running, so that the
+# caller can fall back to in-process conversion.
+#
+# ``pylit --client`` first imports this module and parses the options. The
+# standalone ``contribs/pylit_client.py`` needs only `socket` and `json`
+# for the request and imports `pylit` only for the fallback. ::
+
+def run_client(args, options):
+    """Forward command line `args` to the conversion server"""
+    if options.diff:
+        action = "diff"
+    else:
+        action = "convert"
+    request = {"args": list(args), "cwd": os.getcwd(), "action": action}
+    response = request_server(request, options.socket_path)
+    if "error" in response:
+        print("pylit server:", response["error"])
+        sys.exit(1)
+    sys.stdout.write(response.get("output", ""))
+    if "written" in response:
+        print("extract written to", response["written"])
+    if "current" in response:
+        print(response["current"], "is up to date")
+    if action == "diff":
+        if not response["different"]:
+            print(response["oldname"])
+            print(response["newname"])
+            print("no differences found")
+        return response["different"]
+
+
+# Persistent worker
+# ~~~~~~~~~~~~~~~~~
+#
+# Build tools (e.g. Bazel or make wrappers) can keep one pylit process
+# running for a complete build instead of starting a new process per
+# target. With ``--worker``, pylit reads JSON requests from stdin, one per
+# line, and writes the responses to stdout.
+#
+# Requests are processed by `handle_request`_. For compatibility with
+# Bazel's JSON worker protocol, the keys "arguments" (as alias for "args")
+# and "requestId" are recognised and the response contains the "exitCode"
+# (1 if an error occurred or differences were found).
+#
+# run_worker
+# """"""""""
+# ::
+
+def run_worker(instream=None, outstream=None, **keyw):
+    """Process JSON requests from `instream`, one per line"""
+    import json
+    instream = instream or sys.stdin
+    outstream = outstream or sys.stdout
+    cache = LRUCache()
+    for line in instream:
+        if not line.strip():
+            continue
+        request_id = 0
+        try:
+            request = json.loads(line)
+            request_id = request.pop("requestId", 0)
+            request.pop("inputs", None) # input digests sent by Bazel
+            if "arguments" in request:
+                request["args"] = request.pop("arguments")
+            response = handle_request(request, cache)
+            response["exitCode"] = int(bool(response.get("different")))
+            if "written" in response:
+                response["output"] = ("extract written to %s\n"
+                                      % response["written"])
+            if "current" in response:
+                response["output"] = ("%s is up to date\n"
+                                      % response["current"])
+        except Exception as ex:
+            response = {"exitCode": 1,
+                        "error": "%s: %s" % (ex.__class__.__name__, ex)}
+            response["output"] = response["error"] + "\n"
+        response["requestId"] = request_id
+        outstream.write(json.dumps(response) + "\n")
+        outstream.flush()
+
+# .. _emit_ninja:
+#
+# Ninja build file
+# ~~~~~~~~~~~~~~~~
+#
+# Instead of scheduling conversions itself, pylit can write a build file for
+# the `ninja`_ build system (``--emit-ninja SRC``). Ninja runs the
+# conversions in parallel and rebuilds only outdated outputs.
+#
+# `emit_ninja` scans the directory tree `source_dir` for text sources with a
+# code extension (e.g. ``foo.py.txt``, cf. `PylitOptions._get_outfile_name`_)
+# and writes one edge per text source and code output to `ninjafile`. The
+# language is set per file. The converter options given as keyword
+# arguments (e.g. ``strip=True``) are used for all conversions. Each
+# conversion writes a depfile with the included files (see `dependency
+# manifest`_). The build file is regenerated when a directory of the tree
+# changes (i.e. if a file is added or removed).
+#
+# .. _ninja: https://ninja-build.org/
+#
+# ::
+
+_ninja_flags = (("strip", "--strip"), ("codeindent", "--codeindent=%s"),
+                ("comment_string", "--comment-string=%s"),
+                ("code_block_marker", "--code-block-marker=%s"))
+
+def emit_ninja(source_dir, ninjafile="build.ninja", **keyw):
+    """Write a ninja build file for the text sources in `source_dir`"""
+    import shlex
+    def escape(path):
+        return path.replace("$", "$$").replace(" ", "$ ").replace(":", "$:")
+    options = PylitOptions()
+    flags = []
+    for (name, flag) in _ninja_flags:
+        if keyw.get(name) not in (None, False):
+            flags.append("%" in flag and flag % keyw[name] or flag)
+    flags = " ".join(shlex.quote(flag) for flag in flags).replace("$", "$$")
+    pylit = " ".join(shlex.quote(path) for path in
+                     (sys.executable, os.path.abspath(__file__)))
+    directories = []
+    edges = []
+    for (dirpath, dirnames, filenames) in os.walk(source_dir):
+        dirnames[:] = sorted(name for name in dirnames
+                             if not name.startswith(".")
+                             and name != "__pycache__")
+        directories.append(dirpath)
+        for name in sorted(filenames):
+            (base, ext) = os.path.splitext(name)
+            if (ext not in defaults.text_extensions
+                or code_language(os.path.splitext(base)[1]) is None):
+                continue
+            values = OptionValues(keyw)
+            values.infile = os.path.join(dirpath, name)
+            values.outfile = None
+            values.txt2code = True
+            values = options.complete_values(values)
+            edges.append("build %s: pylit %s\n  flags = --language=%s %s\n"
+                         % (escape(values.outfile), escape(values.infile),
+                            values.language, flags))
+    stream = open(ninjafile, 'w')
+    stream.write("# generated by pylit --emit-ninja %s\n\n" % source_dir)
+    stream.write("pylit = %s\n\n" % pylit)
+    stream.write("rule pylit\n"
+                 "  command = $pylit --deps --overwrite=yes $flags $in $out\n"
+                 "  description = PYLIT $out\n"
+                 "  depfile = $out.d\n"
+                 "  deps = gcc\n\n")
+    stream.write("rule regenerate\n"
+                 "  command = $pylit --emit-ninja %s %s $out\n"
+                 "  description = REGENERATE $out\n"
+                 "  generator = 1\n\n" % (escape(shlex.quote(source_dir)),
+                                          flags))
+    stream.write("build %s: regenerate | %s\n\n" % (escape(ninjafile),
+                 " ".join(escape(path) for path in directories)))
+    stream.write("\n".join(edges))
+    stream.close()
+    return len(edges)
 
 
 # main
@@ -1704,59 +4664,77 @@ def main(args=sys.argv[1:], **defaults):
 
 # Special actions with early return::
 
-    if options.doctest:
-        return run_doctest(**options.as_dict())
+    requested = (("diff", options.diff),
+                 ("doctest", options.doctest),
+                 ("convert", options.also_convert),
+                 ("execute", options.execute))
+    actions = [action for (action, option) in requested if option]
+    if len(actions) > 1 and not options.reload:
+        return run_actions(actions, **options.as_dict())
 
-    if options.diff:
-        return diff(**options.as_dict())
+    if options.serve:
+        return serve(**options.as_dict())
 
-    if options.execute:
-        return execute(**options.as_dict())
+    if options.worker:
+        return run_worker(**options.as_dict())
 
-# Open in- and output streams::
+    if options.fork_server:
+        return serve_forks(**options.as_dict())
 
-    try:
-        (data, out_stream) = open_streams(**options.as_dict())
-    except IOError as ex:
-        print("IOError: %s %s" % (ex.filename, ex.strerror))
-        sys.exit(ex.errno)
-
-# Get a converter instance::
+    if options.doctest:
+        return run_doctest(**options.as_dict())
 
-    converter = get_converter(data, **options.as_dict())
+    if options.fingerprint:
+        (data, out_stream) = open_streams(options.infile, "-")
+        print("%s  %s" % (code_fingerprint(data.readlines(),
+                                           **options.as_dict()),
+                          options.infile))
+        return
 
-# Convert and write to out_stream::
+# With ``--doctest-files`` and ``--emit-ninja``, the options are completed
+# for every input file separately::
 
-    out_stream.write(str(converter))
+    if options.doctest_files:
+        values = PylitOptions().parse_args(args, **defaults).as_dict()
+        infiles = values.pop("infiles")
+        return run_doctests(infiles, **values)
 
-    if out_stream is not sys.stdout:
-        print("extract written to", out_stream.name)
-        out_stream.close()
+    if options.emit_ninja:
+        values = PylitOptions().parse_args(args, **defaults).as_dict()
+        ninjafile = values.pop("infile", "build.ninja")
+        count = emit_ninja(values.pop("emit_ninja"), ninjafile, **values)
+        print("%d edges written to %s" % (count, ninjafile))
+        return
 
-# If input and output are from files, set the modification time (`mtime`) of
-# the output file to the one of the input file to indicate that the contained
-# information is equal. [#]_ ::
+# Let a running `conversion server`_ convert or diff, fall back to in-process
+# conversion if there is none::
 
+    if options.client and not options.execute and options.infile != '-':
         try:
-            os.utime(options.outfile, (os.path.getatime(options.outfile),
-                                       os.path.getmtime(options.infile))
-                    )
-        except OSError:
+            return run_client(args, options)
+        except IOError:
             pass
 
-    ## print "mtime", os.path.getmtime(options.infile),  options.infile
-    ## print "mtime", os.path.getmtime(options.outfile), options.outfile
+    if options.diff:
+        return diff(**options.as_dict())
 
+    if options.execute and options.reload:
+        return execute_reload(**options.as_dict())
 
-# .. [#] Make sure the corresponding file object (here `out_stream`) is
-#        closed, as otherwise the change will be overwritten when `close` is
-#        called afterwards (either explicitly or at program exit).
-#
-#
-# Rename the infile to a backup copy if ``--replace`` is set::
+    if options.execute:
+        status = None
+        if options.client:
+            try:
+                status = execute_forked(**options.as_dict())
+            except IOError:
+                pass # no fork server running
+        if status is not None:
+            sys.exit(status)
+        return execute(**options.as_dict())
+
+# Convert and write the output (see `convert_file`_)::
 
-    if options.replace:
-        os.rename(options.infile, options.infile + "~")
+    convert_file(**options.as_dict())
 
 
 # Run main, if called from the command line::
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: iso-8859-1 -*-
+
+## pylit_benchmark.py
+## ******************
+## Micro-benchmarks for pylit.py
+## +++++++++++++++++++++++++++++
+##
+## :Copyright: 2026 Lauro Cavalcanti de Sa.
+##             Released under the terms of the GNU General Public License
+##             (v. 3 or later)
+##
+## Time typical operations of the `pylit` module with `timeit`. Run as
+## script (not collected by the test runner)::
+##
+##   python pylit_benchmark.py
+##
+## ::
+
+"""pylit_benchmark.py: micro-benchmarks for the "literal python" module"""
+
+import sys, os
+from timeit import Timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                "contribs"))
+import pylit
+import pylit_elisp
+
+## Auxiliary function: run `stmt` `number` times and print the best of
+## `repeat` runs per call::
+
+def report(name, stmt, number=2000, repeat=5):
+    best = min(Timer(stmt).repeat(repeat, number))
+    print("%-40s %8.2f us/call" % (name, best / number * 1e6))
+
+## Test data
+## =========
+##
+## A small snippet, typical for programmatic use on many inputs::
+
+text = """Leading text
+
+in several paragraphs followed by a literal block::
+
+  block1 = 'first block'
+
+Some more text and the next block. ::
+
+  block2 = 'second block'
+  print(block1, block2)
+
+Trailing text.
+"""
+
+textdata = text.splitlines(True)
+codedata = pylit.Text2Code(textdata)()
+
+## Converter setup
+## ===============
+##
+## Construct a new converter for every snippet vs. re-use of one converter
+## instance set up with `get_converter` (without data)::
+
+def bench_converter_setup():
+    report("Text2Code(data)()",
+           lambda: pylit.Text2Code(textdata)())
+    convert = pylit.get_converter(txt2code=True)
+    report("get_converter() reused",
+           lambda: convert(textdata))
+    report("Code2Text(data)()",
+           lambda: pylit.Code2Text(codedata)())
+    convert = pylit.get_converter(txt2code=False)
+    report("get_converter(txt2code=False) reused",
+           lambda: convert(codedata))
+
+## Strip mode
+## ==========
+##
+## Tangle a larger document (the text version of pylit.py) with the
+## `Text2Code.tangle` fast path vs. the complete state machine::
+
+def bench_strip():
+    source = open(pylit.__file__, encoding="iso-8859-1").readlines()
+    document = pylit.Code2Text(source)()
+    converter = pylit.Text2Code(document, strip=True)
+    report("Text2Code(strip=True) state machine",
+           lambda: list(pylit.TextCodeConverter.convert(converter, document)),
+           number=20)
+    report("Text2Code(strip=True) tangle",
+           lambda: list(converter.tangle(document)), number=20)
+
+
+## Filters
+## =======
+##
+## Declarative `LineFilter` rule tables (compiled into one loop) vs. the
+## generator functions for the C/CSS and elisp filters, on a generated
+## source with 10000 lines::
+
+c_code = ["/* comment %d */\n" % i if i % 3 == 0
+          else "int x%d = %d; /* trailing */\n" % (i, i) if i % 3 == 1
+          else "\n" for i in range(10000)]
+c_text = list(pylit.c_comment_preprocessor(c_code))
+elisp_code = [";;; Code:\n" if i % 50 == 0 else "(setq x%d %d)\n" % (i, i)
+              for i in range(10000)]
+elisp_text = list(pylit_elisp.elisp_code_preprocessor(elisp_code))
+
+c_preprocessor = pylit.LineFilter([pylit.Rewrite("/* ", "// ", " */", "")],
+                                  name="c_preprocessor")
+c_postprocessor = pylit.LineFilter([pylit.Rewrite("// ", "", blank=True),
+                                    pylit.Rewrite("// ", "/* ", "", " */")],
+                                   name="c_postprocessor")
+
+## The generator functions of the line-wise C filters (``dumb_c_*`` in
+## PyLit 0.7.9), for comparison::
+
+def dumb_c_preprocessor(data):
+    for line in data:
+        if line.startswith("/* ") and line.rstrip().endswith(" */"):
+            line = line.replace("/* ", "// ", 1)
+            line = "".join(line.rsplit(" */", 1))
+        yield line
+
+def dumb_c_postprocessor(data):
+    for line in data:
+        if line.rstrip() == "//":
+            line = line.replace("// ", "", 1)
+        elif line.startswith("// "):
+            line = line.replace("// ", "/* ", 1)
+            line = line.rstrip() + " */\n"
+        yield line
+
+def bench_filters():
+    for (name, generator, line_filter, data) in [
+        ("C/CSS pre", dumb_c_preprocessor, c_preprocessor, c_code),
+        ("C/CSS post", dumb_c_postprocessor, c_postprocessor, c_text),
+        ("elisp pre", pylit_elisp.elisp_code_preprocessor,
+         pylit_elisp.elisp_preprocessor, elisp_code),
+        ("elisp post", pylit_elisp.elisp_code_postprocessor,
+         pylit_elisp.elisp_postprocessor, elisp_text)]:
+        assert list(generator(data)) == list(line_filter(data))
+        report("%s generator" % name, lambda: list(generator(data)),
+               number=20)
+        report("%s LineFilter" % name, lambda: list(line_filter(data)),
+               number=20)
+
+## A stack of three filters: three generator layers vs. one fused loop::
+
+    stack = lambda data: dumb_c_postprocessor(
+        pylit_elisp.elisp_code_postprocessor(dumb_c_preprocessor(data)))
+    chain = (c_preprocessor | pylit_elisp.elisp_postprocessor
+             | c_postprocessor)
+    assert list(stack(c_code)) == list(chain(c_code))
+    report("3 filters generator stack", lambda: list(stack(c_code)),
+           number=20)
+    report("3 filters LineFilter chain", lambda: list(chain(c_code)),
+           number=20)
+
+
+## C comment scanner
+## -----------------
+##
+## A generated C header (about 27000 lines) with multi-line documentation
+## comments, declarations and string macros containing comment delimiters::
+
+def c_header(functions=2000):
+    lines = []
+    for i in range(functions):
+        lines.extend(["/**\n",
+                      " * Function %d.\n" % i,
+                      " *\n",
+                      " * @param x  the argument\n",
+                      " */\n",
+                      "int f%d(int x); /* %d */\n" % (i, i),
+                      "#define S%d \"/* not a comment */\"\n" % i,
+                      "\n"])
+        if i % 10 == 0:
+            lines.extend(["/* ------------------------------ */\n",
+                          "/* section %d */\n" % i,
+                          "\n"])
+        lines.extend(["typedef struct s%d {\n" % i,
+                      "    int a;\n",
+                      "    char *b;\n",
+                      "} s%d_t;\n" % i,
+                      "\n"])
+    return lines
+
+def bench_c_comments():
+    code = c_header()
+    text = list(pylit.c_comment_preprocessor(code))
+    report("C header dumb pre", lambda: list(dumb_c_preprocessor(code)),
+           number=10)
+    report("C header scanner pre",
+           lambda: list(pylit.c_comment_preprocessor(code)), number=10)
+    report("C header dumb post",
+           lambda: list(dumb_c_postprocessor(text)), number=10)
+    postprocessor = pylit.as_line_filter(pylit.c_comment_postprocessor)
+    report("C header scanner post",
+           lambda: list(postprocessor(text)), number=10)
+    report("C header Code2Text",
+           lambda: pylit.Code2Text(code, language="c")(), number=3)
+    pylit.defaults.preprocessors["c2text"] = dumb_c_preprocessor
+    try:
+        report("C header Code2Text (dumb filter)",
+               lambda: pylit.Code2Text(code, language="c")(), number=3)
+    finally:
+        pylit.defaults.preprocessors["c2text"] = pylit.c_comment_preprocessor
+
+
+if __name__ == "__main__":
+    bench_converter_setup()
+    bench_strip()
+    bench_filters()
+    bench_c_comments()
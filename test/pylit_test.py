@@ -265,6 +265,43 @@ def test_x2u_filter():
     print "ist", repr(result)
     assert soll == result
 
+## Block filters: the postprocessor sees the state of the converted block,
+## the preprocessor runs before the classification::
+
+@block_filter
+def upper_doc_filter(state, block):
+    if state != "documentation":
+        return block
+    return [line.upper() for line in block]
+
+@block_filter
+def semicolon_filter(state, block):
+    assert state is None
+    return [line.replace(";", "") for line in block]
+
+defaults.preprocessors["bl2text"] = semicolon_filter
+defaults.postprocessors["bl2text"] = upper_doc_filter
+
+def test_block_filters():
+    converter = Code2Text(["# doc;\n", "\n", "x = 1;\n"], language="bl")
+    output = converter()
+    print output
+    assert output == ["DOC\n", "\n", "::\n", "\n", "  x = 1\n"]
+    blocks = list(converter.convert_blocks(converter.data))
+    assert [line for block in blocks for line in block[2]] == output
+
+def test_filter_adapters():
+    assert as_line_filter(x2u_filter) is x2u_filter
+    assert as_block_filter(upper_doc_filter) is upper_doc_filter
+    block_x2u = as_block_filter(x2u_filter)
+    assert block_x2u.block_filter
+    assert block_x2u("code_block", ["x\n"]) == ["u\n"]
+    assert as_block_filter(identity_filter)(None, ["x\n"]) == ["x\n"]
+    line_semicolon = as_line_filter(semicolon_filter)
+    assert not getattr(line_semicolon, "block_filter", False)
+    assert list(line_semicolon(["a;\n", "\n", "b;\n"])) == ["a\n", "\n",
+                                                             "b\n"]
+
 
 
 ## TextCodeConverter
@@ -345,6 +382,44 @@ class test_TextCodeConverter(object):
         assert len(textblocks) == 7, "text sample has 7 blocks"
         assert reduce(operator.__add__, textblocks) == textdata
 
+## A converter instance set up without data can be re-used for many inputs::
+
+    def test_call_with_data(self):
+        converter = get_converter(txt2code=True)
+        assert converter(textdata) == codedata
+        assert converter(textdata) == codedata, "state must be reset"
+        converter = get_converter(txt2code=False)
+        assert converter(codedata) == textdata
+
+    def test_convert_blocks(self):
+        converter = Text2Code(textdata)
+        blocks = list(converter.convert_blocks(textdata))
+        assert [line for (state, block, output) in blocks
+                for line in output] == codedata
+        assert [state for (state, block, output) in blocks][:3] == [
+                "header", "documentation", "documentation"]
+
+    def test_convert_blocks_memo(self):
+        memo = LRUCache()
+        converter = Text2Code(textdata)
+        list(converter.convert_blocks(textdata, memo))
+        assert len(memo) == 7
+        data = textdata[:-1] + ["Changed trailing text.\n"]
+        list(converter.convert_blocks(data, memo))
+        assert len(memo) == 8, "only the changed block is converted"
+
+    def test_convert_blocks_errors(self):
+        errors = []
+        data = ["text::\n", "\n", "   code\n", "  less indented\n"]
+        list(Text2Code(data).convert_blocks(data, errors=errors))
+        assert errors[0][0] == 2
+        assert isinstance(errors[0][1], ValueError)
+
+    def test_marker_regexp_cache(self):
+        converter1 = TextCodeConverter(textdata, code_block_marker='.. x::')
+        converter2 = TextCodeConverter(codedata, code_block_marker='.. x::')
+        assert converter1.marker_regexp is converter2.marker_regexp
+
 ## Text2Code
 ## =========
 ##
@@ -472,6 +547,20 @@ class test_Text2Code(object):
         # pprint(outstr)
         assert stripped_code == outstr
 
+    def test_tangle(self):
+        """strip=True uses the `tangle` fast path with identical output"""
+        for (key, sample) in textsamples.items():
+            data = sample[0].splitlines(True)
+            if not data:
+                continue
+            converter = Text2Code(data, strip=True)
+            soll = list(TextCodeConverter.convert(converter, data))
+            ist = list(converter.tangle(data))
+            print key
+            print "soll", repr(soll)
+            print "ist ", repr(ist)
+            assert ist == soll
+
     def test_malindented_code_line(self):
         """raise error if code line is less indented than code-indent"""
         data1 = ["..    #!/usr/bin/env python\n", # indent == 4 * " "
@@ -528,7 +617,7 @@ class test_Text2Code(object):
         """should return filter from filter_set for language"""
         postprocessor = self.converter.get_filter("postprocessors", "css")
         print postprocessor
-        assert postprocessor == dumb_c_postprocessor
+        assert postprocessor == c_comment_postprocessor
 
     def test_get_filter_nonexisting_language_filter(self):
         """should return identity_filter if language has no filter in set"""
@@ -878,7 +967,7 @@ class test_Code2Text(object):
         """should return filter from filter_set for language"""
         preprocessor = self.converter.get_filter("preprocessors", "css")
         print preprocessor
-        assert preprocessor == dumb_c_preprocessor
+        assert preprocessor == c_comment_preprocessor
 
     def test_get_filter_postprocessor(self):
         """should return Code2Text postprocessor for language"""
@@ -917,6 +1006,129 @@ class test_Code2Text(object):
         print "ist: ", repr(output)
         assert output == soll
 
+    def test_doctest_lines(self):
+        """Doctest lines keep line numbers, other blocks are blanked"""
+        data = ["# text\n", "# more\n", "\n", "# >>> 1 + 1\n", "# 2\n",
+                "\n", "x = 1\n", "\n", "def f():\n", "    '>>> f()'\n"]
+        output = Code2Text(data).doctest_lines()
+        soll = ["# text\n", "\n", "\n", ">>> 1 + 1\n", "2\n", "\n",
+                "x = 1\n", "\n", "def f():\n", "    '>>> f()'\n"]
+        print "soll:", repr(soll)
+        print "ist: ", repr(output)
+        assert output == soll
+
+    def test_doctest_lines_groups(self):
+        """Code between doctests separates the groups"""
+        data = ["# >>> x = 1\n", "\n", "y = 2\n", "\n",
+                "# >>> x\n", "# 1\n"]
+        output = Code2Text(data).doctest_lines()
+        assert len(doctest_groups("".join(output))) == 2
+
+    def test_doctest_lines_tabs(self):
+        """Tabs are expanded like in the conversion"""
+        data = ["x = 1\n", "\n", "# \t>>> 1 + 1\n", "# 2\n"]
+        output = Code2Text(data).doctest_lines()
+        assert output == data[:2] + ["      >>> 1 + 1\n", "2\n"]
+
+
+## LiterateDocument
+## ----------------
+##
+## ::
+
+class test_LiterateDocument(object):
+
+    def test_blocks(self):
+        document = LiterateDocument(textdata)
+        states = [block.state for block in document.blocks]
+        print states
+        assert states[0] == "header"
+        assert "documentation" in states and "code_block" in states
+        assert document.blocks[-1].end == len(textdata)
+        for (block, next) in zip(document.blocks, document.blocks[1:]):
+            assert block.end == next.start
+
+    def test_views_text(self):
+        document = LiterateDocument(textdata)
+        assert document.text() == textdata
+        assert document.code() == codedata
+        assert document.stripped_code() == stripped_code.splitlines(True)
+        assert document.round_trip() == textdata
+        assert document.round_trip_diff() == []
+
+    def test_views_code(self):
+        document = LiterateDocument(codedata, txt2code=False)
+        assert document.code() == codedata
+        assert document.text() == textdata
+        assert document.round_trip() == codedata
+
+    def test_doctests(self):
+        data = ["# text\n", "#\n", "# >>> 1 + 1\n", "# 2\n", "\n",
+                "x = 1\n"]
+        document = LiterateDocument(data, txt2code=False)
+        assert document.doctest_text() == "".join(
+                                    Code2Text(data).doctest_lines())
+        [[example]] = document.doctests()
+        assert example.lineno == 2
+
+    def test_doctests_strip(self):
+        """doctests are kept if the converted documentation differs"""
+        data = ["# text\n", "#\n", "# >>> 1 + 1\n", "# 2\n", "\n",
+                "x = 1\n"]
+        document = LiterateDocument(data, txt2code=False, strip=True)
+        [[example]] = document.doctests()
+        assert example.lineno == 2
+
+    def test_serialization(self):
+        document = LiterateDocument(textdata)
+        loaded = LiterateDocument.frombytes(document.tobytes())
+        assert loaded.source == textdata
+        assert loaded.code() == codedata
+        assert ([(b.state, b.start, b.end, b.indent, b.marker)
+                 for b in loaded.blocks] ==
+                [(b.state, b.start, b.end, b.indent, b.marker)
+                 for b in document.blocks])
+
+    def test_serialization_errors(self):
+        data = LiterateDocument(textdata).tobytes()
+        for (buffer, keyw) in ((data, {"codeindent": 4}),
+                               (b"XXXX" + data[4:], {})):
+            try:
+                LiterateDocument.frombytes(buffer, **keyw)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("ValueError expected")
+
+    def test_serialization_non_ascii(self):
+        """offsets are byte offsets into the UTF-8 encoded strings"""
+        import struct
+        data = [u"\u00fcber \u2192\n", u"\n", u"::\n", u"\n",
+                u"  x = u'\u00e4'\n"]
+        document = LiterateDocument(data)
+        buffer = document.tobytes()
+        loaded = LiterateDocument.frombytes(buffer)
+        assert loaded.source == data
+        assert loaded.code() == document.code()
+        position = 40 + 28*len(document.blocks)
+        offsets = struct.unpack_from("<2I", buffer, position)
+        assert offsets == (0, len(data[0].encode("utf-8")))
+
+    def test_serialization_settings(self):
+        """defaults and explicit default values give the same digest"""
+        data = LiterateDocument(textdata, language="python").tobytes()
+        LiterateDocument.frombytes(data)
+        LiterateDocument.frombytes(data, language=None)
+
+    def test_serialization_version(self):
+        data = LiterateDocument(textdata).tobytes()
+        try:
+            LiterateDocument.frombytes(data[:4] + b"\x63\x00" + data[6:])
+        except ValueError as ex:
+            assert "version 99" in str(ex)
+        else:
+            raise AssertionError("ValueError expected")
+
 
 ## Special cases
 ## -------------
@@ -1175,23 +1387,376 @@ css_filtered_code = ['// import the default Docutils style sheet\n',
 
 ## ::
 
-def test_dumb_c_preprocessor():
+## Consecutive comment lines are converted back into one block comment::
+
+css_block_code = (['/* import the default Docutils style sheet\n',
+                   '   --------------------------------------- */\n']
+                  + css_code[2:])
+
+## ::
+
+def test_c_comment_preprocessor():
     """convert `C` to `C++` comments"""
-    output = [line for line in dumb_c_preprocessor(css_code)]
+    output = [line for line in c_comment_preprocessor(css_code)]
     print "ist:  %r"%output
     print "soll: %r"%css_filtered_code
     assert output == css_filtered_code
+    assert list(c_comment_preprocessor(css_block_code)) == css_filtered_code
 
 ## ::
 
-def test_dumb_c_postprocessor():
+def test_c_comment_postprocessor():
     """convert `C++` to `C` comments"""
-    output = [line for line in dumb_c_postprocessor(css_filtered_code)]
+    output = c_comment_postprocessor(None, css_filtered_code)
     print "ist:  %r"%output
-    print "soll: %r"%css_code
-    assert output == css_code
+    print "soll: %r"%css_block_code
+    assert output == css_block_code
+
+
+## Declarative filters
+## -------------------
+##
+## Rule tables equivalent to the dumb C filters::
+
+c_preprocessor = LineFilter([Rewrite("/* ", "// ", " */", "")],
+                            name="c_preprocessor")
+c_postprocessor = LineFilter([Rewrite("// ", "", blank=True),
+                              Rewrite("// ", "/* ", "", " */")],
+                             name="c_postprocessor")
+
+def test_c_line_filters():
+    assert list(c_preprocessor(css_code)) == css_filtered_code
+    assert list(c_postprocessor(css_filtered_code)) == css_code
+    edge_cases = ["//\n", "// \n", "//   \n", "// trailing  \n", "// eof"]
+    assert list(c_postprocessor(edge_cases)) == [
+        "//\n", "\n", "  \n", "/* trailing */\n", "/* eof */\n"]
+
+class test_LineFilter(object):
+
+    def test_rewrite_prefix(self):
+        line_filter = LineFilter([Rewrite("# ", "## ")])
+        assert list(line_filter(["# a\n", "b # c\n"])) == ["## a\n",
+                                                           "b # c\n"]
+
+    def test_rewrite_suffix(self):
+        line_filter = LineFilter([Rewrite("<", "[", ">", "]")])
+        assert list(line_filter(["<a> \n", "<b\n"])) == ["[a] \n", "<b\n"]
+
+    def test_substitute(self):
+        line_filter = LineFilter([Substitute("o+", "0")])
+        assert list(line_filter(["foo boo\n"])) == ["f0 boo\n"]
+
+    def test_first_rule_wins(self):
+        line_filter = LineFilter([Substitute("^a", "b"), Rewrite("a", "c"),
+                                  Rewrite("b", "d")])
+        assert list(line_filter(["a\n", "b\n"])) == ["b\n", "d\n"]
+
+    def test_guard_group(self):
+        """rules with a common prefix are tested together"""
+        line_filter = LineFilter([Rewrite("ab", "X", blank=True),
+                                  Rewrite("ab", "Z", "q", ""),
+                                  Rewrite("a", "Y")])
+        assert list(line_filter(["ab\n", "abq\n", "abc\n"])) == [
+            "X\n", "Z\n", "Ybc\n"]
+        line_filter = LineFilter([Rewrite("ab", "X", blank=True),
+                                  Rewrite("ab", "Z", "q", ""),
+                                  Rewrite("c", "Y")])
+        assert list(line_filter(["ab\n", "abq\n", "abc\n", "c\n"])) == [
+            "X\n", "Z\n", "abc\n", "Y\n"]
+
+    def test_chain(self):
+        chain = (LineFilter([Rewrite("a", "b")], name="ab")
+                 | LineFilter([Rewrite("b", "c")], name="bc"))
+        assert chain.name == "ab|bc"
+        assert len(chain.tables) == 2
+        assert list(chain(["a\n", "b\n", "x\n"])) == ["c\n", "c\n", "x\n"]
+
+    def test_chain_functions(self):
+        """generator and block filters are stages of a chain"""
+        def upper(data):
+            for line in data:
+                yield line.upper()
+        chain = (LineFilter([Rewrite("a", "b")], name="ab") | upper
+                 | LineFilter([Rewrite("B", "c")], name="Bc"))
+        assert chain.name == "ab|upper|Bc"
+        assert list(chain(["a\n", "x\n"])) == ["c\n", "X\n"]
+        chain = c_comment_preprocessor | LineFilter([Rewrite("a", "b")])
+        assert list(chain(["/* a */\n", "a\n"])) == ["// a\n", "b\n"]
+        chain = LineFilter([Rewrite("# ", "// ")]) | c_comment_postprocessor
+        assert list(chain(["# a\n", "# b\n"])) == ["/* a\n", "   b */\n"]
+        assert (filter_identity(upper | LineFilter(name="x"))
+                != filter_identity(expandtabs_filter | LineFilter(name="x")))
+
+    def test_empty_filter(self):
+        assert list(LineFilter()(["a\n"])) == ["a\n"]
+
+    def test_identity(self):
+        """the manifest identity depends on the rules, not on the object"""
+        identity = filter_identity(LineFilter([Rewrite("a", "b")], name="x"))
+        assert identity.startswith("LineFilter x ")
+        assert identity == filter_identity(LineFilter([Rewrite("a", "b")],
+                                                      name="x"))
+        assert identity != filter_identity(LineFilter([Rewrite("a", "c")],
+                                                      name="x"))
+        assert (filter_identity(c_comment_preprocessor)
+                == "pylit.c_comment_preprocessor")
+
+
+## C comment scanner
+## -----------------
+##
+## The postprocessor is a block filter, the line interface gives the same
+## result. Single comment lines are converted like with the dumb filters::
+
+def test_c_comment_filters():
+    postprocessor = as_line_filter(c_comment_postprocessor)
+    assert list(postprocessor(css_filtered_code)) == css_block_code
+    edge_cases = ["// a\n", "x\n", "//\n", "x\n", "// \n", "x\n",
+                  "//   \n", "x\n", "// trailing  \n", "x\n", "// eof"]
+    assert list(postprocessor(edge_cases)) == [
+        "/* a */\n", "x\n", "//\n", "x\n", "\n", "x\n", "  \n", "x\n",
+        "/* trailing */\n", "x\n", "/* eof */\n"]
+
+## Multi-line block comments with the text aligned to the first line are
+## converted line by line. Comments with blank lines stay code::
+
+def test_c_comment_preprocessor_block():
+    data = ['/* Block\n',
+            '   comment.\n',
+            '     Indented */\r\n',
+            '/* blank\n',
+            '\n',
+            '   line */\n',
+            '/* closing\n',
+            '   */\n',
+            'int x;\n']
+    output = list(c_comment_preprocessor(data))
+    print "ist:  %r" % output
+    assert output == ['// Block\n', '// comment.\n', '//   Indented\r\n'
+                      ] + data[3:]
+
+def test_c_block_comment():
+    for texts in (["a", "b"], ["a", "  b", "c  "]):
+        lines = c_block_comment(texts)
+        print lines
+        assert len(lines) == len(texts)
+        assert c_comment_texts(lines) == texts
+    assert c_block_comment(["", "a", ""]) == ["/*", "   a", "   */"]
+    assert c_comment_texts(["/*", "   a", "   */"]) is None
+    assert c_comment_texts(["/* a", "   b */ int x; */"]) is None
+    assert c_comment_texts(["/* a", " * b */"]) is None
+
+## Block comments with another layout stay code, also if lines inside look
+## like single-line comments::
+
+c_header = ['/**\n',
+            ' * Brief.\n',
+            ' */\n',
+            '/* aligned\n',
+            '/* text */\n',
+            '   */ int g; /* x */\n',
+            '/* after */\n',
+            'int h; /* trailing\n',
+            '/* inside */\n',
+            '*/\n',
+            '/* a */ /* b */\n']
+
+def test_c_comment_preprocessor_multiline():
+    output = list(c_comment_preprocessor(c_header))
+    print "ist:  %r" % output
+    assert output == c_header[:6] + ['// after\n'] + c_header[7:]
+
+def test_c_comment_preprocessor_unterminated():
+    data = ['/* open\n', '/* never closed */\n']
+    assert list(c_comment_preprocessor(data)) == data
+
+## Comment delimiters in string literals (also continued on the next line) are
+## not comments::
+
+def test_c_comment_preprocessor_strings():
+    data = ['char *s = "/* no";\n',
+            '/* yes */\n',
+            "char c = '\"'; /* \" */\n",
+            '#define S "a\\\n',
+            '/* in string */"\n',
+            's = "/*"; // "\n',
+            '/* out */\n']
+    output = list(c_comment_preprocessor(data))
+    print "ist:  %r" % output
+    assert output == data[:1] + ['// yes\n'] + data[2:6] + ['// out\n']
+
+## The postprocessor converts runs of comment lines into block comments, in
+## all blocks. Blank comment lines at the end of a run become blank lines::
+
+def test_c_comment_postprocessor_runs():
+    data = ['// doc\n', '// more\n', '// \n', '\n',
+            '// x\n', '//   \n', '// y\n']
+    for state in ("documentation", "header", "code_block", None):
+        output = c_comment_postprocessor(state, data)
+        print "ist:  %r" % output
+        assert output == ['/* doc\n', '   more */\n', '\n', '\n',
+                          '/* x\n', '     \n', '   y */\n']
+
+def test_c_scan():
+    assert c_scan('int x; /* open\n') == "*/"
+    assert c_scan('close */ "/*" // /*\n', 0, "*/") is None
+    assert c_scan('"continued \\\n') == '"'
+    assert c_scan("'unterminated\n") is None
+
+## Round trips of sources with multi-line comments and comments in code
+## blocks are identical. The block-wise conversion gives the same result::
+
+c_source = ['/* Documentation\n',
+            '   :: */\n',
+            '\n',
+            '/**\n',
+            ' * Compute.\n',
+            ' *\n',
+            ' * @param x\n',
+            ' */\n',
+            'int f(int x); /* trailing */\n',
+            'char *s = "/* no";\n',
+            '\n',
+            '/* More\n',
+            '   documentation. :: */\n',
+            '\n',
+            'int y;\n']
+
+css_source = ['/* Style sheet\n',
+              '   :: */\n',
+              '\n',
+              '/*\n',
+              ' * colours\n',
+              ' */\n',
+              'a { color: red; }\n',
+              'p:before { content: "/* "; }\n',
+              '\n',
+              '/* Print :: */\n',
+              '\n',
+              '@media print { a { color: black; } }\n']
+
+def test_c_round_trip():
+    for (source, language) in ((c_source, "c"), (css_source, "css")):
+        text = Code2Text(source, language=language)()
+        print "text: %r" % text
+        output = Text2Code(text, language=language)()
+        print "code: %r" % output
+        assert output == source
+        converter = Text2Code(text, language=language)
+        blocks = converter.convert_blocks(text)
+        assert [line for (state, block, output) in blocks
+                for line in output] == source
+
+## A literate style sheet (from ``doc/examples/pygments-default.css.txt``):
+## the documentation becomes block comments, C++ comments in the code are
+## converted to CSS comments, and the conversion back restores the text::
+
+css_text = ['Style sheet\n',
+            '===========\n',
+            '\n',
+            'Content copied from the `html4css1.css` rule::\n',
+            '\n',
+            '  pre.code .ln { /* line numbers */\n',
+            '  //   color: grey;\n',
+            '    font-size: small;\n',
+            '  }\n']
+
+css_text_code = ['/* Style sheet\n',
+                 '   =========== */\n',
+                 '\n',
+                 '/* Content copied from the `html4css1.css` rule:: */\n',
+                 '\n',
+                 'pre.code .ln { /* line numbers */\n',
+                 '/*   color: grey; */\n',
+                 '  font-size: small;\n',
+                 '}\n']
+
+def test_css_text_round_trip():
+    output = Text2Code(css_text, language="css")()
+    print "code: %r" % output
+    assert output == css_text_code
+    assert Code2Text(output, language="css")()[:6] == css_text[:6]
+
+## Code fingerprint
+## ----------------
+##
+## The fingerprint is the same for text and code source and ignores changes
+## of the documentation::
+
+def test_code_fingerprint():
+    fingerprint = code_fingerprint(textdata)
+    assert fingerprint == code_fingerprint(codedata, txt2code=False)
+    changed = [line.replace("text", "prose") for line in textdata]
+    assert changed != textdata
+    assert code_fingerprint(changed) == fingerprint
+    changed = [line.replace("block1", "block0") for line in textdata]
+    assert code_fingerprint(changed) != fingerprint
+
+def test_code_lines():
+    lines = code_lines(codedata, txt2code=False)
+    print "ist: %r" % lines
+    soll = ["#!/usr/bin/env python\n", "# -*- coding: iso-8859-1 -*-\n",
+            "block1 = 'first block'\n", "block2 = 'second block'\n",
+            "print block1, block2\n"]
+    assert lines == soll
+
+
+## Language plugins
+## ----------------
+##
+## A plugin module registered in `defaults.plugins` is imported only when a
+## converter for its language is set up::
 
+class test_language_plugins(object):
 
+    def setUp(self):
+        import types
+        module = types.ModuleType("pylit_test_plugin")
+        module.profile = {"language": "testlang",
+                          "extensions": [".tl"],
+                          "comment_string": "-- ",
+                          "postprocessor": u2x_filter}
+        self.module = module
+        defaults.plugins["testlang"] = "pylit_test_plugin:profile"
+        defaults.plugins[".tl"] = "pylit_test_plugin:profile"
+
+    def tearDown(self):
+        for name in ("testlang", ".tl"):
+            del defaults.plugins[name]
+        defaults.languages.pop(".tl", None)
+        defaults.comment_strings.pop("testlang", None)
+        defaults.postprocessors.pop("text2testlang", None)
+        sys.modules.pop("pylit_test_plugin", None)
+        import pylit
+        pylit._loaded_plugins.pop("pylit_test_plugin:profile", None)
+
+    def test_names_without_import(self):
+        assert "testlang" in language_names()
+        assert code_language(".tl") == "testlang"
+        assert code_language(".py") == "python"
+        assert code_language(".unknown") is None
+        assert ".tl" not in defaults.languages
+
+    def test_load_on_converter_setup(self):
+        sys.modules["pylit_test_plugin"] = self.module
+        converter = Text2Code(["text\n"], language="testlang")
+        assert converter.comment_string == "-- "
+        assert defaults.languages[".tl"] == "testlang"
+        assert converter.postprocessor == u2x_filter
+
+    def test_missing_plugin_module(self):
+        assert load_plugin("testlang") is None
+        converter = Text2Code(["text\n"], language="testlang")
+        assert converter.comment_string == defaults.comment_strings.default
+
+    def test_language_option(self):
+        options = PylitOptions()
+        values = options.parse_args(["--language", "testlang"])
+        assert values.language == "testlang"
+        values = options(["foo.tl.txt"])
+        assert values.language == "testlang"
+        values = options(["foo.tl"])
+        assert values.txt2code is False
 
 ## ::
 
@@ -17,6 +17,7 @@
 
 """pylit_test.py: test the "literal python" module's user interface"""
 
+import errno
 from pprint import pprint
 from pylit import *
 from pylit_test import (text, stripped_text, textdata, 
@@ -342,6 +343,66 @@ class test_Run_Doctest(IOTests):
     def test_doctest_code2txt(self):
         (failures, tests) = run_doctest(self.codepath, txt2code=False)
         assert (failures, tests) == (0, 0)
+    def test_doctest_cache(self):
+        import shutil, tempfile
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, "pylit_test_cache.py.txt")
+        outfile = open(path, 'w')
+        outfile.write("Text\n\n>>> x = 2\n>>> x\n2\n\nMore text\n\n"
+                      ">>> x + 1\n3\n")
+        outfile.close()
+        try:
+            assert run_doctest(path) == (0, 3)
+            assert not os.path.exists(doctest_cachefile(path)), "opt-in"
+            assert run_doctest(path, doctest_cache=True) == (0, 3)
+            assert run_doctest(path, doctest_cache=True) == (0, 0), \
+                   "all groups cached"
+            assert run_doctest(path, doctest_cache=True,
+                               force=True) == (0, 3)
+            outfile = open(path, 'a')
+            outfile.write("\nNew text\n\n>>> x + 2\n4\n")
+            outfile.close()
+            assert run_doctest(path, doctest_cache=True) == (0, 1), \
+                   "only new group runs"
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_doctest_timings(self):
+        import shutil, tempfile
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, "pylit_test_timing.py")
+        outfile = open(path, 'w')
+        outfile.write("# Text\n#\n# >>> x = 2\n# >>> x\n# 2\n")
+        outfile.close()
+        timings = []
+        try:
+            run_doctest(path, txt2code=False, timings=timings)
+        finally:
+            shutil.rmtree(tmpdir)
+        assert [timing[:2] for timing in timings] == [(path, 3), (path, 4)]
+
+    def test_process_timings(self):
+        """the worker process times the examples only with `timing`"""
+        import multiprocessing, shutil, tempfile
+        from pylit import _run_doctest_process
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, "pylit_test_timing.py")
+        outfile = open(path, 'w')
+        outfile.write("# Text\n#\n# >>> x = 2\n# >>> x\n# 2\n")
+        outfile.close()
+        (stdout, stderr) = (sys.stdout, sys.stderr)
+        results = []
+        try:
+            for timing in (0, 5):
+                (receiver, sender) = multiprocessing.Pipe(False)
+                _run_doctest_process(sender, {"infile": path,
+                                              "txt2code": False}, timing)
+                results.append(receiver.recv())
+        finally:
+            (sys.stdout, sys.stderr) = (stdout, stderr)
+            shutil.rmtree(tmpdir)
+        assert [result["tries"] for result in results] == [2, 2]
+        assert [len(result["timings"]) for result in results] == [0, 2]
 
 ## The main() function is called if the script is run from the command line
 ## 
@@ -424,6 +485,450 @@ class test_Programmatic_Use(IOTests):
         assert lines == codedata
 
 
+## Execute
+## -------
+##
+## ::
+
+class test_Compile_Cached(object):
+    """Compiled code of `execute` is cached"""
+    def test_cache(self):
+        import shutil, tempfile
+        tmpdir = tempfile.mkdtemp()
+        dont_write_bytecode = sys.dont_write_bytecode
+        sys.dont_write_bytecode = False
+        try:
+            path = os.path.join(tmpdir, "script.py.txt")
+            textfile = open(path, "w")
+            textfile.write("Script::\n\n  result = __name__\n")
+            textfile.close()
+            code = compile_cached(path, txt2code=True)
+            namespace = {"__name__": "__main__"}
+            exec(code, namespace)
+            assert namespace["result"] == "__main__"
+            cachedir = os.path.join(tmpdir, "__pycache__")
+            assert len(os.listdir(cachedir)) == 1
+            # a different conversion setting must not use the cached code
+            code = compile_cached(path, txt2code=True,
+                                  code_block_marker=".. code-block::")
+            namespace = {"__name__": "__main__"}
+            exec(code, namespace)
+            assert "result" not in namespace
+        finally:
+            sys.dont_write_bytecode = dont_write_bytecode
+            shutil.rmtree(tmpdir)
+
+    def test_filename(self):
+        """the code object has the absolute path of a relative `infile`"""
+        import shutil, tempfile
+        tmpdir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        try:
+            os.chdir(tmpdir)
+            textfile = open("script.py.txt", "w")
+            textfile.write("Script::\n\n  result = 1\n")
+            textfile.close()
+            code = compile_cached("script.py.txt", txt2code=True)
+            assert code.co_filename == os.path.join(os.getcwd(),
+                                                    "script.py.txt")
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmpdir)
+
+
+class test_Fork_Server(object):
+    """Execute scripts in children of a fork server"""
+    def test_execute_forked(self):
+        import shutil, tempfile, threading
+        tmpdir = tempfile.mkdtemp()
+        socket_path = os.path.join(tmpdir, "fork.sock")
+        path = os.path.join(tmpdir, "script.py.txt")
+        textfile = open(path, "w")
+        textfile.write("Script::\n\n  import sys\n  sys.exit(3)\n")
+        textfile.close()
+        server = make_fork_server(socket_path)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            try:
+                make_fork_server(socket_path)
+            except IOError as ex:
+                assert ex.errno == 17, "must not replace a running server"
+            else:
+                assert False, "must not replace a running server"
+            options = PylitOptions()(["--execute", path]).as_dict()
+            options["socket_path"] = socket_path
+            assert execute_forked(**options) == 3
+        finally:
+            server.shutdown()
+            thread.join()
+            server.server_close()
+            shutil.rmtree(tmpdir)
+
+
+class test_Reloader(object):
+    """Restart the executed program after changes of the source"""
+    def test_poll(self):
+        import shutil, tempfile
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, "service.py.txt")
+        def write(source):
+            textfile = open(path, "w")
+            textfile.write(source)
+            textfile.close()
+            os.utime(path, None, ns=(0, os.stat(path).st_mtime_ns + 1))
+        reloader = Reloader(path)
+        try:
+            write("Service::\n\n  x = 1\n")
+            assert reloader.poll() is True
+            assert reloader.poll() is False, "source did not change"
+            write("Service::\n\n  x = 2\n")
+            assert reloader.poll() is True
+            write("Service::\n\n  x = (\n")
+            assert reloader.poll() is False, "keep running on syntax errors"
+        finally:
+            reloader.stop()
+            shutil.rmtree(tmpdir)
+
+    def test_malindented_edit(self):
+        """a conversion error keeps the old program running"""
+        import shutil, tempfile
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, "service.py.txt")
+        def write(source):
+            textfile = open(path, "w")
+            textfile.write(source)
+            textfile.close()
+            os.utime(path, None, ns=(0, os.stat(path).st_mtime_ns + 1))
+        reloader = Reloader(path)
+        try:
+            write("Service::\n\n  import time\n  time.sleep(30)\n")
+            assert reloader.poll() is True
+            process = reloader.process
+            write("Service::\n\n  import time\n time.sleep(30)\n")
+            assert reloader.poll() is False
+            assert reloader.process is process
+            assert process.is_alive()
+        finally:
+            reloader.stop()
+            shutil.rmtree(tmpdir)
+
+
+## Import hook
+## -----------
+##
+## ::
+
+class test_Import_Hook(object):
+    """Import literate modules from text sources"""
+    def test_import(self):
+        import importlib, shutil, tempfile
+        tmpdir = tempfile.mkdtemp()
+        dont_write_bytecode = sys.dont_write_bytecode
+        sys.dont_write_bytecode = False
+        sys.path.insert(0, tmpdir)
+        install_import_hook()
+        try:
+            textfile = open(os.path.join(tmpdir, "pylit_litmod.py.txt"), "w")
+            textfile.write("A literate module::\n\n  answer = 42\n")
+            textfile.close()
+            module = importlib.import_module("pylit_litmod")
+            assert module.answer == 42
+            cachefile = importlib.util.cache_from_source(module.__file__)
+            assert os.path.exists(cachefile)
+            # warm import uses the cache (without conversion)
+            del sys.modules["pylit_litmod"]
+            loader = module.__spec__.loader
+            loader.source_to_code = None
+            code = loader.get_code("pylit_litmod")
+            assert code.co_filename == module.__file__
+        finally:
+            uninstall_import_hook()
+            sys.path.remove(tmpdir)
+            sys.modules.pop("pylit_litmod", None)
+            sys.dont_write_bytecode = dont_write_bytecode
+            shutil.rmtree(tmpdir)
+
+
+## Conversion server
+## -----------------
+##
+## ::
+
+class test_LRUCache(object):
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache["a"] = 1
+        cache["b"] = 2
+        assert cache.get("a") == 1  # "a" is now the most recently used item
+        cache["c"] = 3
+        assert "b" not in cache
+        assert cache.get("a") == 1
+        assert cache.get("b", "missing") == "missing"
+        assert len(cache) == 2
+
+class test_Handle_Request(IOTests):
+    """Requests are processed like command line calls"""
+    def test_convert_content(self):
+        response = handle_request({"content": text, "args": ["--txt2code"]})
+        assert response == {"output": code}
+
+    def test_convert_file(self):
+        response = handle_request({"args": [self.txtpath, self.outpath],
+                                   "overwrite": "yes"})
+        assert response == {"written": self.outpath}
+        assert self.get_output() == code
+
+    def test_manifest(self):
+        """file-to-file requests are written like on the command line"""
+        request = {"args": [self.txtpath, self.outpath, "--manifest"]}
+        assert handle_request(request) == {"written": self.outpath}
+        try:
+            assert handle_request(request) == {"current": self.outpath}
+        finally:
+            path = manifest_file(self.outpath)
+            os.unlink(path)
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass # not empty
+
+    def test_relative_path(self):
+        cwd, name = os.path.split(self.codepath)
+        response = handle_request({"args": [name, "-"], "cwd": cwd})
+        assert response == {"output": text}
+
+    def test_check(self):
+        response = handle_request({"content": code, "action": "check",
+                                   "txt2code": False})
+        assert response["different"] is False
+
+    def test_cache(self):
+        cache = LRUCache()
+        request = {"content": text, "args": ["--txt2code"]}
+        handle_request(request, cache)
+        handle_request(request, cache)
+        assert len(cache) == 1
+
+
+## Persistent worker
+## -----------------
+##
+## ::
+
+class test_Run_Worker(IOTests):
+    def test_requests(self):
+        import io, json
+        requests = [{"arguments": [self.txtpath, "-"], "requestId": 1},
+                    {"args": ["-"]}]
+        instream = io.StringIO("".join(json.dumps(request) + "\n"
+                                       for request in requests))
+        outstream = io.StringIO()
+        run_worker(instream, outstream)
+        responses = [json.loads(line)
+                     for line in outstream.getvalue().splitlines()]
+        assert responses[0]["output"] == code
+        assert responses[0]["exitCode"] == 0
+        assert responses[0]["requestId"] == 1
+        assert responses[1]["exitCode"] == 1, "stdin is reserved for requests"
+
+    def test_action_options(self):
+        """action options in the arguments are not ignored"""
+        import io, json
+        requests = [{"arguments": ["--diff", self.txtpath, self.outpath]},
+                    {"arguments": ["--doctest", self.txtpath]},
+                    {"arguments": ["--bogus", self.txtpath]},
+                    {"arguments": ["--help"]},
+                    {"arguments": [self.txtpath, "-"]}]
+        instream = io.StringIO("".join(json.dumps(request) + "\n"
+                                       for request in requests))
+        outstream = io.StringIO()
+        run_worker(instream, outstream)
+        responses = [json.loads(line)
+                     for line in outstream.getvalue().splitlines()]
+        assert len(responses) == 5, "the worker survives bad requests"
+        assert "different" in responses[0]
+        assert "written" not in responses[0]
+        assert not os.path.exists(self.outpath)
+        for response in responses[1:4]:
+            assert response["exitCode"] == 1
+            assert "ValueError" in response["error"]
+        assert responses[4]["output"] == code
+
+
+## Dependency manifest
+## -------------------
+##
+## ::
+
+class test_Dependency_Manifest(IOTests):
+    includepath = "/tmp/pylit_test_include.txt"
+
+    def write_include(self, content):
+        outfile = open(self.includepath, 'w')
+        outfile.write(content)
+        outfile.close()
+
+    def remove_manifest(self):
+        """remove the manifest and the (empty) __pycache__ directory"""
+        path = manifest_file(self.outpath)
+        os.unlink(path)
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass # not empty
+
+    def test_find_includes(self):
+        outfile = open(self.txtpath, 'a')
+        outfile.write("\n.. include:: pylit_test_include.txt\n"
+                      ".. include:: <isonum.txt>\n")
+        outfile.close()
+        self.write_include(".. include:: pylit_test.py.txt\n")
+        try:
+            assert find_includes(self.txtpath) == [self.includepath]
+        finally:
+            os.unlink(self.includepath)
+
+    def test_rebuild(self):
+        outfile = open(self.txtpath, 'a')
+        outfile.write("\n.. include:: pylit_test_include.txt\n")
+        outfile.close()
+        self.write_include("included text\n")
+        try:
+            main([self.txtpath, self.outpath, "--deps"])
+            depfile = open(self.outpath + ".d").read()
+            assert depfile == "%s: %s %s\n" % (self.outpath, self.txtpath,
+                                               self.includepath)
+            (status, manifest) = check_manifest(self.txtpath, self.outpath)
+            assert status == "current"
+            self.write_include("changed text\n")
+            (status, manifest) = check_manifest(self.txtpath, self.outpath)
+            assert status == "outdated"
+            main([self.txtpath, self.outpath, "--deps"])
+            (status, manifest) = check_manifest(self.txtpath, self.outpath)
+            assert status == "current"
+        finally:
+            os.unlink(self.includepath)
+            os.unlink(self.outpath + ".d")
+            self.remove_manifest()
+
+    def test_no_manifest_by_default(self):
+        main([self.txtpath, self.outpath])
+        assert not os.path.exists(manifest_file(self.outpath))
+
+    def test_missing_input(self):
+        """a missing input is reported, also with --deps"""
+        for args in ([], ["--deps"]):
+            try:
+                main(["/tmp/pylit_test_nonexist.py.txt", self.outpath] + args)
+            except SystemExit as exit:
+                assert exit.code == errno.ENOENT
+            else:
+                assert False, "no SystemExit"
+
+    def test_replace_up_to_date(self):
+        main([self.txtpath, self.outpath, "--manifest"])
+        try:
+            main([self.txtpath, self.outpath, "--manifest", "--replace"])
+            assert os.path.exists(self.txtpath + "~")
+            assert not os.path.exists(self.txtpath)
+        finally:
+            self.remove_manifest()
+            os.unlink(self.txtpath + "~")
+
+
+## Ninja build file
+## ----------------
+##
+## ::
+
+class test_Emit_Ninja(IOTests):
+    def test_emit_ninja(self):
+        """one edge per text source, options are passed on"""
+        import shutil, tempfile
+        source_dir = tempfile.mkdtemp()
+        txtpath = os.path.join(source_dir, "foo.py.txt")
+        try:
+            outfile = open(txtpath, "w")
+            outfile.write(text)
+            outfile.close()
+            main(["--emit-ninja", source_dir, "--strip", self.outpath])
+        finally:
+            shutil.rmtree(source_dir)
+        infile = open(self.outpath)
+        build = infile.read()
+        infile.close()
+        print(build)
+        assert "depfile = $out.d" in build
+        edge = "build %s: pylit %s\n" % (txtpath[:-4], txtpath)
+        assert edge in build
+        flags = build.split(edge)[1].splitlines()[0]
+        assert flags == "  flags = --language=python --strip"
+
+
+## Combined actions
+## ----------------
+##
+## ::
+
+class test_Run_Actions(IOTests):
+    def test_diff_doctest_convert(self):
+        results = run_actions(["diff", "doctest", "convert"], self.txtpath,
+                              self.outpath, overwrite="yes")
+        assert results["diff"] is False
+        assert results["doctest"] == (0, 0)
+        assert open(self.outpath).read() == code
+
+    def test_convert_replace(self):
+        """"convert" uses the same code path as the default action"""
+        try:
+            run_actions(["diff", "convert"], self.txtpath, self.outpath,
+                        overwrite="yes", replace=True)
+            assert open(self.outpath).read() == code
+            assert not os.path.exists(self.txtpath)
+            assert os.path.exists(self.txtpath + "~")
+        finally:
+            if os.path.exists(self.txtpath + "~"):
+                os.unlink(self.txtpath + "~")
+
+
+## Parallel doctests
+## ------------------
+##
+## ::
+
+class test_Run_Doctests(IOTests):
+    def test_results(self):
+        import json
+        reportpath = "/tmp/pylit_test_report.json"
+        failing = "/tmp/pylit_test_fail.py.txt"
+        outfile = open(failing, 'w')
+        outfile.write("Doc\n\n>>> 1 + 1\n3\n")
+        outfile.close()
+        try:
+            (failures, tries) = run_doctests([self.txtpath, failing],
+                                             workers=2, report=reportpath)
+            report = json.load(open(reportpath))
+        finally:
+            os.unlink(failing)
+            os.unlink(reportpath)
+        assert (failures, tries) == (1, 1)
+        statuses = [result["status"] for result in report["files"]]
+        assert statuses == ["ok", "failed"]
+        assert report["files"][1]["file"] == failing
+
+    def test_junit_report(self):
+        from xml.dom import minidom
+        reportpath = "/tmp/pylit_test_report.xml"
+        try:
+            run_doctests([self.codepath], report=reportpath)
+            suite = minidom.parse(reportpath).documentElement
+        finally:
+            os.unlink(reportpath)
+        assert suite.getAttribute("tests") == "1"
+        assert suite.getAttribute("failures") == "0"
+
+
 if __name__ == "__main__":
     nose.runmodule() # requires nose 0.9.1
     sys.exit()